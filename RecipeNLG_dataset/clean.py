@@ -1,32 +1,32 @@
-import pandas as pd
+import argparse
 import json
 import os
+import random
+import time
 from ast import literal_eval
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
 
 # ========== CONFIG ==========
 INPUT_CSV = "RecipeNLG_dataset.csv"
-OUTPUT_JSON = "recipes_nlg_clean.json"
+OUTPUT_PATH = "recipes_nlg_clean.jsonl"  # .jsonl, .json (legacy array) or .parquet
 SAMPLE_SIZE = 5000  # set to None to process all
-
-# ========== STEP 1: Load ==========
-print("Loading RecipeNLG dataset...")
-df = pd.read_csv(INPUT_CSV)
-print(f"Loaded {len(df)} recipes.")
-
-if SAMPLE_SIZE:
-    df = df.sample(SAMPLE_SIZE, random_state=42).reset_index(drop=True)
-    print(f"Sampled {len(df)} recipes for cleaning.")
+CHUNK_SIZE = 50_000  # CSV rows read per chunk
+N_WORKERS = os.cpu_count() or 1
+SEED = 42
 
 # ['Title', 'Ingredients', 'Directions', 'NER', ...]
-df.columns = [c.lower().strip() for c in df.columns]
+COLUMNS = ("title", "ingredients", "directions", "ner")
 
-# ========== STEP 2: Cleaning helper ==========
+
+# ========== STEP 1: Cleaning helpers ==========
 def parse_list_field(x):
-    # paese a field that should be a list of strings
-    if pd.isna(x):
-        return []
+    # parse a field that should be a list of strings
     if isinstance(x, list):
         return x
+    if pd.isna(x):
+        return []
     try:
         val = literal_eval(str(x))
         if isinstance(val, list):
@@ -36,35 +36,180 @@ def parse_list_field(x):
     except Exception:
         return [t.strip().lower() for t in str(x).split(",") if t.strip()]
 
-# ========== STEP 3: Clean & Format ==========
-recipes = []
-for i, row in df.iterrows():
-    title = str(row.get("title") or "").strip()
-    ingredients = parse_list_field(row.get("ingredients"))
-    instructions = parse_list_field(row.get("directions"))
-    ner = parse_list_field(row.get("ner"))
+
+def clean_row(row_id, title, ingredients, directions, ner):
+    title = "" if pd.isna(title) else str(title).strip()
+    ingredients = parse_list_field(ingredients)
+    instructions = parse_list_field(directions)
+    ner = parse_list_field(ner)
 
     if not title or not ingredients or not instructions:
-        continue
+        return None
 
-    recipe = {
-        "id": f"recnlg_{i}",
+    return {
+        "id": f"recnlg_{row_id}",
         "title": title,
         "ingredients": ingredients,
         "instructions": instructions,
         "ner": ner,
         "source": "RecipeNLG"
     }
-    recipes.append(recipe)
 
-print(f"Cleaned {len(recipes)} usable recipes.")
 
-# ========== STEP 4: Save ==========
-os.makedirs(os.path.dirname(OUTPUT_JSON) or ".", exist_ok=True)
-with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-    json.dump(recipes, f, indent=2, ensure_ascii=False)
+def clean_rows(rows):
+    """Worker entry point: rows are (row_id, title, ingredients, directions, ner) tuples."""
+    return [r for r in (clean_row(*row) for row in rows) if r is not None]
+
+
+# ========== STEP 2: Streaming read ==========
+def iter_raw_chunks(path, chunk_size):
+    """Yield lists of raw (row_id, title, ingredients, directions, ner) tuples; row_id is the CSV row number."""
+    offset = 0
+    reader = pd.read_csv(
+        path,
+        chunksize=chunk_size,
+        dtype=str,
+        usecols=lambda c: c.lower().strip() in COLUMNS,
+    )
+    for chunk in reader:
+        chunk.columns = [c.lower().strip() for c in chunk.columns]
+        cols = [chunk[c].tolist() for c in COLUMNS]
+        ids = range(offset, offset + len(chunk))
+        offset += len(chunk)
+        yield list(zip(ids, *cols))
+
+
+def reservoir_sample(chunks, k, chunk_size=CHUNK_SIZE, seed=SEED):
+    """Uniform sample of k raw rows from a stream of chunks (Algorithm R), O(k) memory."""
+    rng = random.Random(seed)
+    reservoir, seen = [], 0
+    for rows in chunks:
+        for row in rows:
+            if seen < k:
+                reservoir.append(row)
+            else:
+                j = rng.randint(0, seen)
+                if j < k:
+                    reservoir[j] = row
+            seen += 1
+    print(f"Sampled {len(reservoir)} of {seen} recipes for cleaning.")
+    reservoir.sort(key=lambda row: row[0])
+    return [reservoir[i:i + chunk_size] for i in range(0, len(reservoir), chunk_size)]
+
+
+def clean_parallel(chunks, n_workers):
+    """Clean chunks in a process pool, yielding cleaned chunks in input order with bounded look-ahead."""
+    if n_workers <= 1:
+        for rows in chunks:
+            yield clean_rows(rows)
+        return
+    with ProcessPoolExecutor(max_workers=n_workers) as pool:
+        pending = []
+        for rows in chunks:
+            pending.append(pool.submit(clean_rows, rows))
+            if len(pending) >= 2 * n_workers:
+                yield pending.pop(0).result()
+        for fut in pending:
+            yield fut.result()
+
+
+# ========== STEP 3: Incremental writers ==========
+class JsonlWriter:
+    def __init__(self, path):
+        self.f = open(path, "w", encoding="utf-8")
+
+    def write(self, recipes):
+        for r in recipes:
+            self.f.write(json.dumps(r, ensure_ascii=False) + "\n")
+
+    def close(self):
+        self.f.close()
+
+
+class JsonArrayWriter(JsonlWriter):
+    """Legacy single JSON array, streamed element by element."""
+
+    def __init__(self, path):
+        super().__init__(path)
+        self.f.write("[\n")
+        self.first = True
+
+    def write(self, recipes):
+        for r in recipes:
+            self.f.write(("" if self.first else ",\n") + json.dumps(r, ensure_ascii=False))
+            self.first = False
+
+    def close(self):
+        self.f.write("\n]\n")
+        self.f.close()
+
+
+class ParquetWriter:
+    def __init__(self, path):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        self.pa = pa
+        self.schema = pa.schema([
+            ("id", pa.string()),
+            ("title", pa.string()),
+            ("ingredients", pa.list_(pa.string())),
+            ("instructions", pa.list_(pa.string())),
+            ("ner", pa.list_(pa.string())),
+            ("source", pa.string()),
+        ])
+        self.writer = pq.ParquetWriter(path, self.schema)
+
+    def write(self, recipes):
+        if recipes:
+            self.writer.write_table(self.pa.Table.from_pylist(recipes, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+def open_writer(path):
+    if path.endswith(".parquet"):
+        return ParquetWriter(path)
+    if path.endswith(".json"):
+        return JsonArrayWriter(path)
+    return JsonlWriter(path)
+
+
+# ========== STEP 4: Clean & Save ==========
+def main():
+    parser = argparse.ArgumentParser(description="Stream-clean the RecipeNLG CSV.")
+    parser.add_argument("--input", default=INPUT_CSV)
+    parser.add_argument("--output", default=OUTPUT_PATH, help=".jsonl, .json or .parquet")
+    parser.add_argument("--sample-size", type=int, default=SAMPLE_SIZE, help="0 to process all")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=N_WORKERS)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    print("Streaming RecipeNLG dataset...")
+    chunks = iter_raw_chunks(args.input, args.chunk_size)
+    if args.sample_size:
+        chunks = reservoir_sample(chunks, args.sample_size, args.chunk_size)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    writer = open_writer(args.output)
+    n_clean, sample = 0, None
+    try:
+        for recipes in clean_parallel(chunks, args.workers):
+            writer.write(recipes)
+            n_clean += len(recipes)
+            if sample is None and recipes:
+                sample = recipes[0]
+    finally:
+        writer.close()
+
+    print(f"Cleaned {n_clean} usable recipes in {time.perf_counter() - start:.1f}s.")
+    print(f"Saved cleaned dataset to {args.output}")
+    if sample:
+        print("Sample cleaned recipe:")
+        print(json.dumps(sample, indent=2, ensure_ascii=False))
 
-print(f"Saved cleaned dataset to {OUTPUT_JSON}")
 
-print("Sample cleaned recipe:")
-print(json.dumps(recipes[0], indent=2, ensure_ascii=False))
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -1,81 +1,315 @@
-import requests
+"""
+Asynchronous Spoonacular fetcher.
+
+Recipes are fetched 100 at a time through the bulk endpoints
+(`/recipes/random?number=100`, `/recipes/informationBulk?ids=...`) by a
+few concurrent workers. A token bucket keeps the request rate within the
+plan's limit, 429/5xx/timeouts are retried with exponential backoff (or
+the server's Retry-After), and the X-API-Quota-* headers are tracked so the
+run stops cleanly when the daily quota is spent. Every batch is appended
+to a JSONL file and a small checkpoint, so an interrupted run resumes.
+
+    python Spoonacular_API/spoonacular_fetch.py --n-recipes 1000
+    python Spoonacular_API/spoonacular_fetch.py --ids-file ids.txt      # specific recipe ids
+    python Spoonacular_API/stub_server.py &                             # local test server
+    python Spoonacular_API/spoonacular_fetch.py --base-url http://127.0.0.1:8089 --n-recipes 5000
+"""
+import argparse
+import asyncio
 import json
 import os
+import random
 import time
-from tqdm import tqdm
-
-API_KEY = "09803b49b7dc4507a316bc3bf0bd26ba"
-SAVE_PATH = "spoonacular_dataset.json"
-N_RECIPES = 100
-DELAY = 1.2  # seconds between requests
-RETRY_LIMIT = 2  # max retry per recipe
-SAVE_INTERVAL = 10  # auto-save every N recipes
-
-def get_random_recipe():
-    """Fetch one random recipe with retries and timeout."""
-    for attempt in range(RETRY_LIMIT):
+
+import requests
+
+# ======== Config ========
+API_KEY = os.environ.get("SPOONACULAR_API_KEY", "09803b49b7dc4507a316bc3bf0bd26ba")
+BASE_URL = "https://api.spoonacular.com"
+SAVE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spoonacular_dataset.jsonl")
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+N_RECIPES = 100          # new recipes to add per run
+BATCH_SIZE = 100         # recipes per request (API maximum for both bulk endpoints)
+CONCURRENCY = 4          # requests in flight
+RATE = 1.0               # requests per second allowed by the plan
+BURST = 2                # requests that may be sent back to back
+MAX_RETRIES = 5
+BACKOFF_BASE = 1.0       # seconds, doubled per retry
+BACKOFF_MAX = 60.0
+TIMEOUT = 15
+MAX_EMPTY_BATCHES = 5    # stop random sampling after this many batches without a new recipe
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+class TokenBucket:
+    """`rate` requests per second on average, at most `capacity` back to back."""
+
+    def __init__(self, rate=RATE, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds):
+        """Hold every request for `seconds` (the server asked us to back off)."""
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+def backoff_delay(attempt, retry_after=None):
+    """Server-provided Retry-After if any, else jittered exponential backoff."""
+    if retry_after:
         try:
-            url = f"https://api.spoonacular.com/recipes/random?number=1&apiKey={API_KEY}"
-            response = requests.get(url, timeout=15)
-            if response.status_code == 200:
-                data = response.json()
-                if "recipes" in data and len(data["recipes"]) > 0:
-                    r = data["recipes"][0]
-                    return {
-                        "id": r.get("id", None),
-                        "title": r.get("title", ""),
-                        "ingredients": [ing["original"] for ing in r.get("extendedIngredients", [])],
-                        "instructions": r.get("instructions", "") or "",
-                        "source": "Spoonacular"
-                    }
-            elif response.status_code in [402, 429]:
-                # 402 = quota exceeded, 429 = too many requests
-                print(f"\n Rate limit reached ({response.status_code}).")
-                time.sleep(3)
-                print("Forced Exit due to API limits.")
-                exit(1)
-            else:
-                print(f"Unexpected status {response.status_code}, retrying ({attempt+1}/{RETRY_LIMIT})...")
-                time.sleep(2)
-        except requests.exceptions.Timeout:
-            print(f"Timeout, retrying ({attempt+1}/{RETRY_LIMIT})...")
-            time.sleep(3)
-        except Exception as e:
-            print(f"Error: {e}")
-            time.sleep(2)
-    return None
-
-# ---------- Load Existing ----------
-if os.path.exists(SAVE_PATH):
-    with open(SAVE_PATH, "r", encoding="utf-8") as f:
-        existing = json.load(f)
-    existing_ids = {r["id"] for r in existing if r.get("id")}
-    print(f"Loaded {len(existing)} existing recipes.")
-else:
-    existing, existing_ids = [], set()
-    print("Starting new dataset...")
-
-# ---------- Fetch ----------
-new_recipes = []
-for i in tqdm(range(N_RECIPES), desc="Fetching recipes"):
-    rec = get_random_recipe()
-    if rec and rec.get("id") and rec["id"] not in existing_ids:
-        new_recipes.append(rec)
-        existing_ids.add(rec["id"])
+            return float(retry_after)
+        except ValueError:
+            pass
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+class SpoonacularClient:
+    def __init__(self, api_key=API_KEY, base_url=BASE_URL, bucket=None, max_retries=MAX_RETRIES):
+        self.api_key = api_key
+        self.base_url = base_url.rstrip("/")
+        self.bucket = bucket or TokenBucket()
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self.quota = {}           # last X-API-Quota-* headers
+        self.points = 0.0         # quota points spent this run
+        self.requests = 0
+        self.retries = 0
+        self.exhausted = False
+
+    def _record_quota(self, headers):
+        for name in ("X-API-Quota-Request", "X-API-Quota-Used", "X-API-Quota-Left"):
+            if name in headers:
+                self.quota[name] = float(headers[name])
+        self.points += float(headers.get("X-API-Quota-Request", 0.0))
+        if self.quota.get("X-API-Quota-Left", 1) <= 0:
+            self.exhausted = True
+
+    async def get(self, path, **params):
+        url = f"{self.base_url}{path}"
+        params["apiKey"] = self.api_key
+        for attempt in range(self.max_retries + 1):
+            if self.exhausted:
+                raise QuotaExhausted(f"quota used up ({self.quota})")
+            await self.bucket.acquire()
+            try:
+                resp = await asyncio.to_thread(self.session.get, url, params=params, timeout=TIMEOUT)
+            except requests.RequestException as e:
+                delay = backoff_delay(attempt)
+                print(f"{path}: {type(e).__name__}, retrying in {delay:.1f}s")
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.requests += 1
+            self._record_quota(resp.headers)
+            if resp.status_code == 200:
+                return resp.json()
+            if resp.status_code == 402:
+                self.exhausted = True
+                raise QuotaExhausted("daily quota used up (HTTP 402)")
+            if resp.status_code == 429 or resp.status_code >= 500:
+                delay = backoff_delay(attempt, resp.headers.get("Retry-After"))
+                print(f"{path}: HTTP {resp.status_code}, backing off {delay:.1f}s")
+                self.retries += 1
+                self.bucket.pause(delay)
+                continue
+            raise RuntimeError(f"{path}: HTTP {resp.status_code}: {resp.text[:200]}")
+        raise RuntimeError(f"{path}: giving up after {self.max_retries} retries")
+
+
+def to_record(r):
+    return {
+        "id": r.get("id", None),
+        "title": r.get("title", ""),
+        "ingredients": [ing["original"] for ing in r.get("extendedIngredients", [])],
+        "instructions": r.get("instructions", "") or "",
+        "source": "Spoonacular"
+    }
+
+
+class JsonlAppender:
+    """Append-only JSONL output that skips ids already in the file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = set()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        self.ids.add(json.loads(line).get("id"))
+        self.existing = len(self.ids)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._f = open(path, "a", encoding="utf-8")
+
+    @property
+    def added(self):
+        return len(self.ids) - self.existing
+
+    def write(self, recipes):
+        """Append unseen recipes (including ids repeated within `recipes`); returns how many were new."""
+        fresh = []
+        for r in recipes:
+            if r.get("id") and r["id"] not in self.ids:
+                self.ids.add(r["id"])
+                fresh.append(r)
+        for r in fresh:
+            self._f.write(json.dumps(r, ensure_ascii=False) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+        return len(fresh)
+
+    def close(self):
+        self._f.close()
+
+
+def load_checkpoint(path):
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+async def fetch_random(client, out, target_total, concurrency=CONCURRENCY, batch_size=BATCH_SIZE, on_batch=None):
+    """
+    Sample random recipes until `out` holds `target_total` ids (or the quota
+    runs out). Each worker reserves the recipes it asks for, so requests in
+    flight never add up past the target; a batch's unfilled part (duplicates)
+    is released for the next request.
+    """
+    empty, pending = 0, 0
+    landed = asyncio.Condition()
+
+    async def worker():
+        nonlocal empty, pending
+        while empty < MAX_EMPTY_BATCHES:
+            async with landed:
+                while (number := min(batch_size, target_total - len(out.ids) - pending)) <= 0 and pending:
+                    await landed.wait()   # an in-flight batch may still come back short
+                if number <= 0:
+                    return
+                pending += number
+            try:
+                data = await client.get("/recipes/random", number=number, includeNutrition="false")
+                new = out.write([to_record(r) for r in data.get("recipes", [])])
+            finally:
+                async with landed:
+                    pending -= number
+                    landed.notify_all()
+            empty = 0 if new else empty + 1
+            if on_batch:
+                on_batch()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def fetch_ids(client, out, ids, concurrency=CONCURRENCY, batch_size=BATCH_SIZE, on_batch=None):
+    """Fetch the given recipe ids that are not in `out` yet via informationBulk."""
+    todo = [i for i in ids if i not in out.ids]
+    chunks = asyncio.Queue()
+    for i in range(0, len(todo), batch_size):
+        chunks.put_nowait(todo[i:i + batch_size])
+
+    async def worker():
+        while not chunks.empty():
+            chunk = chunks.get_nowait()
+            data = await client.get("/recipes/informationBulk", ids=",".join(map(str, chunk)),
+                                    includeNutrition="false")
+            out.write([to_record(r) for r in data])
+            if on_batch:
+                on_batch()
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+
+async def run(args):
+    out = JsonlAppender(args.output)
+    checkpoint_path = args.output + CHECKPOINT_SUFFIX
+    state = load_checkpoint(checkpoint_path)
+    print(f"Loaded {out.existing} existing recipes from {args.output}.")
+
+    ids = None
+    if args.ids_file:
+        with open(args.ids_file, "r", encoding="utf-8") as f:
+            ids = [int(tok) for tok in f.read().replace(",", " ").split()]
+        target = out.existing + len({i for i in ids if i not in out.ids})
+    elif state.get("mode") == "random" and state.get("target_total", 0) > out.existing and not args.fresh:
+        target = state["target_total"]
+        print(f"Resuming unfinished run: {target - out.existing} recipes to go.")
     else:
-        print("Duplicate or invalid recipe skipped.")
-    # Auto-save every N_FETCH steps
-    if (i + 1) % SAVE_INTERVAL == 0 and new_recipes:
-        with open(SAVE_PATH, "w", encoding="utf-8") as f:
-            json.dump(existing + new_recipes, f, indent=2, ensure_ascii=False)
-        print(f"Auto-saved progress ({len(existing) + len(new_recipes)} total).")
-    time.sleep(DELAY)
-
-# ---------- Final Save ----------
-if new_recipes:
-    os.makedirs(os.path.dirname(SAVE_PATH), exist_ok=True)
-    with open(SAVE_PATH, "w", encoding="utf-8") as f:
-        json.dump(existing + new_recipes, f, indent=2, ensure_ascii=False)
-    print(f"Finished run: {len(new_recipes)} new recipes. Total {len(existing) + len(new_recipes)}.")
-else:
-    print("No new unique recipes fetched.")
+        target = out.existing + args.n_recipes
+
+    client = SpoonacularClient(args.api_key, args.base_url, TokenBucket(args.rate, args.burst))
+    start = time.perf_counter()
+
+    def on_batch():
+        save_checkpoint(checkpoint_path, {
+            "mode": "ids" if ids is not None else "random",
+            "target_total": target,
+            "total": len(out.ids),
+            "quota": client.quota,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        })
+        print(f"  {len(out.ids)}/{target} recipes, {client.requests} requests, {client.points:.2f} quota points")
+
+    try:
+        if ids is not None:
+            await fetch_ids(client, out, ids, args.concurrency, args.batch_size, on_batch)
+        else:
+            await fetch_random(client, out, target, args.concurrency, args.batch_size, on_batch)
+    except QuotaExhausted as e:
+        print(f"Stopping: {e}. Progress is saved; rerun tomorrow to resume.")
+    finally:
+        out.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Finished run: {out.added} new recipes. Total {len(out.ids)}.")
+    print(f"{client.requests} requests ({client.retries} retries) in {elapsed:.1f}s: "
+          f"{out.added / max(elapsed, 1e-9) * 60:.0f} recipes/min, "
+          f"{out.added / client.points if client.points else 0:.1f} recipes per quota point")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch Spoonacular recipes into an append-only JSONL file.")
+    parser.add_argument("--n-recipes", type=int, default=N_RECIPES, help="new random recipes to fetch")
+    parser.add_argument("--ids-file", help="fetch these recipe ids (whitespace/comma separated) instead")
+    parser.add_argument("--output", default=SAVE_PATH)
+    parser.add_argument("--base-url", default=BASE_URL, help="API root, e.g. a local stub_server.py")
+    parser.add_argument("--api-key", default=API_KEY)
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--rate", type=float, default=RATE, help="requests per second")
+    parser.add_argument("--burst", type=float, default=BURST)
+    parser.add_argument("--fresh", action="store_true", help="ignore an unfinished checkpoint")
+    args = parser.parse_args()
+    if args.batch_size > 100:
+        parser.error("the bulk endpoints return at most 100 recipes per request")
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Local stand-in for the Spoonacular API, for testing spoonacular_fetch.py
+without spending quota.
+
+    python Spoonacular_API/stub_server.py --port 8089 --rps 5 --daily-quota 150 --error-rate 0.05
+
+Serves /recipes/random and /recipes/informationBulk with deterministic fake
+recipes, charges quota points like the real API (random: 1 + 0.01 per
+recipe, informationBulk: 1 + 0.5 per additional recipe), sends the
+X-API-Quota-* headers, answers 429 + Retry-After above `--rps` and 402 once
+the daily quota is spent.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ======== Config ========
+HOST = "127.0.0.1"
+PORT = 8089
+RPS = 5.0
+DAILY_QUOTA = 150.0
+ID_SPACE = 50_000        # random recipes are drawn from ids 1..ID_SPACE
+LATENCY_MS = 50
+ERROR_RATE = 0.0         # share of requests answered with HTTP 500
+
+
+def fake_recipe(recipe_id):
+    rng = random.Random(recipe_id)
+    words = ["tomato", "basil", "garlic", "chicken", "rice", "lemon", "tofu", "cheese", "pasta", "onion"]
+    ingredients = rng.sample(words, 4)
+    return {
+        "id": recipe_id,
+        "title": f"{ingredients[0].title()} {rng.choice(['Soup', 'Salad', 'Bake', 'Stew'])} #{recipe_id}",
+        "extendedIngredients": [{"original": f"{rng.randint(1, 3)} cups {w}"} for w in ingredients],
+        "instructions": f"Combine the {', '.join(ingredients)} and cook for {rng.randint(10, 60)} minutes.",
+    }
+
+
+class StubState:
+    def __init__(self, rps=RPS, daily_quota=DAILY_QUOTA, error_rate=ERROR_RATE, latency_ms=LATENCY_MS):
+        self.rps = rps
+        self.daily_quota = daily_quota
+        self.error_rate = error_rate
+        self.latency = latency_ms / 1000
+        self.used = 0.0
+        self.recent = []   # send times within the last second
+        self.lock = threading.Lock()
+
+    def admit(self):
+        """(status, retry_after) for a new request under the rate limit."""
+        with self.lock:
+            now = time.monotonic()
+            self.recent = [t for t in self.recent if now - t < 1.0]
+            if len(self.recent) >= self.rps:
+                return 429, 1.0 - (now - self.recent[0])
+            self.recent.append(now)
+            if self.used >= self.daily_quota:
+                return 402, None
+            return 200, None
+
+    def charge(self, points):
+        with self.lock:
+            self.used += points
+            return points, self.used, max(0.0, self.daily_quota - self.used)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    state = None  # set by make_server
+
+    def _send(self, status, payload, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in headers:
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        if not params.get("apiKey"):
+            return self._send(401, {"status": "failure", "message": "missing apiKey"})
+
+        status, retry_after = self.state.admit()
+        if status == 429:
+            return self._send(429, {"status": "failure"}, [("Retry-After", f"{retry_after:.2f}")])
+        if status == 402:
+            return self._send(402, {"status": "failure", "message": "daily points limit reached"})
+        time.sleep(self.state.latency)
+        if random.random() < self.state.error_rate:
+            return self._send(500, {"status": "failure"})
+
+        if url.path == "/recipes/random":
+            n = min(int(params.get("number", 1)), 100)
+            payload = {"recipes": [fake_recipe(random.randint(1, ID_SPACE)) for _ in range(n)]}
+            points = 1 + 0.01 * n
+        elif url.path == "/recipes/informationBulk":
+            ids = [int(i) for i in params.get("ids", "").split(",") if i]
+            payload = [fake_recipe(i) for i in ids]
+            points = 1 + 0.5 * max(0, len(ids) - 1)
+        else:
+            return self._send(404, {"status": "failure"})
+
+        request, used, left = self.state.charge(points)
+        self._send(200, payload, [
+            ("X-API-Quota-Request", f"{request:.2f}"),
+            ("X-API-Quota-Used", f"{used:.2f}"),
+            ("X-API-Quota-Left", f"{left:.2f}"),
+        ])
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(state, host=HOST, port=PORT):
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a fake Spoonacular API for local testing.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--rps", type=float, default=RPS)
+    parser.add_argument("--daily-quota", type=float, default=DAILY_QUOTA)
+    parser.add_argument("--error-rate", type=float, default=ERROR_RATE)
+    parser.add_argument("--latency-ms", type=float, default=LATENCY_MS)
+    args = parser.parse_args()
+
+    state = StubState(args.rps, args.daily_quota, args.error_rate, args.latency_ms)
+    server = make_server(state, args.host, args.port)
+    print(f"Stub Spoonacular API on http://{args.host}:{args.port} (quota {args.daily_quota} points)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import math
+
+import numpy as np
+
+# ======== Config ========
+# flat_* store every vector compressed and scan them all: float16, 8-bit scalar
+# quantization (IndexScalarQuantizer) or product quantization. flat_pq is a
+# single-cell IVF ("IVF1,PQ"): the same exhaustive PQ scan as IndexPQ, but it
+# accepts the ID selectors used by filtered and live-index searches.
+INDEX_TYPES = ("flat", "flat_fp16", "flat_sq8", "flat_pq", "hnsw", "ivf_flat", "ivf_pq")
+
+DEFAULT_PARAMS = {
+    "hnsw_m": 32,            # graph degree
+    "ef_construction": 200,
+    "ef_search": 64,
+    "nlist": None,           # IVF cells; None -> ~4 * sqrt(n)
+    "nprobe": 16,
+    "pq_m": 48,              # PQ sub-quantizers (bytes per vector at 8 bits), must divide the embedding dim
+    "pq_nbits": None,        # bits per PQ code; None -> 8, fewer below 256 training vectors
+    "train_size": 100_000,   # vectors sampled for IVF/PQ training
+    "seed": 42,
+}
+
+
+def resolve_params(n_vectors, **params):
+    """Fill defaults and derive the data-dependent ones (nlist, pq_nbits)."""
+    unknown = set(params) - set(DEFAULT_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown index parameters: {sorted(unknown)}")
+    p = {**DEFAULT_PARAMS, **{k: v for k, v in params.items() if v is not None}}
+    if p["nlist"] is None:
+        # FAISS wants >= 39 training points per centroid
+        p["nlist"] = max(1, min(int(4 * math.sqrt(max(n_vectors, 1))), n_vectors // 39 or 1))
+    if p["pq_nbits"] is None:
+        # PQ training needs at least 2**nbits points per sub-quantizer
+        p["pq_nbits"] = max(1, min(8, int(math.log2(max(min(n_vectors, p["train_size"]), 1)))))
+    return p
+
+
+def factory_string(kind, dim, p):
+    if kind == "flat":
+        return "Flat"
+    if kind == "flat_fp16":
+        return "SQfp16"
+    if kind == "flat_sq8":
+        return "SQ8"
+    if kind == "flat_pq":
+        if dim % p["pq_m"]:
+            raise ValueError(f"pq_m={p['pq_m']} must divide the embedding dim {dim}.")
+        return f"IVF1,PQ{p['pq_m']}x{p['pq_nbits']}"
+    if kind == "hnsw":
+        return f"HNSW{p['hnsw_m']},Flat"
+    if kind == "ivf_flat":
+        return f"IVF{p['nlist']},Flat"
+    if kind == "ivf_pq":
+        if dim % p["pq_m"]:
+            raise ValueError(f"pq_m={p['pq_m']} must divide the embedding dim {dim}.")
+        return f"IVF{p['nlist']},PQ{p['pq_m']}x{p['pq_nbits']}"
+    raise ValueError(f"Unknown index type {kind!r}; expected one of {INDEX_TYPES}.")
+
+
+def make_index(kind, dim, n_vectors, **params):
+    """Create an empty inner-product index of the given kind."""
+    import faiss  # not at module level, so BM25-only callers never load it
+
+    p = resolve_params(n_vectors, **params)
+    n_train = min(n_vectors, p["train_size"])
+    if kind in ("flat_pq", "ivf_pq") and n_train < 2 ** p["pq_nbits"]:
+        raise ValueError(f"{kind} with pq_nbits={p['pq_nbits']} needs at least {2 ** p['pq_nbits']} "
+                         f"training vectors, got {n_train}; lower pq_nbits or use another index type.")
+    index = faiss.index_factory(dim, factory_string(kind, dim, p), faiss.METRIC_INNER_PRODUCT)
+    if kind == "hnsw":
+        faiss.downcast_index(index).hnsw.efConstruction = p["ef_construction"]
+    return index, p
+
+
+def train_index(index, embeddings, train_size, seed=42):
+    """Train on a random sample of at most `train_size` vectors (no-op for Flat/HNSW/fp16)."""
+    if index.is_trained:
+        return
+    n = len(embeddings)
+    if n > train_size:
+        rows = np.sort(np.random.default_rng(seed).choice(n, train_size, replace=False))
+        sample = np.ascontiguousarray(embeddings[rows], dtype=np.float32)
+    else:
+        sample = np.ascontiguousarray(embeddings, dtype=np.float32)
+    index.train(sample)
+
+
+def set_search_params(index, nprobe=None, ef_search=None):
+    """Apply query-time knobs; parameters the index does not have are ignored."""
+    import faiss
+
+    ps = faiss.ParameterSpace()
+    for name, value in (("nprobe", nprobe), ("efSearch", ef_search)):
+        if value is None:
+            continue
+        try:
+            ps.set_index_parameter(index, name, value)
+        except RuntimeError:
+            pass
+
+
+def build_ann_index(embeddings, kind="flat", **params):
+    """
+    Build, train and fill an index over L2-normalized `embeddings`.
+    Returns (index, resolved params).
+    """
+    n, dim = embeddings.shape
+    index, p = make_index(kind, dim, n, **params)
+    train_index(index, embeddings, p["train_size"], p["seed"])
+    index.add(np.ascontiguousarray(embeddings, dtype=np.float32))
+    set_search_params(index, nprobe=p["nprobe"], ef_search=p["ef_search"])
+    return index, p
+
+
+def with_ids(index, labels=None):
+    """
+    Wrap an already filled index in an IndexIDMap2 whose labels are its rows
+    (or `labels`), so later vectors can be added under explicit ids without
+    re-adding the existing ones. FAISS only wraps empty indexes, so the id
+    map is filled by hand.
+    """
+    import faiss
+
+    wrapper = faiss.IndexIDMap2(faiss.IndexFlat(index.d, index.metric_type))
+    wrapper.index = index
+    wrapper.referenced_objects = [index]  # the wrapper does not own `index`
+    wrapper.ntotal = index.ntotal
+    ids = np.arange(index.ntotal, dtype=np.int64) if labels is None else np.asarray(labels, dtype=np.int64)
+    faiss.copy_array_to_vector(ids, wrapper.id_map)
+    wrapper.construct_rev_map()
+    return wrapper
+
+
+def index_nbytes(index):
+    """Serialized size of the index, a close proxy for its resident memory."""
+    import faiss
+
+    return int(faiss.serialize_index(index).nbytes)
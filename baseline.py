@@ -1,14 +1,21 @@
 import json
-import faiss
 import numpy as np
-import torch
 import random
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer
+
+from ann_index import build_ann_index
+from bm25 import BM25Index
+from embedding_cache import EmbeddingCache
+from encoder import load_encoder
+from parallel_encode import SHARD_SIZE, encode_sharded
+from recipe_store import concat_recipes, load_recipes as load_dataset
+from rerank import load_reranker
+from retrieval import QUERY_BATCH_SIZE, retrieve_batched
+from tracing import TRACER, Profiler
 
 # ======== Config ========
-DATA_1_PATH = "RecipeNLG_dataset/recipes_nlg_clean.json"
-DATA_2_PATH = "Spoonacular_API/spoonacular_dataset.json"
+DATA_1_PATH = "RecipeNLG_dataset/recipes_nlg_clean.jsonl"
+DATA_2_PATH = "Spoonacular_API/spoonacular_dataset.jsonl"
 QUERIES_PATH = "manual_queries.json"
 OUTPUT_PATH = "retrieval_results/faiss_fusion_results.json"
 
@@ -16,81 +23,140 @@ EMBED_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
 TOP_K = 5
 SEED = 42
 
-# ======== Reproducibility ========
-np.random.seed(SEED)
-random.seed(SEED)
-torch.manual_seed(SEED)
-if torch.cuda.is_available():
-    torch.cuda.manual_seed_all(SEED)
-torch.backends.cudnn.deterministic = True
+CACHE_DIR = "embedding_cache"  # set to None to always re-encode
+CACHE_DTYPE = "float32"        # or "float16" to halve the on-disk size
+ENCODE_WORKERS = 1             # >1: sharded multi-process encoding, see parallel_encode.py
+INDEX_DIR = "index"            # written by build_index.py, read by query_index.py
+INDEX_TYPE = "flat"            # flat | flat_fp16 | flat_sq8 | flat_pq | hnsw | ivf_flat | ivf_pq, see ann_index.py
+INDEX_PARAMS = {}              # e.g. {"nprobe": 32} or {"ef_search": 128}
+SEARCH_MODE = "dense"          # dense | bm25 | hybrid (BM25 + FAISS fusion)
+FUSION = "rrf"                 # rrf | weighted, used by hybrid mode
+RERANK = False                 # re-rank candidates with a cross-encoder, see rerank.py
+TRACE_PATH = None              # e.g. "trace.json" or "trace.prom": stage timings, peak RSS, counters
+PROFILE_PATH = None            # e.g. "baseline.prof": cProfile stats of the whole run
 
-# ======== Step 1: Load data ========
-print("Loading datasets...")
 
-def load_json(path):
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        print(f" Warning: {path} not found, skipping.")
-        return []
+# ======== Reproducibility ========
+def set_seed(seed=SEED):
+    import torch  # imported here so modules that only need build_text / config stay light
 
-data1 = load_json(DATA_1_PATH)
-data2 = load_json(DATA_2_PATH)
-recipes = data1 + data2
+    np.random.seed(seed)
+    random.seed(seed)
+    torch.manual_seed(seed)
+    if torch.cuda.is_available():
+        torch.cuda.manual_seed_all(seed)
+    torch.backends.cudnn.deterministic = True
 
-print(f"Loaded {len(recipes)} total recipes ({len(data1)} from RecipeNLG, {len(data2)} from Spoonacular).")
 
-with open(QUERIES_PATH, "r", encoding="utf-8") as f:
-    queries = json.load(f)
+# ======== Step 1: Load data ========
+def load_recipes(paths=None):
+    """
+    RecipeNLG + Spoonacular, or the given `paths`; each may be a
+    .json/.jsonl/.parquet file or a recipe_store directory.
+    """
+    paths = paths or [DATA_1_PATH, DATA_2_PATH]
+    with TRACER.stage("load_data"):
+        parts = [load_dataset(path) for path in paths]
+        recipes = concat_recipes(parts)
+    counts = ", ".join(f"{len(part)} from {path}" for part, path in zip(parts, paths))
+    print(f"Loaded {len(recipes)} total recipes ({counts}).")
+    return recipes
 
-model = SentenceTransformer(EMBED_MODEL)
 
 # ======== Step 2: Build embeddings ========
-print("Encoding all recipes...")
-
 def build_text(r):
     title = r.get("title", "")
     ingredients = " ".join(r.get("ingredients", []))
     instructions = r.get("instructions", "")
     return f"{title} {ingredients} {instructions}".strip()
 
-texts = [build_text(r) for r in recipes]
-embeddings = model.encode(texts, show_progress_bar=True, batch_size=64, convert_to_numpy=True)
 
-dim = embeddings.shape[1]
-print(f"Embedding dimension: {dim}")
+def encode_corpus(model, texts, workers=ENCODE_WORKERS, shard_size=SHARD_SIZE):
+    """
+    Encode corpus texts, reusing vectors from the on-disk cache when enabled.
+    With `workers` > 1 the texts are encoded by a process pool (`model` is
+    unused) and each shard is saved to the cache as it finishes.
+    """
+    TRACER.count("texts_encoded", len(texts))
+    with TRACER.stage("encode_corpus"):
+        return _encode_corpus(model, texts, workers, shard_size)
+
+
+def _encode_corpus(model, texts, workers, shard_size):
+    if workers > 1:
+        if not CACHE_DIR:
+            raise ValueError("Sharded encoding stores its shards in CACHE_DIR; set it to a directory.")
+        return encode_sharded(texts, EMBED_MODEL, CACHE_DIR, workers, shard_size, dtype=CACHE_DTYPE)
+
+    def encode(batch):
+        return model.encode(batch, show_progress_bar=True, batch_size=64, convert_to_numpy=True)
+
+    if not CACHE_DIR:
+        return encode(texts)
+    cache = EmbeddingCache(CACHE_DIR, EMBED_MODEL, dtype=CACHE_DTYPE)
+    return cache.get_or_encode(texts, encode)
+
 
 # ======== Step 3: Build FAISS index ========
-index = faiss.IndexFlatIP(dim)
-faiss.normalize_L2(embeddings)
-index.add(embeddings)
-print(f"FAISS index built with {index.ntotal} recipes.")
+def build_index(embeddings, kind=INDEX_TYPE, **params):
+    """Normalize `embeddings` in place and index them; returns (index, resolved params)."""
+    import faiss  # not at module level: query_index.py imports this module for retrieve
+
+    dim = embeddings.shape[1]
+    print(f"Embedding dimension: {dim}")
+    with TRACER.stage("normalize"):
+        faiss.normalize_L2(embeddings)
+    with TRACER.stage("index_build"):
+        index, resolved = build_ann_index(embeddings, kind, **{**INDEX_PARAMS, **params})
+    TRACER.count("vectors_indexed", index.ntotal)
+    print(f"FAISS {kind} index built with {index.ntotal} recipes.")
+    return index, resolved
+
 
 # ======== Step 4: Query retrieval ========
-results = []
-for q in tqdm(queries, desc="Retrieving"):
-    q_emb = model.encode(q["query"], convert_to_numpy=True)
-    q_emb = np.expand_dims(q_emb, axis=0)
-    faiss.normalize_L2(q_emb)
-    D, I = index.search(q_emb, TOP_K)
-
-    matched = [
-        {
-            "rank": int(rank + 1),
-            "score": float(D[0][rank]),
-            "recipe": recipes[int(I[0][rank])]
-        }
-        for rank in range(TOP_K)
-    ]
-    results.append({
-        "query_id": q["id"],
-        "query": q["query"],
-        "results": matched
-    })
-
-# ======== Step 5: Save ========
-with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-    json.dump(results, f, indent=2, ensure_ascii=False)
-
-print(f"Retrieval results saved to {OUTPUT_PATH}")
+def retrieve(model, index, recipes, queries, top_k=TOP_K, batch_size=QUERY_BATCH_SIZE, **search_opts):
+    """`search_opts` (mode, bm25, fusion, mask, reranker) are passed to retrieval.retrieve_batched."""
+    stream = retrieve_batched(model, index, recipes, queries, top_k, batch_size, **search_opts)
+    return list(tqdm(stream, total=len(queries), desc="Retrieving"))
+
+
+def main():
+    set_seed()
+    profiler = Profiler(PROFILE_PATH)
+    with profiler:
+        run()
+    profiler.dump()
+    print(TRACER.report())
+    if TRACE_PATH:
+        TRACER.save(TRACE_PATH)
+
+
+def run():
+    print("Loading datasets...")
+    recipes = load_recipes()
+    with TRACER.stage("load_queries"), open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    with TRACER.stage("load_model"):
+        model = load_encoder(EMBED_MODEL)
+
+    print("Encoding all recipes...")
+    with TRACER.stage("build_text"):
+        texts = [build_text(r) for r in recipes]
+    embeddings = encode_corpus(model, texts)
+
+    index, _ = build_index(embeddings)
+    bm25 = BM25Index.build(recipes) if SEARCH_MODE != "dense" else None
+    reranker = load_reranker() if RERANK else None
+    results = retrieve(model, index, recipes, queries, mode=SEARCH_MODE, bm25=bm25, fusion=FUSION,
+                       reranker=reranker)
+
+    # ======== Step 5: Save ========
+    with TRACER.stage("save_results"), open(OUTPUT_PATH, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    print(f"Retrieval results saved to {OUTPUT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
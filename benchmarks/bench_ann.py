@@ -0,0 +1,134 @@
+"""
+Speed/recall/memory benchmark for the index modes in ann_index.py,
+including the compressed flat storage formats (float16, SQ8, PQ).
+
+Run from the repo root after `python build_index.py`:
+    python -m benchmarks.bench_ann --configs flat hnsw:ef_search=64 ivf_pq:nprobe=16
+    python -m benchmarks.bench_ann --configs flat flat_fp16 flat_sq8 flat_pq:pq_m=48 flat_pq:pq_m=96
+"""
+import argparse
+import json
+import time
+
+import faiss
+import numpy as np
+
+from ann_index import build_ann_index, index_nbytes
+from baseline import EMBED_MODEL, INDEX_DIR, QUERIES_PATH
+from index_store import EMBEDDINGS_FILE
+
+# ======== Config ========
+DEFAULT_CONFIGS = [
+    "flat", "flat_fp16", "flat_sq8", "flat_pq",
+    "hnsw:ef_search=32", "hnsw:ef_search=128",
+    "ivf_flat:nprobe=4", "ivf_flat:nprobe=16",
+    "ivf_pq:nprobe=8", "ivf_pq:nprobe=32",
+]
+N_SYNTHETIC = 1000
+SYNTHETIC_NOISE = 0.05
+LATENCY_SAMPLES = 200
+
+
+def parse_config(spec):
+    """'ivf_pq:nprobe=16,pq_m=48' -> ('ivf_pq', {'nprobe': 16, 'pq_m': 48})"""
+    kind, _, rest = spec.partition(":")
+    params = {}
+    for item in filter(None, rest.split(",")):
+        key, _, value = item.partition("=")
+        params[key] = int(value)
+    return kind, params
+
+
+def synthetic_queries(embeddings, n, noise, seed=42):
+    """Perturbed corpus vectors: cheap stand-ins for real query embeddings."""
+    rng = np.random.default_rng(seed)
+    rows = rng.choice(len(embeddings), min(n, len(embeddings)), replace=False)
+    q = np.asarray(embeddings[rows], dtype=np.float32) + rng.normal(0, noise, (len(rows), embeddings.shape[1]))
+    q = np.ascontiguousarray(q, dtype=np.float32)
+    faiss.normalize_L2(q)
+    return q
+
+
+def manual_queries(path, model_name):
+    from sentence_transformers import SentenceTransformer
+
+    with open(path, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    model = SentenceTransformer(model_name)
+    q = model.encode([x["query"] for x in queries], convert_to_numpy=True).astype(np.float32)
+    faiss.normalize_L2(q)
+    return q
+
+
+def recall_at_k(found, truth, k):
+    hits = sum(len(set(f[:k]) & set(t[:k])) for f, t in zip(found, truth))
+    return hits / (len(truth) * k)
+
+
+def bench_one(kind, params, embeddings, query_sets, ground_truth, k):
+    start = time.perf_counter()
+    index, resolved = build_ann_index(embeddings, kind, **params)
+    build_s = time.perf_counter() - start
+
+    nbytes = index_nbytes(index)
+    row = {
+        "config": kind + (":" + ",".join(f"{a}={b}" for a, b in params.items()) if params else ""),
+        "build_s": build_s,
+        "bytes_per_vector": nbytes / index.ntotal,
+        "compression": 4 * index.d * index.ntotal / nbytes,  # vs. float32 flat
+        "index_mb": nbytes / 2**20,
+    }
+    for name, q in query_sets.items():
+        start = time.perf_counter()
+        _, I = index.search(q, k)
+        row[f"{name}_qps"] = len(q) / (time.perf_counter() - start)
+
+        lat = []
+        for i in range(min(LATENCY_SAMPLES, len(q))):
+            t = time.perf_counter()
+            index.search(q[i:i + 1], k)
+            lat.append((time.perf_counter() - t) * 1000)
+        row[f"{name}_p50_ms"] = float(np.percentile(lat, 50))
+        row[f"{name}_p99_ms"] = float(np.percentile(lat, 99))
+        row[f"{name}_recall@{k}"] = recall_at_k(I, ground_truth[name], k)
+        row[f"{name}_recall_loss"] = 1.0 - row[f"{name}_recall@{k}"]
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark FAISS index modes against the flat index.")
+    parser.add_argument("--index-dir", default=INDEX_DIR, help="directory written by build_index.py")
+    parser.add_argument("--configs", nargs="+", default=DEFAULT_CONFIGS)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--synthetic", type=int, default=N_SYNTHETIC)
+    parser.add_argument("--no-manual", action="store_true", help="skip encoding manual_queries.json")
+    parser.add_argument("--output", help="write the result rows as JSON")
+    args = parser.parse_args()
+
+    embeddings = np.load(f"{args.index_dir}/{EMBEDDINGS_FILE}", mmap_mode="r")
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    print(f"Benchmarking on {len(embeddings)} vectors of dim {embeddings.shape[1]}")
+
+    query_sets = {"synthetic": synthetic_queries(embeddings, args.synthetic, SYNTHETIC_NOISE)}
+    if not args.no_manual:
+        query_sets["manual"] = manual_queries(QUERIES_PATH, EMBED_MODEL)
+
+    exact = faiss.IndexFlatIP(embeddings.shape[1])
+    exact.add(embeddings)
+    ground_truth = {name: exact.search(q, args.top_k)[1] for name, q in query_sets.items()}
+
+    rows = []
+    for spec in args.configs:
+        kind, params = parse_config(spec)
+        row = bench_one(kind, params, embeddings, query_sets, ground_truth, args.top_k)
+        rows.append(row)
+        print("  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+        print(f"Saved benchmark results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Throughput of batched retrieval (retrieval.search_batched) versus the
+original one-query-at-a-time loop.
+
+Run from the repo root after `python build_index.py`:
+    python -m benchmarks.bench_batch_query --n-queries 10000 --batch-sizes 1 32 256
+"""
+import argparse
+import json
+import random
+import time
+
+import faiss
+import numpy as np
+
+from baseline import INDEX_DIR, QUERIES_PATH, TOP_K
+from index_store import IndexStore
+from retrieval import search_batched
+
+# ======== Config ========
+N_QUERIES = 2000
+BATCH_SIZES = (1, 16, 64, 256, 1024)
+
+
+def make_queries(store, n, seed=42):
+    """Manual queries plus recipe titles as query text, `n` in total."""
+    with open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        queries = [{"id": q["id"], "query": q["query"]} for q in json.load(f)]
+    rng = random.Random(seed)
+    while len(queries) < n:
+        row = rng.randrange(len(store))
+        queries.append({"id": f"title_{row}", "query": store[row].get("title", "")})
+    return queries[:n]
+
+
+def per_query_loop(model, index, queries, top_k):
+    """The pre-batching Step 4 of baseline.py."""
+    for q in queries:
+        q_emb = model.encode(q["query"], convert_to_numpy=True)
+        q_emb = np.expand_dims(q_emb, axis=0)
+        faiss.normalize_L2(q_emb)
+        index.search(q_emb, top_k)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Per-query vs batched retrieval throughput.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--n-queries", type=int, default=N_QUERIES)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=list(BATCH_SIZES))
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+
+    store = IndexStore(args.index_dir)
+    model = SentenceTransformer(store.meta["model"])
+    queries = make_queries(store, args.n_queries)
+    model.encode(["warm up"], convert_to_numpy=True)
+
+    base = timed(lambda: per_query_loop(model, store.index, queries, args.top_k))
+    print(f"per-query loop : {len(queries) / base:9.1f} queries/s  ({base:.2f}s)")
+
+    for bs in args.batch_sizes:
+        elapsed = timed(lambda: sum(1 for _ in search_batched(model, store.index, queries, args.top_k, bs)))
+        print(f"batch_size={bs:<5}: {len(queries) / elapsed:9.1f} queries/s  ({elapsed:.2f}s, {base / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Candidate pool generation: the compiled single-pass matcher vs. checking
+every spec recipe by recipe (the old manual_selection_script loops), on
+a plain recipe list and on a columnar store. Pools must be identical.
+
+Run from the repo root (build a store first to time the store path):
+    python recipe_store.py build RecipeNLG_dataset/recipes_nlg_clean.jsonl RecipeNLG_dataset/recipes_nlg.store
+    python -m benchmarks.bench_candidate_pools --store RecipeNLG_dataset/recipes_nlg.store
+"""
+import argparse
+import json
+import time
+
+from candidate_pools import BLOCK_ROWS, RECIPE_PATHS, SPECS_PATH, load_specs, run_specs
+from recipe_store import load_recipes
+
+# ======== Config ========
+FULL_CORPUS = 2_231_142   # recipes in the full RecipeNLG dataset, for the extrapolated time
+
+
+def timed(label, n, fn):
+    start = time.perf_counter()
+    pools = fn()
+    elapsed = time.perf_counter() - start
+    row = {"method": label, "recipes": n, "seconds": elapsed, "recipes_per_s": n / elapsed,
+           "full_corpus_s": FULL_CORPUS * elapsed / n}
+    return row, {name: list(map(int, rows)) for name, rows in pools.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare vectorized and per-recipe candidate pool generation.")
+    parser.add_argument("--specs", default=SPECS_PATH)
+    parser.add_argument("--recipes", default=RECIPE_PATHS[0], help="recipe file for the list-based runs")
+    parser.add_argument("--store", help="recipe_store directory for the store-based run")
+    parser.add_argument("--block-rows", type=int, default=BLOCK_ROWS)
+    parser.add_argument("--output", help="write the result rows as JSON")
+    args = parser.parse_args()
+
+    specs = load_specs(args.specs)
+    recipes = load_recipes(args.recipes)
+    if not len(recipes):
+        return
+    rows = []
+    row, reference = timed("per_recipe", len(recipes), lambda: {
+        spec.name: [i for i, r in enumerate(recipes) if spec.matches(r)] for spec in specs})
+    rows.append(row)
+    row, pools = timed("compiled_list", len(recipes), lambda: run_specs(recipes, specs, args.block_rows))
+    rows.append({**row, "identical": pools == reference})
+    if args.store:
+        store = load_recipes(args.store)
+        row, pools = timed("compiled_store", len(store), lambda: run_specs(store, specs, args.block_rows))
+        rows.append({**row, "identical": pools == reference if len(store) == len(recipes) else None})
+    for row in rows:
+        print("  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+    for name, ids in reference.items():
+        print(f"  {name:<28}{len(ids):>8} matches")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Chunk-level vs. single-vector dense retrieval: index size, query latency
+and evaluator.py metrics on manual_queries.json (relevance as in
+benchmarks/bench_hybrid.py).
+
+Build both indexes over the same corpus first:
+    python build_index.py --out index
+    python build_index.py --out index_chunks --chunk
+    python -m benchmarks.bench_chunks --index-dir index --chunk-dir index_chunks
+"""
+import argparse
+import json
+import os
+
+from baseline import INDEX_DIR, QUERIES_PATH, build_text
+from benchmarks.bench_hybrid import KS, load_manual_qrels, run_config
+from chunking import AGGREGATIONS, CHUNK_WORDS, open_search_index
+from index_store import EMBEDDINGS_FILE, INDEX_FILE, IndexStore
+from retrieval import search_batched
+
+# ======== Config ========
+CHUNK_INDEX_DIR = "index_chunks"
+
+
+def index_size(index_dir):
+    """Vectors and on-disk bytes of index.faiss + embeddings.npy."""
+    store = IndexStore(index_dir)
+    row = {
+        "vectors": int(store.index.ntotal),
+        "index_mb": os.path.getsize(os.path.join(index_dir, INDEX_FILE)) / 2**20,
+        "embeddings_mb": os.path.getsize(os.path.join(index_dir, EMBEDDINGS_FILE)) / 2**20,
+    }
+    return store, row
+
+
+def main():
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Compare chunk-level and single-vector indexes.")
+    parser.add_argument("--index-dir", default=INDEX_DIR, help="single-vector build")
+    parser.add_argument("--chunk-dir", default=CHUNK_INDEX_DIR, help="build_index.py --chunk output")
+    parser.add_argument("--output", help="write the result rows as JSON")
+    args = parser.parse_args()
+
+    base, base_size = index_size(args.index_dir)
+    chunked, chunk_size = index_size(args.chunk_dir)
+    if len(base) != len(chunked):
+        raise ValueError(f"Indexes hold different corpora ({len(base)} vs {len(chunked)} recipes).")
+    long = sum(len(build_text(base[i]).split()) > CHUNK_WORDS for i in range(len(base)))
+    print(f"{long} of {len(base)} recipes ({long / max(len(base), 1):.1%}) exceed {CHUNK_WORDS} words "
+          f"and are truncated by the single-vector encoder.")
+
+    model = SentenceTransformer(base.meta["model"])
+    model.encode(["warm up"], convert_to_numpy=True)
+    with open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    qrels = {qid: rel for qid, rel in load_manual_qrels().items() if rel}
+    queries = [q for q in queries if str(q["id"]) in qrels]
+    top_k = max(KS)
+
+    def searcher(index):
+        return lambda qs, k: search_batched(model, index, qs, k)
+
+    rows = [{**run_config("single_vector", searcher(base.index), base, queries, qrels, top_k), **base_size}]
+    for how in AGGREGATIONS:
+        index = open_search_index(chunked, how)
+        rows.append({**run_config(f"chunks_{how}", searcher(index), chunked, queries, qrels, top_k), **chunk_size})
+    for row in rows:
+        row["size_x"] = (row["index_mb"] + row["embeddings_mb"]) / (base_size["index_mb"] + base_size["embeddings_mb"])
+        row["latency_x"] = row["p50_ms"] / rows[0]["p50_ms"] if rows[0]["p50_ms"] else 0.0
+        print("  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
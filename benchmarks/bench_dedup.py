@@ -0,0 +1,68 @@
+"""
+Near-duplicate collapse on the full corpus: recipes kept, index size
+saved and dedup throughput for MinHash/LSH at several thresholds, and
+optionally for embedding similarity over an existing single-vector index.
+
+Run from the repo root:
+    python -m benchmarks.bench_dedup --thresholds 0.7 0.8 0.9
+    python -m benchmarks.bench_dedup --index-dir index --cosine 0.95 0.98
+"""
+import argparse
+import json
+
+from baseline import build_text, load_recipes
+from dedup import EMBEDDING_THRESHOLD, MINHASH_THRESHOLD, dedup_recipes
+from index_store import IndexStore
+
+# ======== Config ========
+THRESHOLDS = (0.7, MINHASH_THRESHOLD, 0.9)
+EXAMPLES = 3  # largest clusters printed per run
+
+
+def report(recipes, variants, stats, bytes_per_vector):
+    stats["index_mb_before"] = stats["recipes"] * bytes_per_vector / 2**20
+    stats["index_mb_after"] = stats["kept"] * bytes_per_vector / 2**20
+    print("  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in stats.items()))
+    by_id = {str(r.get("id")): r for r in recipes}
+    for rep, ids in sorted(variants.items(), key=lambda kv: -len(kv[1]))[:EXAMPLES]:
+        print(f"    {len(ids) + 1} x {by_id[rep].get('title', '')!r}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure near-duplicate collapse on the corpus.")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=list(THRESHOLDS),
+                        help="MinHash Jaccard thresholds")
+    parser.add_argument("--index-dir", help="also cluster this index's embeddings (single-vector build)")
+    parser.add_argument("--cosine", type=float, nargs="+", default=[EMBEDDING_THRESHOLD],
+                        help="cosine thresholds for the embedding method")
+    parser.add_argument("--dim", type=int, default=384, help="vector size used for the index-size estimate")
+    parser.add_argument("--output", help="write the result rows as JSON")
+    args = parser.parse_args()
+
+    rows = []
+    bytes_per_vector = 4 * args.dim
+    if args.index_dir:
+        store = IndexStore(args.index_dir)
+        recipes = [store[i] for i in range(len(store))]
+        bytes_per_vector = 4 * store.index.d
+    else:
+        recipes = load_recipes()
+        recipes = [recipes[i] for i in range(len(recipes))]
+    texts = [build_text(r) for r in recipes]
+
+    for threshold in args.thresholds:
+        _, variants, stats = dedup_recipes(recipes, texts, "minhash", threshold)
+        rows.append(report(recipes, variants, {**stats, "threshold": threshold}, bytes_per_vector))
+    if args.index_dir:
+        for threshold in args.cosine:
+            _, variants, stats = dedup_recipes(recipes, texts, "embedding", threshold, store.embeddings)
+            rows.append(report(recipes, variants, {**stats, "threshold": threshold}, bytes_per_vector))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
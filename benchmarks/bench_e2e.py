@@ -0,0 +1,275 @@
+"""
+End-to-end retrieval benchmark: every retrieval configuration at several
+corpus sizes and client concurrency levels, scored against pseudo-qrels
+from benchmarks/loadgen.py.
+
+For each corpus size (a seeded prefix of one shuffled corpus, so smaller
+sizes are subsets of larger ones) the recipes are encoded once through
+the embedding cache, and each configuration builds its own index:
+  <index type>[:params]  dense search, e.g. flat, hnsw:ef_search=64
+  bm25                   BM25 only
+  hybrid                 flat dense + BM25, fused with RRF
+Corpus vectors always come from the PyTorch model; --backend only
+changes the query encoder, as on server.py.
+Queries then come from `concurrency` closed-loop client threads that each
+send one request and wait for its answer. Dense configurations are served
+by server.MicroBatcher, exactly as server.py serves them; bm25 and hybrid
+go through the same request batching around their batch functions. Each
+row records build time, index size, QPS, latency percentiles, recall@k
+and MRR.
+
+The results file holds the commit, host and settings plus one row per
+(corpus size, config, concurrency) with values rounded to 4 significant
+digits, so two runs can be compared with `diff` or with --diff.
+
+Run from the repo root:
+    python -m benchmarks.bench_e2e --sizes 5000 50000 full --output e2e_results.json
+    python -m benchmarks.bench_e2e --diff e2e_before.json e2e_results.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+from collections.abc import Sequence
+
+import faiss
+import numpy as np
+
+from ann_index import build_ann_index, index_nbytes
+from baseline import EMBED_MODEL, build_text, encode_corpus, load_recipes
+from benchmarks.bench_ann import parse_config
+from benchmarks.loadgen import make_queries
+from bm25 import BM25Index
+from encoder import ENCODER_BACKENDS, load_encoder
+from evaluator.eval_engine import evaluate
+from retrieval import format_hits, search_bm25, search_hybrid
+from server import MicroBatcher
+
+# ======== Config ========
+SIZES = ("5000", "50000", "500000", "full")
+CONFIGS = ("flat", "hnsw:ef_search=64", "ivf_flat:nprobe=16", "flat_sq8", "bm25", "hybrid")
+CONCURRENCY = (1, 8, 32)
+N_QUERIES = 2000
+TOP_K = 10
+KS = (1, 10)
+WARMUP = 20           # untimed requests per config before each measurement
+SEED = 42
+SIG_DIGITS = 4        # rounding of stored values, keeps result diffs readable
+DIFF_KEYS = ("build_s", "index_mb", "qps", "p50_ms", "p99_ms", "recall@1", f"recall@{TOP_K}", f"MRR@{TOP_K}")
+
+
+class Rows(Sequence):
+    """The recipes at `rows` of `recipes`, without copying them."""
+
+    def __init__(self, recipes, rows):
+        self.recipes = recipes
+        self.rows = rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        return self.recipes[int(self.rows[i])]
+
+
+class RunBatcher(MicroBatcher):
+    """MicroBatcher request batching around a retrieval.search_* style batch function."""
+
+    def __init__(self, search, recipes, **kwargs):
+        super().__init__(None, None, recipes, None, **kwargs)
+        self.run_search = search
+
+    def _serve(self, batch):
+        top_k = max(req.top_k for req in batch)
+        results = self.run_search([{"query": req.query} for req in batch], top_k)
+        for req, (_, scores, rows) in zip(batch, results):
+            req.future.set_result(format_hits(self.recipes, scores[:req.top_k], rows[:req.top_k]))
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def round_sig(value, digits=SIG_DIGITS):
+    if isinstance(value, float) and value:
+        return round(value, max(digits - 1 - int(np.floor(np.log10(abs(value)))), 0))
+    return value
+
+
+def resolve_sizes(sizes, n):
+    out = []
+    for size in sizes:
+        size = n if size == "full" else int(size)
+        if size > n:
+            print(f"Skipping corpus size {size}: only {n} recipes available.")
+        elif size not in out:
+            out.append(size)
+    return out
+
+
+def build_config(spec, embeddings, bm25, model, recipes):
+    """(batcher, build seconds, index bytes) for one configuration."""
+    if spec == "bm25":
+        return RunBatcher(lambda qs, k: search_bm25(bm25["index"], qs, k), recipes), bm25["build_s"], bm25["bytes"]
+    kind, params = ("flat", {}) if spec == "hybrid" else parse_config(spec)
+    start = time.perf_counter()
+    index, _ = build_ann_index(embeddings, kind, **params)
+    build_s, nbytes = time.perf_counter() - start, index_nbytes(index)
+    if spec == "hybrid":
+        search = lambda qs, k: search_hybrid(model, index, bm25["index"], qs, k)
+        return RunBatcher(search, recipes), build_s + bm25["build_s"], nbytes + bm25["bytes"]
+    return MicroBatcher(model, index, recipes, None), build_s, nbytes
+
+
+def drive(batcher, queries, concurrency, top_k):
+    """
+    Closed-loop load: `concurrency` clients each send the next query as soon
+    as their previous answer arrives. Returns (ranked ids, latency ms, wall s).
+    """
+    ranked, latency, lock, position = {}, {}, threading.Lock(), [0]
+
+    def client():
+        while True:
+            with lock:
+                i = position[0]
+                position[0] += 1
+            if i >= len(queries):
+                return
+            q = queries[i]
+            start = time.perf_counter()
+            hits = batcher.search(q["query"], top_k)
+            latency[q["id"]] = (time.perf_counter() - start) * 1000
+            ranked[q["id"]] = [str(h["recipe"].get("id")) for h in hits]
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return ranked, latency, time.perf_counter() - start
+
+
+def bench_size(size, corpus, order, corpus_model, model, configs, concurrency, n_queries, top_k):
+    recipes = Rows(corpus, np.sort(order[:size]))
+    queries, qrels = make_queries(recipes, n_queries, SEED)
+    texts = [build_text(r) for r in recipes]
+    embeddings = np.array(encode_corpus(corpus_model, texts), dtype=np.float32)
+    faiss.normalize_L2(embeddings)
+    bm25 = {}
+    if {"bm25", "hybrid"} & set(configs):
+        start = time.perf_counter()
+        bm25["index"] = BM25Index.build(recipes)
+        bm25["build_s"] = time.perf_counter() - start
+        w = bm25["index"].weights
+        bm25["bytes"] = w.data.nbytes + w.indices.nbytes + w.indptr.nbytes
+
+    ks = sorted({k for k in KS if k < top_k} | {top_k})
+    rows = []
+    for spec in configs:
+        batcher, build_s, nbytes = build_config(spec, embeddings, bm25, model, recipes)
+        for q in queries[:WARMUP]:
+            batcher.search(q["query"], top_k)
+        for clients in concurrency:
+            ranked, latency, wall = drive(batcher, queries, clients, top_k)
+            summary, _, _ = evaluate(ranked, qrels, ks, latency, wall)
+            row = {
+                "corpus_size": size, "config": spec, "concurrency": clients,
+                "build_s": build_s, "index_mb": nbytes / 2**20,
+                "qps": summary["throughput_qps"], "p50_ms": summary["latency_p50_ms"],
+                "p90_ms": summary["latency_p90_ms"], "p99_ms": summary["latency_p99_ms"],
+                **{f"recall@{k}": summary[f"HR@{k}"] for k in ks},
+                f"MRR@{top_k}": summary[f"MRR@{top_k}"],
+            }
+            row = {k: round_sig(v) for k, v in row.items()}
+            rows.append(row)
+            print("  ".join(f"{k}={v}" for k, v in row.items()))
+        batcher.close()
+    return rows
+
+
+def row_key(row):
+    return row["corpus_size"], row["config"], row["concurrency"]
+
+
+def diff_results(old_path, new_path, keys=DIFF_KEYS):
+    """Print the relative change of `keys` for every row present in both result files."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"{old_path} ({old.get('commit')}) -> {new_path} ({new.get('commit')})")
+    before = {row_key(r): r for r in old["rows"]}
+    for row in new["rows"]:
+        prev = before.get(row_key(row))
+        if prev is None:
+            print(f"  {row_key(row)}: new")
+            continue
+        changes = [f"{k} {prev[k]} -> {row[k]} ({(row[k] - prev[k]) / prev[k]:+.1%})" if prev[k] else
+                   f"{k} {prev[k]} -> {row[k]}"
+                   for k in keys if k in row and k in prev and row[k] != prev[k]]
+        print(f"  {row_key(row)}: " + ("; ".join(changes) or "unchanged"))
+    for key in before.keys() - {row_key(r) for r in new["rows"]}:
+        print(f"  {key}: removed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end retrieval benchmark over corpus sizes and concurrency.")
+    parser.add_argument("--data", nargs="+", help="recipe files / stores (default: DATA_1_PATH, DATA_2_PATH)")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), help='corpus sizes, or "full"')
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS))
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(CONCURRENCY))
+    parser.add_argument("--n-queries", type=int, default=N_QUERIES)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--backend", default="torch", choices=ENCODER_BACKENDS, help="query encoder runtime")
+    parser.add_argument("--output", default="e2e_results.json", help="results file")
+    parser.add_argument("--diff", nargs=2, metavar=("OLD", "NEW"), help="compare two results files and exit")
+    args = parser.parse_args()
+    if args.diff:
+        return diff_results(*args.diff)
+
+    corpus = load_recipes(args.data)
+    order = np.random.default_rng(SEED).permutation(len(corpus))
+    sizes = resolve_sizes(args.sizes, len(corpus))
+    # corpus vectors always come from the PyTorch model, as in build_index.py: they are
+    # shared with it through the embedding cache, which is keyed by model name only
+    corpus_model = load_encoder(EMBED_MODEL)
+    model = corpus_model if args.backend == "torch" else load_encoder(EMBED_MODEL, args.backend)
+    model.encode(["warm up"], convert_to_numpy=True)
+
+    rows = []
+    for size in sizes:
+        print(f"Corpus size {size}:")
+        rows += bench_size(size, corpus, order, corpus_model, model, args.configs, args.concurrency,
+                           args.n_queries, args.top_k)
+
+    results = {
+        "commit": git_commit(),
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "host": {"platform": platform.platform(), "cpus": os.cpu_count(), "python": platform.python_version(),
+                 "numpy": np.__version__, "faiss": faiss.__version__},
+        "settings": {"model": EMBED_MODEL, "backend": args.backend, "corpus": len(corpus), "sizes": sizes,
+                     "configs": args.configs, "concurrency": args.concurrency, "n_queries": args.n_queries,
+                     "top_k": args.top_k, "seed": SEED},
+        "rows": sorted(rows, key=row_key),
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"Saved {len(rows)} result rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Query encoder backends: load time, encoding throughput, and how closely
+the ONNX / int8 vectors and top-k results track the PyTorch model the
+index was built with.
+
+Queries are manual_queries.json plus recipe titles from the index, so
+there are enough of them to time batched encoding.
+
+Run from the repo root after `python build_index.py`:
+    python -m benchmarks.bench_encoder --backends torch onnx onnx-int8
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from baseline import INDEX_DIR, QUERIES_PATH
+from encoder import ENCODER_BACKENDS, load_encoder
+from index_store import IndexStore
+from retrieval import encode_queries
+
+# ======== Config ========
+N_QUERIES = 512
+BATCH_SIZES = (1, 32)
+TOP_K = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare query encoder backends.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--backends", nargs="+", default=list(ENCODER_BACKENDS), choices=ENCODER_BACKENDS)
+    parser.add_argument("--n-queries", type=int, default=N_QUERIES)
+    parser.add_argument("--output", help="write the result rows as JSON")
+    args = parser.parse_args()
+
+    store = IndexStore(args.index_dir)
+    with open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        texts = [q["query"] for q in json.load(f)]
+    step = max(1, len(store) // args.n_queries)
+    texts += [store[i].get("title", "") for i in range(0, len(store), step)]
+    texts = texts[:args.n_queries]
+
+    rows, reference = [], None
+    for backend in ["torch"] + [b for b in args.backends if b != "torch"]:
+        start = time.perf_counter()
+        model = load_encoder(store.meta["model"], backend)
+        model.encode(["warm up"], convert_to_numpy=True)
+        row = {"backend": backend, "load_s": time.perf_counter() - start}
+        for batch_size in BATCH_SIZES:
+            start = time.perf_counter()
+            for i in range(0, len(texts), batch_size):
+                q_emb = encode_queries(model, texts[i:i + batch_size], batch_size)
+            row[f"qps_batch{batch_size}"] = len(texts) / (time.perf_counter() - start)
+        q_emb = encode_queries(model, texts)
+        _, I = store.index.search(q_emb, TOP_K)
+        if reference is None:
+            reference = (q_emb, I)
+        row["cosine_vs_torch"] = float(np.mean(np.sum(q_emb * reference[0], axis=1)))
+        row[f"top{TOP_K}_overlap_vs_torch"] = float(np.mean(
+            [len(set(a) & set(b)) / TOP_K for a, b in zip(I, reference[1])]))
+        row["speedup_batch1"] = row["qps_batch1"] / rows[0]["qps_batch1"] if rows else 1.0
+        rows.append(row)
+        print("  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+    if "torch" not in args.backends:
+        rows = rows[1:]
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Dense vs. BM25 vs. hybrid retrieval: per-query latency and evaluator.py
+metrics on manual_queries.json.
+
+Relevance comes from the hand-built pools in manual.json plus every
+result labeled valid=1 in retrieval_results/manual_faiss_fusion_results.json.
+
+Run from the repo root after `python build_index.py`:
+    python -m benchmarks.bench_hybrid
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from baseline import INDEX_DIR, QUERIES_PATH
+from bm25 import BM25Index
+from evaluator.evaluator import (
+    average_precision_at_k, hit_rate_at_k, mrr_at_k, ndcg_at_k, precision_at_k,
+)
+from index_store import IndexStore
+from retrieval import search_batched, search_bm25, search_hybrid
+
+# ======== Config ========
+QRELS_SOURCES = ("manual.json", "retrieval_results/manual_faiss_fusion_results.json")
+KS = (1, 3, 5)
+REPEATS = 5  # timing repetitions per query
+
+
+def load_manual_qrels(paths=QRELS_SOURCES):
+    """{query_id: set(relevant recipe ids)} from the manual pools and labeled runs."""
+    qrels = {}
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for block in json.load(f):
+                rel = qrels.setdefault(str(block["query_id"]), set())
+                for hit in block["results"]:
+                    recipe = hit.get("recipe", hit)
+                    if hit.get("valid", 1):
+                        rel.add(str(recipe.get("id")))
+    return qrels
+
+
+def run_config(name, search, store, queries, qrels, top_k):
+    labels, latencies = {}, []
+    for q in queries:
+        samples = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            _, _, rows = next(search([q], top_k))
+            samples.append((time.perf_counter() - start) * 1000)
+        latencies.append(min(samples))
+        ids = [str(store.ids[int(r)]) if r >= 0 else None for r in rows]
+        rel = qrels.get(str(q["id"]), set())
+        labels[str(q["id"])] = [int(i in rel) for i in ids] + [0] * (top_k - len(ids))
+
+    row = {"config": name, "p50_ms": float(np.percentile(latencies, 50)),
+           "p99_ms": float(np.percentile(latencies, 99))}
+    for metric, fn in (("P", precision_at_k), ("HR", hit_rate_at_k), ("MRR", mrr_at_k),
+                       ("MAP", average_precision_at_k), ("NDCG", ndcg_at_k)):
+        for k in KS:
+            row[f"{metric}@{k}"] = float(np.mean([fn(l, k) for l in labels.values()]))
+    return row
+
+
+def main():
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Compare dense, BM25 and hybrid retrieval.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--output", help="write the result rows as JSON")
+    args = parser.parse_args()
+
+    store = IndexStore(args.index_dir)
+    bm25 = BM25Index.load(args.index_dir)
+    model = SentenceTransformer(store.meta["model"])
+    model.encode(["warm up"], convert_to_numpy=True)
+    with open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    qrels = load_manual_qrels()
+    qrels = {qid: rel for qid, rel in qrels.items() if rel}
+    queries = [q for q in queries if str(q["id"]) in qrels]
+    top_k = max(KS)
+
+    configs = {
+        "dense": lambda qs, k: search_batched(model, store.index, qs, k),
+        "bm25": lambda qs, k: search_bm25(bm25, qs, k),
+        "hybrid_rrf": lambda qs, k: search_hybrid(model, store.index, bm25, qs, k, fusion="rrf"),
+        "hybrid_weighted": lambda qs, k: search_hybrid(model, store.index, bm25, qs, k, fusion="weighted"),
+    }
+    rows = [run_config(name, fn, store, queries, qrels, top_k) for name, fn in configs.items()]
+    for row in rows:
+        print("  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
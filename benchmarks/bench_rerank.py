@@ -0,0 +1,73 @@
+"""
+Cross-encoder re-ranking: quality gained per millisecond added.
+
+Runs dense retrieval alone and dense + cross-encoder re-ranking at several
+fixed candidate counts N (score cache off, so every query pays the full
+cost), plus the adaptive-budget setting. Relevance and metrics are the
+same as benchmarks/bench_hybrid.py.
+
+Run from the repo root after `python build_index.py`:
+    python -m benchmarks.bench_rerank --candidates 10 20 50 100
+"""
+import argparse
+import json
+
+from baseline import INDEX_DIR, QUERIES_PATH
+from benchmarks.bench_hybrid import KS, load_manual_qrels, run_config
+from index_store import IndexStore
+from rerank import RERANK_BUDGET_MS, RERANK_MODEL, Reranker, load_reranker
+from retrieval import search_batched
+
+# ======== Config ========
+CANDIDATES = (10, 20, 50, 100)
+GAIN_METRIC = "NDCG@5"
+
+
+def main():
+    from sentence_transformers import SentenceTransformer
+
+    parser = argparse.ArgumentParser(description="Measure the quality / latency trade-off of re-ranking.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--rerank-model", default=RERANK_MODEL)
+    parser.add_argument("--candidates", type=int, nargs="+", default=list(CANDIDATES))
+    parser.add_argument("--output", help="write the result rows as JSON")
+    args = parser.parse_args()
+
+    store = IndexStore(args.index_dir)
+    model = SentenceTransformer(store.meta["model"])
+    model.encode(["warm up"], convert_to_numpy=True)
+    cross = load_reranker(args.rerank_model, cache=False).model
+    cross.predict([("warm up", "warm up")], show_progress_bar=False)
+    with open(QUERIES_PATH, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+    qrels = {qid: rel for qid, rel in load_manual_qrels().items() if rel}
+    queries = [q for q in queries if str(q["id"]) in qrels]
+    top_k = max(KS)
+
+    def reranked(reranker):
+        def search(qs, k):
+            first = search_batched(model, store.index, qs, max(k, reranker.max_candidates))
+            return reranker.rerank_stream(first, store, k, len(qs))
+        return search
+
+    configs = {"dense": lambda qs, k: search_batched(model, store.index, qs, k)}
+    for n in args.candidates:
+        configs[f"rerank_N{n}"] = reranked(Reranker(cross, args.rerank_model, n, n, budget_ms=None))
+    budgeted = Reranker(cross, args.rerank_model, max(args.candidates), budget_ms=RERANK_BUDGET_MS)
+    configs[f"rerank_budget{RERANK_BUDGET_MS}ms"] = reranked(budgeted)
+
+    rows = [run_config(name, fn, store, queries, qrels, top_k) for name, fn in configs.items()]
+    base = rows[0]
+    for row in rows:
+        added_ms = row["p50_ms"] - base["p50_ms"]
+        gain = row[GAIN_METRIC] - base[GAIN_METRIC]
+        row[f"{GAIN_METRIC}_gain_per_ms"] = gain / added_ms if added_ms > 0 else 0.0
+        print("  ".join(f"{k}={v:.4f}" if isinstance(v, float) else f"{k}={v}" for k, v in row.items()))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
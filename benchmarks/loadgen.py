@@ -0,0 +1,117 @@
+"""
+Synthetic query load with pseudo-qrels.
+
+Every query is written from one recipe's title and ingredients, and that
+recipe's `id` is its only relevant document. Duplicated titles across the
+corpus make the recall measured with these qrels a lower bound. Query
+shapes mimic manual_queries.json:
+  title        the title, lowercased, sometimes with a word dropped
+  question     "how do i make <title>" / "<title> recipe" / ...
+  ingredients  "<dish> with <ingredient> and <ingredient>"
+  keywords     a few title words plus one ingredient, shuffled
+
+    python -m benchmarks.loadgen --n 5000 --queries load_queries.json --qrels load_qrels.json
+    python query_index.py --queries load_queries.json --output load_run.json
+    python -m evaluator.eval_engine --qrels load_qrels.json --run load_run.json
+"""
+import argparse
+import json
+import random
+import re
+
+from baseline import load_recipes
+
+# ======== Config ========
+N_QUERIES = 2000
+SEED = 42
+KINDS = ("title", "question", "ingredients", "keywords")
+QUESTIONS = ("how do i make {}", "{} recipe", "recipe for {}", "easy {}", "best homemade {}")
+
+_WORD = re.compile(r"[a-z][a-z'-]*")
+_PARENS = re.compile(r"\([^)]*\)")
+# quantity / unit / preparation words stripped from raw ingredient lines
+_NOT_INGREDIENT = {
+    "cup", "cups", "c", "tablespoon", "tablespoons", "tbsp", "tbs", "teaspoon", "teaspoons", "tsp",
+    "ounce", "ounces", "oz", "pound", "pounds", "lb", "lbs", "g", "gram", "grams", "kg", "ml", "l",
+    "pinch", "dash", "can", "cans", "package", "packages", "pkg", "clove", "cloves", "slice", "slices",
+    "large", "medium", "small", "whole", "fresh", "chopped", "minced", "sliced", "diced", "grated",
+    "to", "taste", "of", "and", "or", "a", "an", "the", "for", "about", "optional", "plus", "more",
+}
+
+
+def ingredient_names(recipe):
+    """Short ingredient names: `ner` when present, else ingredient lines without amounts and units."""
+    if recipe.get("ner"):
+        return [str(x).lower() for x in recipe["ner"] if str(x).strip()]
+    names = []
+    for line in recipe.get("ingredients") or []:
+        line = _PARENS.sub(" ", str(line).lower()).split(",")[0]
+        words = [w for w in _WORD.findall(line) if w not in _NOT_INGREDIENT]
+        if words:
+            names.append(" ".join(words[-3:]))
+    return names
+
+
+def make_query(recipe, kind, rng):
+    title = " ".join(_WORD.findall(str(recipe.get("title") or "").lower()))
+    words = title.split()
+    ingredients = ingredient_names(recipe)
+    if kind == "title" or not words:
+        if len(words) > 3 and rng.random() < 0.5:
+            words.pop(rng.randrange(len(words)))
+        return " ".join(words)
+    if kind == "question":
+        return rng.choice(QUESTIONS).format(title)
+    if kind == "ingredients" and len(ingredients) >= 2:
+        a, b = rng.sample(ingredients, 2)
+        return f"{words[-1]} with {a} and {b}"
+    picked = rng.sample(words, min(len(words), rng.randint(2, 3)))
+    if ingredients:
+        picked.append(rng.choice(ingredients))
+    rng.shuffle(picked)
+    return " ".join(picked)
+
+
+def make_queries(recipes, n=N_QUERIES, seed=SEED, kinds=KINDS):
+    """
+    (queries, qrels): `n` query dicts {"id", "query", "kind"} over distinct
+    target recipes (with replacement once n exceeds the corpus), and
+    {query id: {target id: 1}} in the format read by evaluator/eval_engine.py.
+    """
+    if not len(recipes):
+        return [], {}
+    rng = random.Random(seed)
+    rows = rng.sample(range(len(recipes)), n) if n <= len(recipes) else [
+        rng.randrange(len(recipes)) for _ in range(n)]
+    queries, qrels = [], {}
+    for i, row in enumerate(rows):
+        recipe = recipes[row]
+        kind = kinds[i % len(kinds)]
+        text = make_query(recipe, kind, rng)
+        if not text:
+            continue
+        qid = f"load_{i}"
+        queries.append({"id": qid, "query": text, "kind": kind})
+        qrels[qid] = {str(recipe.get("id")): 1}
+    return queries, qrels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic queries with pseudo-qrels.")
+    parser.add_argument("--data", nargs="+", help="recipe files / stores (default: DATA_1_PATH, DATA_2_PATH)")
+    parser.add_argument("--n", type=int, default=N_QUERIES)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--queries", default="load_queries.json", help="output query file (query_index.py --queries)")
+    parser.add_argument("--qrels", default="load_qrels.json", help="output qrels file (eval_engine.py --qrels)")
+    args = parser.parse_args()
+
+    queries, qrels = make_queries(load_recipes(args.data), args.n, args.seed)
+    with open(args.queries, "w", encoding="utf-8") as f:
+        json.dump(queries, f, indent=2)
+    with open(args.qrels, "w", encoding="utf-8") as f:
+        json.dump(qrels, f, indent=2)
+    print(f"Wrote {len(queries)} queries to {args.queries} and their qrels to {args.qrels}")
+
+
+if __name__ == "__main__":
+    main()
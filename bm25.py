@@ -0,0 +1,148 @@
+"""
+Sparse BM25 over recipe title / ingredients / ner.
+
+The index is one CSR matrix W (n_docs x vocab) holding the precomputed
+BM25 weight of every (doc, term) pair, so scoring a batch of queries is a
+single sparse product  Q (n_queries x vocab) @ W.T  with no per-document
+Python loop.
+"""
+import json
+import os
+import re
+
+import numpy as np
+import scipy.sparse as sp
+
+# ======== Config ========
+K1 = 1.2
+B = 0.75
+TITLE_WEIGHT = 2  # title tokens are counted this many times
+BM25_MATRIX_FILE = "bm25.npz"
+BM25_VOCAB_FILE = "bm25_vocab.json"
+
+TOKEN_RE = re.compile(r"[a-z]+")
+STOPWORDS = frozenset("""
+a an and or the of to in on for with without from into at by is are be as it its my me i you your
+give want make recipe recipes dish some any only have has
+cup cups tablespoon tablespoons tbsp teaspoon teaspoons tsp ounce ounces oz pound pounds lb lbs
+g kg ml l pinch dash large small medium package packages can cans c pkg
+""".split())
+
+
+def normalize_token(tok):
+    """Crude plural folding so 'eggs' matches 'egg' and 'tomatoes' matches 'tomato'."""
+    if len(tok) > 4 and tok.endswith("oes"):
+        return tok[:-2]
+    if len(tok) > 4 and tok.endswith("ies"):
+        return tok[:-3] + "y"
+    if len(tok) > 3 and tok.endswith("s") and not tok.endswith("ss"):
+        return tok[:-1]
+    return tok
+
+
+def tokenize(text):
+    return [normalize_token(t) for t in TOKEN_RE.findall(text.lower()) if t not in STOPWORDS and len(t) > 1]
+
+
+def bm25_tokens(r):
+    """Lexical view of a recipe: title (up-weighted), ingredients and NER entities."""
+    tokens = tokenize(str(r.get("title") or "")) * TITLE_WEIGHT
+    for field in ("ingredients", "ner"):
+        value = r.get(field) or []
+        tokens += tokenize(" ".join(value) if isinstance(value, list) else str(value))
+    return tokens
+
+
+class BM25Index:
+    def __init__(self, weights, vocab):
+        self.weights = weights.tocsr()          # (n_docs, vocab) BM25 term weights
+        self.vocab = vocab                      # token -> column
+        self._weights_t = None
+
+    @property
+    def n_docs(self):
+        return self.weights.shape[0]
+
+    @classmethod
+    def build(cls, recipes, k1=K1, b=B):
+        vocab, indptr, indices = {}, [0], []
+        for r in recipes:
+            for tok in bm25_tokens(r):
+                indices.append(vocab.setdefault(tok, len(vocab)))
+            indptr.append(len(indices))
+
+        n_docs = len(indptr) - 1
+        data = np.ones(len(indices), dtype=np.float32)
+        tf = sp.csr_matrix(
+            (data, np.asarray(indices, dtype=np.int32), np.asarray(indptr, dtype=np.int64)),
+            shape=(n_docs, len(vocab)),
+        )
+        tf.sum_duplicates()  # repeated tokens -> term frequency
+
+        doc_len = np.diff(np.asarray(indptr)).astype(np.float32)
+        avgdl = doc_len.mean() if n_docs else 1.0
+        df = np.bincount(tf.indices, minlength=len(vocab)).astype(np.float32)
+        idf = np.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+
+        row_norm = k1 * (1 - b + b * doc_len / max(avgdl, 1e-9))
+        rows = np.repeat(np.arange(n_docs), np.diff(tf.indptr))
+        tf.data = idf[tf.indices] * tf.data * (k1 + 1) / (tf.data + row_norm[rows])
+        print(f"BM25 index built over {n_docs} recipes, {len(vocab)} terms.")
+        return cls(tf, vocab)
+
+    def query_matrix(self, texts):
+        """Binary (n_queries, vocab) matrix of known query terms."""
+        indptr, indices = [0], []
+        for text in texts:
+            cols = {self.vocab[t] for t in tokenize(text) if t in self.vocab}
+            indices.extend(sorted(cols))
+            indptr.append(len(indices))
+        return sp.csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr),
+            shape=(len(texts), len(self.vocab)),
+        )
+
+    def score(self, texts):
+        """Sparse (n_queries, n_docs) BM25 scores."""
+        if self._weights_t is None:
+            self._weights_t = self.weights.T.tocsr()
+        return (self.query_matrix(texts) @ self._weights_t).tocsr()
+
+    def search(self, texts, top_k, mask=None):
+        """
+        Top-k per query as (scores, rows) arrays shaped (n_queries, top_k),
+        padded with score 0 / row -1 like FAISS when fewer docs match.
+        `mask` is an optional boolean (n_docs,) row filter.
+        """
+        S = self.score(texts)
+        if mask is not None:
+            S = S @ sp.diags(mask.astype(np.float32))
+            S.eliminate_zeros()
+        D = np.zeros((len(texts), top_k), dtype=np.float32)
+        I = np.full((len(texts), top_k), -1, dtype=np.int64)
+        for qi in range(S.shape[0]):
+            lo, hi = S.indptr[qi], S.indptr[qi + 1]
+            if lo == hi:
+                continue
+            vals, cols = S.data[lo:hi], S.indices[lo:hi]
+            k = min(top_k, len(vals))
+            top = np.argpartition(-vals, k - 1)[:k]
+            top = top[np.argsort(-vals[top], kind="stable")]
+            D[qi, :k], I[qi, :k] = vals[top], cols[top]
+        return D, I
+
+    def save(self, out_dir):
+        sp.save_npz(os.path.join(out_dir, BM25_MATRIX_FILE), self.weights)
+        with open(os.path.join(out_dir, BM25_VOCAB_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.vocab, f)
+
+    @classmethod
+    def load(cls, index_dir):
+        weights = sp.load_npz(os.path.join(index_dir, BM25_MATRIX_FILE))
+        with open(os.path.join(index_dir, BM25_VOCAB_FILE), "r", encoding="utf-8") as f:
+            vocab = json.load(f)
+        return cls(weights, vocab)
+
+    @staticmethod
+    def exists(index_dir):
+        return os.path.exists(os.path.join(index_dir, BM25_MATRIX_FILE))
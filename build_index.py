@@ -0,0 +1,119 @@
+import argparse
+import time
+
+from ann_index import INDEX_TYPES
+from bm25 import BM25Index
+from chunking import CHUNK_OVERLAP, CHUNK_WORDS, chunk_corpus, save_parents
+from dedup import DEDUP_METHODS, dedup_recipes, save_variants
+from baseline import (
+    EMBED_MODEL, ENCODE_WORKERS, INDEX_DIR, INDEX_TYPE,
+    build_index, build_text, encode_corpus, load_recipes, set_seed,
+)
+from encoder import load_encoder
+from index_store import EMBEDDING_DTYPES, save_index
+from parallel_encode import SHARD_SIZE
+from recipe_filters import AttributeIndex
+from tracing import TRACER, Profiler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Encode the recipe corpus and write a FAISS index to disk.")
+    parser.add_argument("--out", default=INDEX_DIR, help="output directory for the index files")
+    parser.add_argument("--data", nargs="+", help="recipe files / stores to index (default: DATA_1_PATH, DATA_2_PATH)")
+    parser.add_argument("--index-type", default=INDEX_TYPE, choices=INDEX_TYPES)
+    parser.add_argument("--nlist", type=int, help="IVF cells (default ~4*sqrt(n))")
+    parser.add_argument("--nprobe", type=int, help="IVF cells visited per query")
+    parser.add_argument("--hnsw-m", type=int, help="HNSW graph degree")
+    parser.add_argument("--ef-search", type=int, help="HNSW search breadth")
+    parser.add_argument("--pq-m", type=int, help="PQ sub-quantizers (must divide dim)")
+    parser.add_argument("--train-size", type=int, help="vectors sampled for IVF/PQ/SQ8 training")
+    parser.add_argument("--embeddings-dtype", default="float32", choices=EMBEDDING_DTYPES,
+                        help="storage type of embeddings.npy (float16 halves it)")
+    parser.add_argument("--workers", type=int, default=ENCODE_WORKERS,
+                        help="encoder processes; >1 encodes length-sorted shards in parallel")
+    parser.add_argument("--shard-size", type=int, default=SHARD_SIZE, help="texts per encoded shard")
+    parser.add_argument("--chunk", action="store_true",
+                        help="index title+ingredients and instruction windows as separate vectors")
+    parser.add_argument("--chunk-words", type=int, default=CHUNK_WORDS, help="words per chunk")
+    parser.add_argument("--chunk-overlap", type=int, default=CHUNK_OVERLAP,
+                        help="words shared by consecutive instruction chunks")
+    parser.add_argument("--dedup", choices=DEDUP_METHODS,
+                        help="collapse near-duplicate recipes: minhash (before encoding) or embedding")
+    parser.add_argument("--dedup-threshold", type=float,
+                        help="Jaccard (minhash, default 0.8) or cosine (embedding, default 0.95)")
+    parser.add_argument("--no-bm25", action="store_true", help="skip the BM25 index used by hybrid search")
+    parser.add_argument("--trace", help="write stage timings / peak RSS / counters (.json, or .prom for Prometheus)")
+    parser.add_argument("--profile", help="write cProfile stats of the build to this .prof file")
+    args = parser.parse_args(argv)
+    if args.dedup == "embedding" and args.chunk:
+        parser.error("--dedup embedding needs one vector per recipe; use --dedup minhash with --chunk")
+
+    set_seed()
+    start = time.perf_counter()
+    profiler = Profiler(args.profile)
+    with profiler:
+        build(args)
+    profiler.dump()
+    print(TRACER.report())
+    if args.trace:
+        TRACER.save(args.trace)
+    print(f"Build finished in {time.perf_counter() - start:.1f}s")
+
+
+def build(args):
+    print("Loading datasets...")
+    recipes = load_recipes(args.data)
+    # worker processes load their own copy of the model
+    with TRACER.stage("load_model"):
+        model = load_encoder(EMBED_MODEL) if args.workers <= 1 else None
+
+    with TRACER.stage("build_text"):
+        texts = [build_text(r) for r in recipes]
+    variants, dedup_stats = {}, None
+    if args.dedup == "minhash":
+        with TRACER.stage("dedup"):
+            keep, variants, dedup_stats = dedup_recipes(recipes, texts, "minhash", args.dedup_threshold)
+        recipes = [recipes[int(i)] for i in keep]
+        texts = [texts[int(i)] for i in keep]
+
+    print("Encoding all recipes...")
+    if args.chunk:
+        with TRACER.stage("chunk"):
+            texts, parents = chunk_corpus(recipes, args.chunk_words, args.chunk_overlap)
+        print(f"Split {len(recipes)} recipes into {len(texts)} chunks.")
+    embeddings = encode_corpus(model, texts, args.workers, args.shard_size)
+    if args.dedup == "embedding":
+        with TRACER.stage("dedup"):
+            keep, variants, dedup_stats = dedup_recipes(recipes, texts, "embedding", args.dedup_threshold,
+                                                        embeddings)
+        recipes = [recipes[int(i)] for i in keep]
+        embeddings = embeddings[keep]
+    if dedup_stats:
+        TRACER.count("recipes_collapsed", dedup_stats["collapsed"])
+
+    # normalizes `embeddings` in place
+    index, params = build_index(
+        embeddings, args.index_type,
+        nlist=args.nlist, nprobe=args.nprobe, hnsw_m=args.hnsw_m,
+        ef_search=args.ef_search, pq_m=args.pq_m, train_size=args.train_size,
+    )
+    meta = {"model": EMBED_MODEL, "index_type": args.index_type, "index_params": params}
+    if args.chunk:
+        meta["chunking"] = {"max_words": args.chunk_words, "overlap": args.chunk_overlap, "n_chunks": len(texts)}
+    if dedup_stats:
+        meta["dedup"] = dedup_stats
+    with TRACER.stage("save_index"):
+        save_index(args.out, index, embeddings, recipes, meta=meta, embeddings_dtype=args.embeddings_dtype)
+        if args.chunk:
+            save_parents(args.out, parents)
+        if args.dedup:
+            save_variants(args.out, variants)
+    if not args.no_bm25:
+        with TRACER.stage("bm25_build"):
+            BM25Index.build(recipes).save(args.out)
+    with TRACER.stage("attribute_index_build"):
+        AttributeIndex.build(recipes).save(args.out)
+
+
+if __name__ == "__main__":
+    main()
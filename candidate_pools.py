@@ -0,0 +1,239 @@
+"""
+Rule-based candidate pools for manual relevance labeling.
+
+Each query spec is a set of keyword rules over title / ingredients / ner
+/ instructions:
+  include  list of clauses that must all match
+  exclude  list of clauses none of which may match
+A clause maps fields to keywords and matches when any keyword occurs (as
+a case-insensitive substring of one item) in any of its fields:
+
+    {"name": "vegan_soup", "query_id": 6,
+     "include": [{"title": ["soup"]}],
+     "exclude": [{"ingredients": ["meat", "chicken", "fish"]}]}
+
+All specs are compiled into one set of (column, keyword) needles and run
+in a single pass over the corpus, `block_rows` recipes at a time. For a
+columnar recipe store a block is the column's UTF-8 bytes with a newline
+after every item, ASCII-lowercased by bytes.translate; every needle is
+found with bytes.find, jumping to the end of the row after each hit, so
+the cost is a C scan per needle plus one step per matching row.
+
+    python candidate_pools.py --recipes RecipeNLG_dataset/recipes_nlg.store Spoonacular_API/spoonacular_dataset.jsonl
+"""
+import argparse
+import bisect
+import json
+import os
+import time
+
+import numpy as np
+
+from recipe_store import RecipeStore, load_recipes
+
+# ======== Config ========
+SPECS_PATH = "manual_selection_script/query_specs.json"
+RECIPE_PATHS = ["RecipeNLG_dataset/recipes_nlg_clean.jsonl", "Spoonacular_API/spoonacular_dataset.jsonl"]
+OUT_DIR = "manual_selection_dataset/candidates"
+BLOCK_ROWS = 50_000
+MAX_PER_SPEC = None   # sample at most this many candidates per spec (None keeps all)
+SEED = 42
+
+# searchable fields and the recipe columns they read; older files keep instructions under "directions"
+FIELD_COLUMNS = {
+    "title": ("title",),
+    "ingredients": ("ingredients",),
+    "ner": ("ner",),
+    "instructions": ("instructions", "directions"),
+}
+_SEP = b"\n"
+_LOWER = bytes.maketrans(b"ABCDEFGHIJKLMNOPQRSTUVWXYZ", b"abcdefghijklmnopqrstuvwxyz")
+
+
+def _fold(text):
+    return text.encode("utf-8").translate(_LOWER)
+
+
+def _items(value):
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(x) for x in value]
+    return [value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)]
+
+
+class QuerySpec:
+    """
+    name:     file name of the pool
+    include:  clauses ({field: [keywords]}) that must all match
+    exclude:  clauses that must not match
+    query_id: id of the query in manual_queries.json
+    """
+
+    def __init__(self, name, include=(), exclude=(), query_id=None, query=None):
+        self.name = name
+        self.include = [self._clause(c) for c in include]
+        self.exclude = [self._clause(c) for c in exclude]
+        self.query_id = query_id
+        self.query = query
+        if not self.include:
+            raise ValueError(f"Query spec {name!r} has no include clause.")
+
+    def _clause(self, clause):
+        unknown = set(clause) - set(FIELD_COLUMNS)
+        if unknown:
+            raise ValueError(f"Query spec {self.name!r}: unknown field(s) {sorted(unknown)}; "
+                             f"expected {sorted(FIELD_COLUMNS)}.")
+        if any(_SEP.decode() in kw for keywords in clause.values() for kw in keywords):
+            raise ValueError(f"Query spec {self.name!r}: keywords match within one item and cannot contain newlines.")
+        return {field: [_fold(kw) for kw in keywords] for field, keywords in clause.items()}
+
+    def matches(self, recipe):
+        """Same predicate as run_specs, evaluated on a single recipe."""
+        def hit(clause):
+            return any(kw in _fold(item)
+                       for field, keywords in clause.items()
+                       for col in FIELD_COLUMNS[field]
+                       for item in _items(recipe.get(col))
+                       for kw in keywords)
+        return all(hit(c) for c in self.include) and not any(hit(c) for c in self.exclude)
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d["name"], d.get("include", []), d.get("exclude", []), d.get("query_id"), d.get("query"))
+
+
+def load_specs(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return [QuerySpec.from_dict(d) for d in json.load(f)]
+
+
+def compile_specs(specs):
+    """
+    (needles, plans): the unique (column, keyword) pairs of all specs, and
+    per spec its include / exclude clauses as lists of needle positions.
+    """
+    needles, plans = {}, []
+    for spec in specs:
+        def ids(clause):
+            return [needles.setdefault((col, kw), len(needles))
+                    for field, keywords in clause.items()
+                    for col in FIELD_COLUMNS[field]
+                    for kw in keywords]
+        plans.append(([ids(c) for c in spec.include], [ids(c) for c in spec.exclude]))
+    return list(needles), plans
+
+
+# ======== Blocks ========
+def _store_block(store, name, start, stop):
+    """(haystack, row_ends) of rows [start, stop) of a store column; row i ends before row_ends[i]."""
+    if name not in store.fields:
+        return b"", np.zeros(stop - start, dtype=np.int64)
+    col = store.column(name)
+    first, last = int(col.row_offsets[start]), int(col.row_offsets[stop])
+    offsets = np.asarray(col.item_offsets[first:last + 1], dtype=np.int64)
+    base = int(offsets[0])
+    data = np.asarray(col.data[base:int(offsets[-1])])
+    hay = np.insert(data, offsets[1:] - base, _SEP[0]).tobytes().translate(_LOWER)
+    items_before = np.asarray(col.row_offsets[start + 1:stop + 1], dtype=np.int64) - first
+    return hay, offsets[items_before] - base + items_before
+
+
+def _list_block(recipes, name, start, stop):
+    """Same as _store_block for any sequence of recipe dicts."""
+    parts, row_ends, end = [], np.empty(stop - start, dtype=np.int64), 0
+    for i in range(start, stop):
+        for item in _items(recipes[i].get(name)):
+            parts.append(_fold(item) + _SEP)
+            end += len(parts[-1])
+        row_ends[i - start] = end
+    return b"".join(parts), row_ends
+
+
+def rows_containing(hay, ends, needle):
+    """Rows of the block whose haystack contains `needle`, one bytes.find per matching row."""
+    rows = []
+    pos = hay.find(needle)
+    while pos != -1:
+        row = bisect.bisect_right(ends, pos)
+        rows.append(row)
+        pos = hay.find(needle, ends[row])
+    return rows
+
+
+def run_specs(recipes, specs, block_rows=BLOCK_ROWS):
+    """{spec name: sorted row numbers} of the recipes matching each spec."""
+    needles, plans = compile_specs(specs)
+    block_of = _store_block if isinstance(recipes, RecipeStore) else _list_block
+    columns = sorted({col for col, _ in needles})
+    pools = [[] for _ in specs]
+    for start in range(0, len(recipes), block_rows):
+        stop = min(start + block_rows, len(recipes))
+        found = np.zeros((len(needles), stop - start), dtype=bool)
+        for col in columns:
+            hay, row_ends = block_of(recipes, col, start, stop)
+            ends = row_ends.tolist()
+            for i, (needle_col, kw) in enumerate(needles):
+                if needle_col == col:
+                    found[i, rows_containing(hay, ends, kw)] = True
+        for pool, (include, exclude) in zip(pools, plans):
+            mask = np.ones(stop - start, dtype=bool)
+            for ids in include:
+                mask &= found[ids].any(axis=0)
+            for ids in exclude:
+                mask &= ~found[ids].any(axis=0)
+            pool.append(np.flatnonzero(mask) + start)
+    return {spec.name: np.concatenate(pool) if pool else np.empty(0, dtype=np.int64)
+            for spec, pool in zip(specs, pools)}
+
+
+def sample_rows(rows, limit, seed=SEED):
+    if limit is None or len(rows) <= limit:
+        return rows
+    return np.sort(np.random.default_rng(seed).choice(rows, limit, replace=False))
+
+
+# ======== CLI ========
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate candidate pools for manual labeling from query specs.")
+    parser.add_argument("--specs", default=SPECS_PATH, help="JSON list of query specs")
+    parser.add_argument("--recipes", nargs="+", default=RECIPE_PATHS,
+                        help="recipe files (.json/.jsonl/.parquet) or recipe_store directories")
+    parser.add_argument("--out-dir", default=OUT_DIR)
+    parser.add_argument("--only", nargs="+", help="run only these spec names")
+    parser.add_argument("--max-per-spec", type=int, default=MAX_PER_SPEC,
+                        help="randomly sample at most this many candidates per spec and corpus")
+    parser.add_argument("--block-rows", type=int, default=BLOCK_ROWS)
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    specs = load_specs(args.specs)
+    if args.only:
+        specs = [s for s in specs if s.name in args.only]
+
+    pools = {spec.name: [] for spec in specs}
+    for path in args.recipes:
+        recipes = load_recipes(path)
+        if not len(recipes):
+            continue
+        start = time.perf_counter()
+        rows = run_specs(recipes, specs, args.block_rows)
+        elapsed = time.perf_counter() - start
+        print(f"{path}: {len(specs)} specs over {len(recipes)} recipes in {elapsed:.2f}s "
+              f"({len(recipes) / elapsed:.0f} recipes/s)")
+        for spec in specs:
+            picked = sample_rows(rows[spec.name], args.max_per_spec)
+            print(f"  {spec.name:<28}{len(rows[spec.name]):>8} matches")
+            pools[spec.name].extend(recipes[int(r)] for r in picked)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for spec in specs:
+        with open(os.path.join(args.out_dir, f"{spec.name}.json"), "w", encoding="utf-8") as f:
+            json.dump(pools[spec.name], f, indent=4)
+    print(f"Wrote {len(specs)} candidate pools to {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
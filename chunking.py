@@ -0,0 +1,138 @@
+"""
+Chunk-level indexing of long recipes.
+
+build_text() puts title, ingredients and instructions into one string, and
+MiniLM truncates it at 256 word pieces, so most of a long Spoonacular
+instruction text never reaches the encoder. Here a recipe becomes one
+"head" chunk (title + ingredients) plus overlapping windows of its
+instructions, each prefixed with the title. Recipes whose whole text fits
+one window keep a single vector, so short RecipeNLG recipes cost nothing
+extra. Every chunk records its parent recipe row; ChunkIndex searches the
+chunk vectors and aggregates chunk scores into one score per recipe
+(max, or sum of retrieved chunks), so each recipe appears once.
+
+    texts, parents = chunk_corpus(recipes)
+    index = ChunkIndex(chunk_index, parents, aggregate="max")
+    D, I = index.search(q_emb, 5)       # I holds recipe rows, like a single-vector index
+"""
+import os
+
+import numpy as np
+
+from recipe_filters import bitmap_selector, search_params
+
+# ======== Config ========
+CHUNK_WORDS = 150        # ~200 word pieces, under MiniLM's 256 limit
+CHUNK_OVERLAP = 30       # words shared by consecutive instruction windows
+AGGREGATIONS = ("max", "sum")
+CHUNK_OVERSAMPLE = 4     # chunks fetched per requested recipe; doubled while too few distinct recipes
+CHUNK_MAX_ROUNDS = 3     # doublings at most; queries still short then return fewer recipes
+PARENTS_FILE = "chunk_parents.npy"
+
+
+def chunk_recipe(r, max_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """Texts to embed for one recipe: the head chunk, then instruction windows."""
+    title = r.get("title", "") or ""
+    ingredients = " ".join(r.get("ingredients", []) or [])
+    instructions = r.get("instructions", "") or ""
+    # RecipeNLG rows (clean.py) keep instructions as a list of steps
+    words = (" ".join(instructions) if isinstance(instructions, list) else instructions).split()
+    head = f"{title} {ingredients}".strip()
+    if len(head.split()) + len(words) <= max_words:
+        return [f"{head} {' '.join(words)}".strip()]
+
+    chunks = [head]
+    prefix = title.split()
+    width = max(max_words - len(prefix), overlap + 1)
+    step = width - overlap
+    for start in range(0, max(len(words) - overlap, 1) if words else 0, step):
+        chunks.append(" ".join(prefix + words[start:start + width]))
+    return chunks
+
+
+def chunk_corpus(recipes, max_words=CHUNK_WORDS, overlap=CHUNK_OVERLAP):
+    """(chunk texts, (n_chunks,) int64 parent row of each chunk)."""
+    texts, parents = [], []
+    for row, r in enumerate(recipes):
+        chunks = chunk_recipe(r, max_words, overlap)
+        texts.extend(chunks)
+        parents.extend([row] * len(chunks))
+    return texts, np.asarray(parents, dtype=np.int64)
+
+
+def save_parents(out_dir, parents):
+    np.save(os.path.join(out_dir, PARENTS_FILE), np.asarray(parents, dtype=np.int64))
+
+
+def load_parents(index_dir):
+    """Parent row per chunk, or None for a single-vector index."""
+    path = os.path.join(index_dir, PARENTS_FILE)
+    return np.load(path) if os.path.exists(path) else None
+
+
+def aggregate_chunks(D, I, parents, top_k, how="max"):
+    """
+    Collapse chunk hits (scores D, chunk ids I, best first) into recipe
+    hits: one entry per parent scored by its best chunk ("max") or by the
+    sum of its retrieved chunks ("sum"). Returns (scores, rows) shaped
+    (n_queries, top_k), padded with row -1.
+    """
+    if how not in AGGREGATIONS:
+        raise ValueError(f"Unknown chunk aggregation {how!r}; expected one of {AGGREGATIONS}.")
+    out_D = np.zeros((len(I), top_k), dtype=np.float32)
+    out_I = np.full((len(I), top_k), -1, dtype=np.int64)
+    for qi, (scores, chunks) in enumerate(zip(D, I)):
+        keep = chunks >= 0
+        rows, first, inv = np.unique(parents[chunks[keep]], return_index=True, return_inverse=True)
+        if how == "max":
+            agg = scores[keep][first]   # hits are sorted, so the first chunk of a parent is its best
+        else:
+            agg = np.bincount(inv, weights=scores[keep], minlength=len(rows))
+        order = np.argsort(-agg, kind="stable")[:top_k]
+        out_D[qi, :len(order)] = agg[order]
+        out_I[qi, :len(order)] = rows[order]
+    return out_D, out_I
+
+
+class ChunkIndex:
+    """
+    Recipe-level view of a FAISS index over chunk vectors. search() takes
+    a recipe mask and returns recipe rows, so retrieval, the server and the
+    reranker use it like the single-vector index.
+    """
+
+    def __init__(self, index, parents, aggregate="max", oversample=CHUNK_OVERSAMPLE, max_rounds=CHUNK_MAX_ROUNDS):
+        self.index = index
+        self.parents = np.asarray(parents, dtype=np.int64)
+        self.aggregate = aggregate
+        self.oversample = oversample
+        self.max_rounds = max_rounds
+        self.ntotal = int(self.parents.max()) + 1 if len(self.parents) else 0   # recipes
+        self.d = index.d
+
+    def search(self, q_emb, top_k, mask=None):
+        params = None
+        n_parents = self.ntotal
+        if mask is not None:
+            params = search_params(self.index, bitmap_selector(mask[self.parents]))
+            n_parents = int(mask.sum())
+        want = min(top_k, n_parents)
+        k = min(top_k * self.oversample, self.index.ntotal)
+        D, I = self.index.search(q_emb, k, params=params)
+        out_D, out_I = aggregate_chunks(D, I, self.parents, top_k, self.aggregate)
+        # only the queries with too few distinct recipes are searched again, with a bounded k
+        short = np.flatnonzero((out_I >= 0).sum(axis=1) < want)
+        for _ in range(self.max_rounds):
+            if not len(short) or k >= self.index.ntotal:
+                break
+            k = min(2 * k, self.index.ntotal)
+            D, I = self.index.search(q_emb[short], k, params=params)
+            out_D[short], out_I[short] = aggregate_chunks(D, I, self.parents, top_k, self.aggregate)
+            short = short[(out_I[short] >= 0).sum(axis=1) < want]
+        return out_D, out_I
+
+
+def open_search_index(store, aggregate="max"):
+    """store.index, or a ChunkIndex over it when the directory was built with --chunk."""
+    parents = load_parents(store.dir)
+    return store.index if parents is None else ChunkIndex(store.index, parents, aggregate)
@@ -0,0 +1,136 @@
+"""
+Single entry point for the pipeline:
+
+    python cli.py build [build_index.py options]      encode the corpus, write index/
+    python cli.py query [query_index.py options]      answer a query file from index/
+    python cli.py eval  [eval_engine.py options]      score a run against qrels
+    python cli.py stats [--index-dir index]           describe an index and the embedding cache
+    python cli.py pools [candidate_pools.py options]  rule-based candidate pools for labeling
+
+Only the module of the chosen command is imported, so `eval`, `stats` and
+`pools` never load faiss, torch or sentence_transformers, and `query --mode bm25`
+loads neither the encoder nor faiss. `python cli.py <command> --help` lists the
+options of each command.
+"""
+import argparse
+import importlib
+import json
+import os
+import sys
+
+# same defaults / file name as baseline.py and live_index.py, repeated so `stats` imports neither
+INDEX_DIR = "index"
+CACHE_DIR = "embedding_cache"
+UPDATES_FILE = "updates.jsonl"
+
+COMMANDS = {
+    "build": ("build_index", "Encode the recipe corpus and write a FAISS index to disk."),
+    "query": ("query_index", "Answer queries from an index written by `build`."),
+    "eval": ("evaluator.eval_engine", "Evaluate a retrieval run against qrels."),
+    "stats": (None, "Describe an index directory and the embedding cache."),
+    "pools": ("candidate_pools", "Generate candidate pools for manual labeling from query specs."),
+}
+
+
+def dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def index_stats(index_dir):
+    """Counts, build settings and file sizes of an index directory, from its metadata files only."""
+    import numpy as np
+
+    from index_store import META_FILE, OFFSETS_FILE
+
+    with open(os.path.join(index_dir, META_FILE), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    stats = {
+        "index_dir": index_dir,
+        "recipes": len(np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")) - 1,
+        **{k: meta.get(k) for k in ("model", "index_type", "faiss_class", "ntotal", "dim",
+                                     "embeddings_dtype", "built_at", "index_params")},
+        "chunked": "chunking" in meta,
+        "deduplicated": "dedup" in meta,
+        "files_mb": {name: os.path.getsize(os.path.join(index_dir, name)) / 2**20
+                     for name in sorted(os.listdir(index_dir))},
+        "total_mb": dir_size(index_dir) / 2**20,
+    }
+    for key in ("chunking", "dedup"):
+        if key in meta:
+            stats[key] = meta[key]
+    updates = os.path.join(index_dir, UPDATES_FILE)
+    if os.path.exists(updates):
+        with open(updates, "r", encoding="utf-8") as f:
+            stats["pending_updates"] = sum(1 for line in f if line.strip())
+    return stats
+
+
+def cache_stats(cache_dir):
+    """One entry per model cached under `cache_dir`."""
+    from embedding_cache import MANIFEST_NAME
+
+    models = []
+    if not os.path.isdir(cache_dir):
+        return models
+    for name in sorted(os.listdir(cache_dir)):
+        path = os.path.join(cache_dir, name, MANIFEST_NAME)
+        if not os.path.exists(path):
+            continue
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        models.append({
+            "model": manifest["model"],
+            "dim": manifest["dim"],
+            "dtype": manifest["dtype"],
+            "segments": len(manifest["segments"]),
+            "vectors": sum(seg["count"] for seg in manifest["segments"]),
+            "size_mb": dir_size(os.path.join(cache_dir, name)) / 2**20,
+        })
+    return models
+
+
+def stats(argv=None):
+    parser = argparse.ArgumentParser(prog="cli.py stats", description=COMMANDS["stats"][1])
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--cache-dir", default=CACHE_DIR)
+    parser.add_argument("--json", action="store_true", help="print one JSON object instead of a listing")
+    args = parser.parse_args(argv)
+
+    out = {"embedding_cache": cache_stats(args.cache_dir)}
+    if os.path.isdir(args.index_dir):
+        out["index"] = index_stats(args.index_dir)
+    if args.json:
+        print(json.dumps(out, indent=2))
+        return
+    if "index" not in out:
+        print(f"No index at {args.index_dir} (run `python cli.py build`).")
+    for key, value in out.get("index", {}).items():
+        if key == "files_mb":
+            for name, mb in value.items():
+                print(f"  {name:<22}{mb:>10.2f} MB")
+        else:
+            print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+    for model in out["embedding_cache"]:
+        print(f"cache: {model['model']} {model['vectors']} vectors x {model['dim']} {model['dtype']}, "
+              f"{model['segments']} segments, {model['size_mb']:.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="cli.py", description="Recipe retrieval pipeline.",
+        epilog="\n".join(f"  {name:<6} {help_text}" for name, (_, help_text) in COMMANDS.items()),
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("command", choices=COMMANDS)
+    parser.add_argument("args", nargs=argparse.REMAINDER, help="options of the command")
+    args = parser.parse_args(argv)
+
+    module, _ = COMMANDS[args.command]
+    if module is None:
+        return stats(args.args)
+    sys.argv[0] = f"cli.py {args.command}"   # usage lines of the command's own parser
+    return importlib.import_module(module).main(args.args)
+
+
+if __name__ == "__main__":
+    main()
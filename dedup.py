@@ -0,0 +1,213 @@
+"""
+Near-duplicate detection for the fused RecipeNLG + Spoonacular corpus.
+
+Two ways to cluster recipes before they are indexed:
+  minhash    word 3-shingles of build_text, MinHash signatures and LSH
+             banding; candidate pairs are kept when their estimated
+             Jaccard similarity reaches the threshold. Runs before
+             encoding, so duplicates are never embedded.
+  embedding  cosine similarity of the normalized corpus vectors; each
+             vector's nearest neighbours above the threshold are linked.
+
+Linked recipes form clusters (connected components). The recipe with the
+longest text represents its cluster in the index, and variants.json maps
+its `id` to the ids of the collapsed variants.
+
+    labels = cluster_minhash([build_text(r) for r in recipes])
+    keep, variants = collapse(recipes, labels, texts)
+"""
+import itertools
+import json
+import os
+import re
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from ann_index import build_ann_index
+
+# ======== Config ========
+DEDUP_METHODS = ("minhash", "embedding")
+MINHASH_THRESHOLD = 0.8      # estimated Jaccard of word 3-shingles
+EMBEDDING_THRESHOLD = 0.95   # cosine similarity
+NUM_PERM = 64                # MinHash permutations
+LSH_BANDS = 16               # 16 bands x 4 rows: a pair at Jaccard 0.8 becomes a candidate with p > 0.99
+SHINGLE = 3                  # words per shingle
+NEIGHBORS = 10               # nearest neighbours checked per vector by the embedding method
+BLOCK = 1024                 # texts hashed per vectorized step
+SEED = 42
+VARIANTS_FILE = "variants.json"
+
+_PRIME = (1 << 31) - 1       # shingle hashes are reduced modulo this Mersenne prime
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def shingle_hashes(texts, k=SHINGLE):
+    """
+    (hashes, offsets): sorted unique 31-bit hashes of each text's word
+    k-shingles, text i owning hashes[offsets[i]:offsets[i + 1]]. Texts
+    shorter than k words use their words; empty texts get a unique hash so
+    they never match. Tokens are hashed for the whole corpus at once.
+    """
+    vocab, ids, lengths = {}, [], np.empty(len(texts), dtype=np.int64)
+    fresh = itertools.count()   # id for a token seen for the first time
+    for i, text in enumerate(texts):
+        toks = _TOKEN.findall(text.lower())
+        ids.extend(map(vocab.setdefault, toks, fresh))
+        lengths[i] = len(toks)
+    ids = np.asarray(ids, dtype=np.int64)
+    doc = np.repeat(np.arange(len(texts), dtype=np.int64), lengths)
+
+    # rolling hash over k consecutive tokens; keep windows inside one text
+    n = max(len(ids) - k + 1, 0)
+    h = np.zeros(n, dtype=np.int64)
+    for j in range(k):
+        h = (h * 1_000_003 + ids[j:j + n]) % _PRIME
+    whole = doc[:n] == doc[k - 1:k - 1 + n]
+    short = lengths[doc] < k
+    empty = np.flatnonzero(lengths == 0)
+    docs = np.concatenate([doc[:n][whole], doc[short], empty])
+    hashes = np.concatenate([h[whole], ids[short] % _PRIME, (_PRIME - 1 - empty) % _PRIME])
+
+    keys = np.sort(docs << 31 | hashes)
+    keys = keys[np.r_[True, keys[1:] != keys[:-1]]]
+    offsets = np.searchsorted(keys >> 31, np.arange(len(texts) + 1))
+    return keys & _PRIME, offsets
+
+
+def minhash_signatures(texts, num_perm=NUM_PERM, seed=SEED, block=BLOCK):
+    """
+    (n, num_perm) uint32 MinHash signatures. Each permutation is a
+    multiply-shift hash (a * x + b mod 2**64) >> 32 with odd random a,
+    computed for `block` texts per numpy step.
+    """
+    rng = np.random.default_rng(seed)
+    a = (rng.integers(0, 2**63, num_perm, dtype=np.uint64) | np.uint64(1))[:, None]
+    b = rng.integers(0, 2**63, num_perm, dtype=np.uint64)[:, None]
+    hashes, offsets = shingle_hashes(texts)
+    hashes = hashes.astype(np.uint64)
+    sig = np.empty((len(texts), num_perm), dtype=np.uint32)
+    for start in range(0, len(texts), block):
+        stop = min(start + block, len(texts))
+        lo, hi = offsets[start], offsets[stop]
+        permuted = ((a * hashes[lo:hi] + b) >> np.uint64(32)).astype(np.uint32)
+        sig[start:stop] = np.minimum.reduceat(permuted, offsets[start:stop] - lo, axis=1).T
+    return sig
+
+
+def lsh_candidates(sig, bands=LSH_BANDS):
+    """
+    Pairs (i, j) sharing at least one identical band of their signatures;
+    every bucket is linked as a star around its first member.
+    """
+    n, num_perm = sig.shape
+    rows = num_perm // bands
+    left, right = [], []
+    for band in range(bands):
+        keys = np.ascontiguousarray(sig[:, band * rows:(band + 1) * rows]).view(f"V{rows * 4}").ravel()
+        _, first, inv = np.unique(keys, return_index=True, return_inverse=True)
+        dup = first[inv] != np.arange(n)
+        left.append(first[inv][dup])
+        right.append(np.flatnonzero(dup))
+    left, right = np.concatenate(left), np.concatenate(right)
+    pairs = np.unique(np.stack([left, right], axis=1), axis=0) if len(left) else np.empty((0, 2), dtype=np.int64)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _components(n, left, right):
+    graph = sp.coo_matrix((np.ones(len(left), dtype=np.int8), (left, right)), shape=(n, n))
+    return connected_components(graph, directed=False)[1]
+
+
+def cluster_minhash(texts, threshold=MINHASH_THRESHOLD, num_perm=NUM_PERM, bands=LSH_BANDS):
+    """Cluster label per text; texts with estimated Jaccard >= `threshold` share a label."""
+    sig = minhash_signatures(texts, num_perm)
+    left, right = lsh_candidates(sig, bands)
+    keep = (sig[left] == sig[right]).mean(axis=1) >= threshold
+    return _components(len(texts), left[keep], right[keep])
+
+
+def cluster_embeddings(embeddings, threshold=EMBEDDING_THRESHOLD, neighbors=NEIGHBORS):
+    """Cluster label per vector; vectors with cosine similarity >= `threshold` share a label."""
+    import faiss  # not at module level: query_index.py imports this module for attach_variants
+
+    vecs = np.array(embeddings, dtype=np.float32)
+    faiss.normalize_L2(vecs)
+    # exact below ~50k vectors, IVF above so the neighbour search stays sub-quadratic
+    index, _ = build_ann_index(vecs, "flat" if len(vecs) < 50_000 else "ivf_flat", nprobe=8)
+    D, I = index.search(vecs, min(neighbors + 1, len(vecs)))
+    link = (D >= threshold) & (I >= 0) & (I != np.arange(len(vecs))[:, None])
+    left = np.repeat(np.arange(len(vecs)), link.sum(axis=1))
+    return _components(len(vecs), left, I[link])
+
+
+def collapse(recipes, labels, texts):
+    """
+    One representative row per cluster (longest text, earliest on ties),
+    in corpus order, and {representative id: [variant ids]} for clusters
+    with more than one member.
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    order = np.lexsort((np.arange(len(labels)), -lengths, labels))   # by label, longest first
+    reps = order[np.r_[True, labels[order][1:] != labels[order][:-1]]]
+    rep_of_label = np.empty(labels.max() + 1 if len(labels) else 0, dtype=np.int64)
+    rep_of_label[labels[reps]] = reps
+
+    variants = {}
+    for row in np.flatnonzero(rep_of_label[labels] != np.arange(len(labels))):
+        rep = recipes[int(rep_of_label[labels[row]])]
+        variants.setdefault(str(rep.get("id")), []).append(recipes[int(row)].get("id"))
+    return np.sort(reps), variants
+
+
+def dedup_recipes(recipes, texts, method="minhash", threshold=None, embeddings=None):
+    """(kept rows, variants, stats) for `recipes`; `embeddings` is needed by the embedding method."""
+    start = time.perf_counter()
+    if method == "minhash":
+        labels = cluster_minhash(texts, threshold or MINHASH_THRESHOLD)
+    elif method == "embedding":
+        labels = cluster_embeddings(embeddings, threshold or EMBEDDING_THRESHOLD)
+    else:
+        raise ValueError(f"Unknown dedup method {method!r}; expected one of {DEDUP_METHODS}.")
+    keep, variants = collapse(recipes, labels, texts)
+    elapsed = time.perf_counter() - start
+    stats = {
+        "method": method,
+        "recipes": len(texts),
+        "kept": len(keep),
+        "collapsed": len(texts) - len(keep),
+        "reduction": 1 - len(keep) / max(len(texts), 1),
+        "clusters_with_variants": len(variants),
+        "seconds": elapsed,
+        "recipes_per_s": len(texts) / elapsed if elapsed else 0.0,
+    }
+    print(f"Dedup ({method}): kept {stats['kept']} of {stats['recipes']} recipes "
+          f"({stats['reduction']:.1%} collapsed into {len(variants)} clusters) "
+          f"in {elapsed:.1f}s ({stats['recipes_per_s']:.0f} recipes/s)")
+    return keep, variants, stats
+
+
+def save_variants(out_dir, variants):
+    with open(os.path.join(out_dir, VARIANTS_FILE), "w", encoding="utf-8") as f:
+        json.dump(variants, f)
+
+
+def load_variants(index_dir):
+    """{representative id: [variant ids]}, empty when the index was built without dedup."""
+    path = os.path.join(index_dir, VARIANTS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def attach_variants(results, variants):
+    """Add "variants" (collapsed duplicate ids) to every hit whose recipe has any."""
+    for block in results:
+        for hit in block["results"]:
+            ids = variants.get(str(hit["recipe"].get("id")))
+            if ids:
+                hit["variants"] = ids
+    return results
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import re
+
+import numpy as np
+
+# ======== Config ========
+MANIFEST_NAME = "manifest.json"
+KEY_DTYPE = "S16"  # raw 128-bit blake2b digest per text
+MAX_SEGMENTS = 64  # compact() rewrites the whole cache, so it waits until segments pile up
+
+
+def text_key(model_name, text):
+    """Content address of one text for one encoder: blake2b(model \\0 text)."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(model_name.encode("utf-8"))
+    h.update(b"\0")
+    h.update(text.encode("utf-8"))
+    return h.digest()
+
+
+def _model_slug(model_name):
+    return re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name)
+
+
+class EmbeddingCache:
+    """
+    On-disk embedding store keyed by a hash of (model name, text).
+
+    Layout of <cache_dir>/<model slug>/:
+      manifest.json          model, dim, dtype and the list of segments
+      seg_00000.keys.npy     (n,) S16 content keys
+      seg_00000.vecs.npy     (n, dim) float32/float16 vectors, memory-mapped on load
+
+    Every call that encodes new texts appends one segment, so existing
+    vectors are never rewritten; `compact()` merges segments when there
+    are too many.
+    """
+
+    def __init__(self, cache_dir, model_name, dtype="float32"):
+        self.model_name = model_name
+        self.dir = os.path.join(cache_dir, _model_slug(model_name))
+        self.dtype = np.dtype(dtype)
+        self.manifest = {"model": model_name, "dim": None, "dtype": self.dtype.name, "segments": []}
+        self._keys = []     # per segment, (n,) S16
+        self._vecs = []     # per segment, (n, dim) memmap
+        self._lookup = {}   # key -> (segment index, row)
+        self._load()
+
+    # ---------- loading ----------
+    def _load(self):
+        path = os.path.join(self.dir, MANIFEST_NAME)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("model") != self.model_name:
+            raise ValueError(f"Cache at {self.dir} belongs to model {manifest.get('model')!r}.")
+        if manifest.get("dtype") != self.dtype.name:
+            raise ValueError(
+                f"Cache at {self.dir} stores {manifest.get('dtype')}, requested {self.dtype.name}."
+            )
+        self.manifest = manifest
+        for seg in manifest["segments"]:
+            self._attach_segment(seg["name"])
+
+    def _attach_segment(self, name):
+        keys = np.load(os.path.join(self.dir, f"{name}.keys.npy"))
+        vecs = np.load(os.path.join(self.dir, f"{name}.vecs.npy"), mmap_mode="r")
+        seg_idx = len(self._keys)
+        self._keys.append(keys)
+        self._vecs.append(vecs)
+        self._lookup.update(zip(keys.tolist(), ((seg_idx, row) for row in range(len(keys)))))
+
+    def __len__(self):
+        return len(self._lookup)
+
+    @property
+    def dim(self):
+        return self.manifest["dim"]
+
+    # ---------- writing ----------
+    def _write_manifest(self):
+        path = os.path.join(self.dir, MANIFEST_NAME)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp, path)
+
+    def _write_segment(self, name, keys, vecs):
+        for suffix, arr in (("keys", keys), ("vecs", vecs)):
+            path = os.path.join(self.dir, f"{name}.{suffix}.npy")
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                np.save(f, arr)
+            os.replace(tmp, path)
+
+    def add(self, keys, vectors):
+        """Persist `vectors` under `keys` as a new segment. Keys already cached are skipped."""
+        keys = np.asarray(keys, dtype=KEY_DTYPE)
+        vectors = np.asarray(vectors)
+        fresh = np.array([k not in self._lookup for k in keys.tolist()], dtype=bool)
+        keys, vectors = keys[fresh], vectors[fresh]
+        if len(keys) == 0:
+            return 0
+
+        if self.manifest["dim"] is None:
+            self.manifest["dim"] = int(vectors.shape[1])
+        elif vectors.shape[1] != self.manifest["dim"]:
+            raise ValueError(f"Expected dim {self.manifest['dim']}, got {vectors.shape[1]}.")
+
+        os.makedirs(self.dir, exist_ok=True)
+        name = f"seg_{len(self.manifest['segments']):05d}"
+        while os.path.exists(os.path.join(self.dir, f"{name}.keys.npy")):
+            name += "_"
+        self._write_segment(name, keys, vectors.astype(self.dtype, copy=False))
+        self.manifest["segments"].append({"name": name, "count": int(len(keys))})
+        self._write_manifest()
+        self._attach_segment(name)
+        return int(len(keys))
+
+    def compact(self, max_segments=1):
+        """
+        Merge all segments into one so a warm start opens a single memmap,
+        once there are more than `max_segments` of them.
+        """
+        if len(self._keys) <= max(max_segments, 1):
+            return
+        keys = np.concatenate(self._keys)
+        vecs = np.concatenate([np.asarray(v) for v in self._vecs])
+        old = [seg["name"] for seg in self.manifest["segments"]]
+
+        name = "seg_compact_" + hashlib.blake2b(keys.tobytes(), digest_size=4).hexdigest()
+        self._write_segment(name, keys, vecs)
+        self.manifest["segments"] = [{"name": name, "count": int(len(keys))}]
+        self._write_manifest()
+
+        self._keys, self._vecs, self._lookup = [], [], {}
+        self._attach_segment(name)
+        for seg in old:
+            for suffix in ("keys", "vecs"):
+                path = os.path.join(self.dir, f"{seg}.{suffix}.npy")
+                if os.path.exists(path):
+                    os.remove(path)
+
+    # ---------- reading ----------
+    def keys_for(self, texts):
+        return np.array([text_key(self.model_name, t) for t in texts], dtype=KEY_DTYPE)
+
+    def gather(self, keys):
+        """Return float32 vectors for `keys` (all must be cached)."""
+        n = len(keys)
+        out = np.empty((n, self.dim), dtype=np.float32)
+        loc = np.array([self._lookup[k] for k in keys.tolist()], dtype=np.int64).reshape(n, 2)
+        for seg_idx in np.unique(loc[:, 0]):
+            mask = loc[:, 0] == seg_idx
+            rows = loc[mask, 1]
+            order = np.argsort(rows)  # sequential reads from the memmap
+            block = self._vecs[seg_idx][rows[order]]
+            dest = np.flatnonzero(mask)[order]
+            out[dest] = block
+        return out
+
+    def missing(self, texts):
+        """(keys for `texts`, {key: text} of the distinct texts not cached yet)."""
+        keys = self.keys_for(texts)
+        missing = {}
+        for k, t in zip(keys.tolist(), texts):
+            if k not in self._lookup and k not in missing:
+                missing[k] = t
+        return keys, missing
+
+    def get_or_encode(self, texts, encode_fn):
+        """
+        Return a (len(texts), dim) float32 array of embeddings for `texts`.
+        Only texts whose (model, text) key is missing are passed to
+        `encode_fn(list_of_texts) -> np.ndarray`; their vectors are
+        persisted before returning.
+        """
+        keys, missing = self.missing(texts)
+        hits = int(sum(k in self._lookup for k in keys.tolist()))
+
+        print(f"Embedding cache: {hits} hits, {len(missing)} unique texts to encode.")
+        if missing:
+            new_vecs = encode_fn(list(missing.values()))
+            self.add(list(missing.keys()), np.asarray(new_vecs, dtype=np.float32))
+
+        if len(texts) == 0:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self.gather(keys)
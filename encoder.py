@@ -0,0 +1,66 @@
+"""
+Sentence encoder loading with an optional ONNX Runtime backend.
+
+sentence_transformers (and torch with it) is imported only when a model
+is actually loaded, so commands that never encode start quickly.
+
+  torch      the default PyTorch model, used to build the corpus index
+  onnx       the same weights exported to ONNX, run by ONNX Runtime
+  onnx-int8  dynamically quantized int8 ONNX weights for this CPU's
+             instruction set; fastest on CPU, slightly different vectors
+
+The ONNX backends need `pip install "sentence-transformers[onnx]"`. They
+are meant for query-time encoding against an index built with `torch`;
+benchmarks/bench_encoder.py reports their speed-up and how closely their
+vectors and top-k results track the PyTorch model.
+
+    model = load_encoder("sentence-transformers/all-MiniLM-L6-v2", backend="onnx-int8")
+"""
+
+# ======== Config ========
+ENCODER_BACKENDS = ("torch", "onnx", "onnx-int8")
+# quantized exports published in the sentence-transformers model repos, by CPU feature
+INT8_FILES = (
+    ("avx512_vnni", "onnx/model_qint8_avx512_vnni.onnx"),
+    ("avx512f", "onnx/model_qint8_avx512.onnx"),
+    ("avx2", "onnx/model_quint8_avx2.onnx"),
+)
+INT8_ARM_FILE = "onnx/model_qint8_arm64.onnx"
+
+
+def cpu_flags():
+    try:
+        with open("/proc/cpuinfo", "r") as f:
+            for line in f:
+                if line.startswith(("flags", "Features")):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def int8_model_file():
+    """The quantized ONNX file matching this CPU (AVX-512 VNNI > AVX-512 > AVX2, or ARM64)."""
+    import platform
+
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return INT8_ARM_FILE
+    flags = cpu_flags()
+    for flag, path in INT8_FILES:
+        if flag in flags:
+            return path
+    return INT8_FILES[-1][1]
+
+
+def load_encoder(model_name, backend="torch"):
+    """A SentenceTransformer for `model_name` running on `backend`."""
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(model_name)
+    if backend == "onnx":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx")
+    if backend == "onnx-int8":
+        return SentenceTransformer(model_name, device="cpu", backend="onnx",
+                                   model_kwargs={"file_name": int8_model_file()})
+    raise ValueError(f"Unknown encoder backend {backend!r}; expected one of {ENCODER_BACKENDS}.")
@@ -0,0 +1,259 @@
+"""
+Vectorized qrels + run evaluator.
+
+    python evaluator/eval_engine.py --qrels qrels.json --run retrieval_results/faiss_fusion_results.json --ks 1 5 10
+    python evaluator/eval_engine.py --qrels-from-labels retrieval_results/manual_faiss_fusion_results.json \
+        --run retrieval_results/manual_faiss_fusion_results.json
+
+Qrels: JSON {qid: {doc_id: grade}} / {qid: [doc_id, ...]}, JSONL with one
+{"qid", "doc", "grade"} judgment per line (grade defaults to 1), or TREC
+text "qid 0 doc_id grade". Runs: the faiss_fusion_results.json format
+(optionally with per-query "latency_ms"), JSONL of the same blocks, or
+TREC text "qid Q0 doc_id rank score tag". Stage timings written by
+query_index.py to <run>.timing.json are picked up automatically.
+
+All metrics are computed on a (n_queries, max_k) gain matrix, so every
+cutoff for every query is a handful of NumPy operations. Unlike
+evaluator.py, AP@k divides by min(#relevant in qrels, k) and NDCG@k uses
+the ideal ranking of all judged documents, so runs with different
+result counts are comparable.
+"""
+import argparse
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# ======== CONFIG ========
+DEFAULT_KS = (1, 3, 5, 10)
+METRICS = ("P", "HR", "MRR", "MAP", "NDCG")
+TIMING_SUFFIX = ".timing.json"
+
+
+# --------- Loading ---------
+def _read_json_or_jsonl(path: str):
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
+
+def load_qrels(path: str) -> Dict[str, Dict[str, float]]:
+    """Returns {qid: {doc_id: grade}}; grades <= 0 are dropped."""
+    if path.endswith((".json", ".jsonl")):
+        data = _read_json_or_jsonl(path)
+        if isinstance(data, list):
+            # JSONL: one {"qid", "doc", "grade"} judgment per line
+            merged: Dict[str, Dict[str, float]] = {}
+            for row in data:
+                merged.setdefault(str(row["qid"]), {})[str(row["doc"])] = float(row.get("grade", 1))
+            data = merged
+        qrels = {}
+        for qid, docs in data.items():
+            if isinstance(docs, dict):
+                qrels[str(qid)] = {str(d): float(g) for d, g in docs.items() if float(g) > 0}
+            else:
+                qrels[str(qid)] = {str(d): 1.0 for d in docs}
+        return qrels
+
+    qrels: Dict[str, Dict[str, float]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 4:
+                continue
+            qid, _, doc, grade = parts[:4]
+            if float(grade) > 0:
+                qrels.setdefault(qid, {})[doc] = float(grade)
+    return qrels
+
+
+def _blocks(data) -> list:
+    if isinstance(data, dict):
+        for key in ("queries", "results", "data"):
+            if key in data and isinstance(data[key], list):
+                return data[key]
+        raise ValueError("Unexpected JSON structure; expected a list of query blocks.")
+    return data
+
+
+def _doc_id(hit: dict) -> str:
+    recipe = hit.get("recipe", hit)
+    return str(recipe.get("id", hit.get("doc_id")))
+
+
+def qrels_from_labels(path: str) -> Dict[str, Dict[str, float]]:
+    """Qrels from a hand-labeled run: every result with valid=1 is relevant."""
+    qrels: Dict[str, Dict[str, float]] = {}
+    for block in _blocks(_read_json_or_jsonl(path)):
+        qid = str(block.get("query_id", block.get("id")))
+        rel = qrels.setdefault(qid, {})
+        for hit in block.get("results", []):
+            if int(hit.get("valid", 0)) > 0:
+                rel[_doc_id(hit)] = float(hit["valid"])
+    return qrels
+
+
+def load_timing(run_path: str) -> Dict[str, float]:
+    """Stage timings saved next to the run file, if any."""
+    try:
+        with open(run_path + TIMING_SUFFIX, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def load_run(path: str) -> Tuple[Dict[str, List[str]], Dict[str, float], Optional[float]]:
+    """Returns ({qid: ranked doc ids}, {qid: latency_ms}, wall time in seconds or None)."""
+    ranked: Dict[str, List[str]] = {}
+    latency: Dict[str, float] = {}
+    wall = load_timing(path).get("wall_time_s")
+
+    if path.endswith((".json", ".jsonl")):
+        data = _read_json_or_jsonl(path)
+        if isinstance(data, dict):
+            wall = data.get("timing", {}).get("wall_time_s", wall)
+        for block in _blocks(data):
+            qid = str(block.get("query_id", block.get("id")))
+            hits = block.get("results", [])
+            if hits and "rank" in hits[0]:
+                hits = sorted(hits, key=lambda h: h.get("rank", 10**9))
+            ranked[qid] = [_doc_id(h) for h in hits]
+            if "latency_ms" in block:
+                latency[qid] = float(block["latency_ms"])
+        return ranked, latency, wall
+
+    rows: Dict[str, List[Tuple[int, str]]] = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 5:
+                continue
+            qid, _, doc, rank = parts[:4]
+            rows.setdefault(qid, []).append((int(rank), doc))
+    ranked = {qid: [doc for _, doc in sorted(r)] for qid, r in rows.items()}
+    return ranked, latency, wall
+
+
+# --------- Matrices ---------
+def gain_matrix(ranked: Dict[str, List[str]], qrels: Dict[str, Dict[str, float]],
+                qids: List[str], depth: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    G[i, r] = grade of the doc at rank r+1 for query i (0 if unjudged/missing).
+    ideal[i, r] = i-th query's judged grades sorted descending, padded with 0.
+    """
+    G = np.zeros((len(qids), depth), dtype=np.float64)
+    ideal = np.zeros((len(qids), depth), dtype=np.float64)
+    for i, qid in enumerate(qids):
+        rel = qrels.get(qid, {})
+        docs = ranked.get(qid, [])[:depth]
+        if docs:
+            G[i, :len(docs)] = [rel.get(d, 0.0) for d in docs]
+        grades = sorted(rel.values(), reverse=True)[:depth]
+        ideal[i, :len(grades)] = grades
+    return G, ideal
+
+
+def compute_metrics(G: np.ndarray, ideal: np.ndarray, ks) -> Dict[str, np.ndarray]:
+    """Per-query metric vectors, keyed like "NDCG@10"."""
+    binary = (G > 0).astype(np.float64)
+    ranks = np.arange(1, G.shape[1] + 1, dtype=np.float64)
+    discounts = 1.0 / np.log2(ranks + 1)
+    n_rel = (ideal > 0).sum(axis=1)
+
+    hits_cum = np.cumsum(binary, axis=1)
+    prec_at_rank = hits_cum / ranks
+    ap_terms = np.cumsum(prec_at_rank * binary, axis=1)
+    dcg_cum = np.cumsum(G * discounts, axis=1)
+    idcg_cum = np.cumsum(ideal * discounts, axis=1)
+    any_rel = binary.any(axis=1)
+    first_rel = np.where(any_rel, binary.argmax(axis=1), G.shape[1])  # 0-based rank of first hit
+
+    out = {}
+    for k in ks:
+        c = min(k, G.shape[1]) - 1
+        out[f"P@{k}"] = hits_cum[:, c] / k
+        out[f"HR@{k}"] = (hits_cum[:, c] > 0).astype(np.float64)
+        out[f"MRR@{k}"] = np.where(first_rel < k, 1.0 / (first_rel + 1), 0.0)
+        denom = np.minimum(n_rel, k)
+        out[f"MAP@{k}"] = np.divide(ap_terms[:, c], denom, out=np.zeros(len(G)), where=denom > 0)
+        out[f"NDCG@{k}"] = np.divide(dcg_cum[:, c], idcg_cum[:, c], out=np.zeros(len(G)), where=idcg_cum[:, c] > 0)
+    return out
+
+
+def latency_summary(latency: Dict[str, float], n_queries: int, wall: Optional[float]) -> Dict[str, float]:
+    if not latency:
+        return {}
+    lat = np.fromiter(latency.values(), dtype=np.float64)
+    summary = {
+        "latency_mean_ms": float(lat.mean()),
+        "latency_p50_ms": float(np.percentile(lat, 50)),
+        "latency_p90_ms": float(np.percentile(lat, 90)),
+        "latency_p99_ms": float(np.percentile(lat, 99)),
+    }
+    if wall:
+        summary["throughput_qps"] = n_queries / wall
+    return summary
+
+
+def evaluate(ranked, qrels, ks=DEFAULT_KS, latency=None, wall=None, judged_only=True):
+    """
+    Macro-averaged metrics plus latency percentiles. With `judged_only`,
+    queries without any relevant document in qrels are skipped.
+    """
+    qids = [q for q in ranked if not judged_only or qrels.get(q)]
+    G, ideal = gain_matrix(ranked, qrels, qids, max(ks))
+    per_query = compute_metrics(G, ideal, ks)
+    summary = {name: float(v.mean()) if len(v) else 0.0 for name, v in per_query.items()}
+    summary["n_queries"] = len(qids)
+    summary.update(latency_summary(latency or {}, len(ranked), wall))
+    return summary, qids, per_query
+
+
+# --------- Printing ---------
+def print_summary(summary, ks):
+    print(f"\nEvaluated {summary['n_queries']} queries")
+    print("-" * 60)
+    for metric in METRICS:
+        print(f"{metric:<5}: " + ", ".join(f"@{k}={summary[f'{metric}@{k}']:.3f}" for k in ks))
+    if "latency_p50_ms" in summary:
+        print(f"LATENCY: mean={summary['latency_mean_ms']:.2f}ms p50={summary['latency_p50_ms']:.2f}ms "
+              f"p90={summary['latency_p90_ms']:.2f}ms p99={summary['latency_p99_ms']:.2f}ms")
+    if "throughput_qps" in summary:
+        print(f"THROUGHPUT: {summary['throughput_qps']:.1f} queries/s")
+    stages = summary.get("stages") or {}
+    if stages:
+        print("STAGES : " + ", ".join(f"{k}={v:.3f}" for k, v in stages.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate a retrieval run against qrels.")
+    src = parser.add_mutually_exclusive_group(required=True)
+    src.add_argument("--qrels", help="qrels file (JSON or TREC text)")
+    src.add_argument("--qrels-from-labels", help="use valid=1 results of a labeled run as qrels")
+    parser.add_argument("--run", required=True, help="run file (results JSON/JSONL or TREC text)")
+    parser.add_argument("--ks", type=int, nargs="+", default=list(DEFAULT_KS))
+    parser.add_argument("--all-queries", action="store_true", help="also score queries with no relevant docs")
+    parser.add_argument("--per-query", action="store_true")
+    parser.add_argument("--output", help="write the summary as JSON")
+    args = parser.parse_args(argv)
+
+    qrels = load_qrels(args.qrels) if args.qrels else qrels_from_labels(args.qrels_from_labels)
+    ranked, latency, wall = load_run(args.run)
+    summary, qids, per_query = evaluate(ranked, qrels, args.ks, latency, wall, not args.all_queries)
+    summary["stages"] = load_timing(args.run)
+
+    if args.per_query:
+        names = list(per_query)
+        print("\t".join(["query_id"] + names))
+        for i, qid in enumerate(qids):
+            print("\t".join([qid] + [f"{per_query[n][i]:.3f}" for n in names]))
+    print_summary(summary, args.ks)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import json
+import mmap
+import os
+import time
+
+import numpy as np
+
+# ======== Config ========
+INDEX_FILE = "index.faiss"
+EMBEDDINGS_FILE = "embeddings.npy"
+RECIPES_FILE = "recipes.jsonl"
+OFFSETS_FILE = "offsets.npy"
+IDS_FILE = "ids.json"
+META_FILE = "meta.json"
+EMBEDDING_DTYPES = ("float32", "float16")
+
+
+def read_index_mmap(path):
+    """
+    Open a FAISS index without copying its vectors into RAM.
+    IO_FLAG_MMAP maps IVF inverted lists; newer FAISS builds also map
+    flat code arrays with IO_FLAG_MMAP_IFC, which some index types reject.
+    """
+    import faiss
+
+    flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+    ifc = getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+    if ifc:
+        try:
+            return faiss.read_index(path, flags | ifc)
+        except RuntimeError:
+            pass
+    return faiss.read_index(path, flags)
+
+
+def save_index(out_dir, index, embeddings, recipes, meta=None, embeddings_dtype="float32"):
+    """
+    Write everything query serving needs to `out_dir`:
+      index.faiss      the FAISS index; row i == recipe i, or chunk i for a chunked
+                       build, whose chunk_parents.npy (chunking.py) maps chunks to recipes
+      embeddings.npy   normalized vectors in index row order, float32 or float16 (`embeddings_dtype`)
+      recipes.jsonl    one recipe per line, in index order
+      offsets.npy      (n + 1,) int64 byte offsets into recipes.jsonl
+      ids.json         recipe `id` per row
+      meta.json        model name, dim, counts, build time
+    """
+    import faiss
+
+    os.makedirs(out_dir, exist_ok=True)
+    faiss.write_index(index, os.path.join(out_dir, INDEX_FILE))
+    if embeddings_dtype not in EMBEDDING_DTYPES:
+        raise ValueError(f"embeddings_dtype must be one of {EMBEDDING_DTYPES}, got {embeddings_dtype!r}.")
+    np.save(os.path.join(out_dir, EMBEDDINGS_FILE), np.ascontiguousarray(embeddings, dtype=embeddings_dtype))
+
+    offsets = np.empty(len(recipes) + 1, dtype=np.int64)
+    pos = 0
+    with open(os.path.join(out_dir, RECIPES_FILE), "wb") as f:
+        for i, r in enumerate(recipes):
+            offsets[i] = pos
+            line = (json.dumps(r, ensure_ascii=False) + "\n").encode("utf-8")
+            f.write(line)
+            pos += len(line)
+    offsets[len(recipes)] = pos
+    np.save(os.path.join(out_dir, OFFSETS_FILE), offsets)
+
+    with open(os.path.join(out_dir, IDS_FILE), "w", encoding="utf-8") as f:
+        json.dump([r.get("id") for r in recipes], f)
+
+    meta = dict(meta or {})
+    meta.update({
+        "ntotal": int(index.ntotal),
+        "dim": int(index.d),
+        "faiss_class": type(index).__name__,
+        "embeddings_dtype": embeddings_dtype,
+        "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    })
+    with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    print(f"Saved index with {index.ntotal} vectors to {out_dir}")
+
+
+class IndexStore:
+    """
+    Read-only view of a directory written by `save_index`.
+    The index, embeddings and recipe file are memory-mapped, so opening a
+    store costs roughly the index load time regardless of corpus size.
+    The index is read on first access to `store.index`, so BM25-only
+    callers never load faiss. `store[i]` decodes recipe i on demand.
+    """
+
+    def __init__(self, index_dir, mmap_index=True):
+        self.dir = index_dir
+        with open(os.path.join(index_dir, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        self.mmap_index = mmap_index
+        self._index = None
+        self.offsets = np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode="r")
+        self._embeddings = None
+        self._ids = None
+        self._row_of = None
+
+        self._recipes_file = open(os.path.join(index_dir, RECIPES_FILE), "rb")
+        size = os.fstat(self._recipes_file.fileno()).st_size
+        self._recipes = mmap.mmap(self._recipes_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, row):
+        row = int(row)
+        return json.loads(self._recipes[int(self.offsets[row]):int(self.offsets[row + 1])])
+
+    @property
+    def index(self):
+        if self._index is None:
+            import faiss  # not at module level, so reading meta / file names stays cheap
+
+            index_path = os.path.join(self.dir, INDEX_FILE)
+            self._index = read_index_mmap(index_path) if self.mmap_index else faiss.read_index(index_path)
+        return self._index
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._embeddings = np.load(os.path.join(self.dir, EMBEDDINGS_FILE), mmap_mode="r")
+        return self._embeddings
+
+    @property
+    def ids(self):
+        if self._ids is None:
+            with open(os.path.join(self.dir, IDS_FILE), "r", encoding="utf-8") as f:
+                self._ids = json.load(f)
+        return self._ids
+
+    def row_of(self, recipe_id):
+        """Index row of a recipe `id`, or None."""
+        if self._row_of is None:
+            self._row_of = {rid: row for row, rid in enumerate(self.ids)}
+        return self._row_of.get(recipe_id)
+
+    def close(self):
+        if isinstance(self._recipes, mmap.mmap):
+            self._recipes.close()
+        self._recipes_file.close()
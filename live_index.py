@@ -0,0 +1,290 @@
+"""
+Incremental add / update / delete on top of an index directory written by
+build_index.py.
+
+The saved FAISS index is wrapped in an IndexIDMap2 whose labels are the
+saved rows (0..n-1); every upserted recipe is added under the next free
+label. Each recipe `id` maps to its current label, so an update is
+"tombstone the old label, add the new vector" and a delete only clears
+the label's bit in the `alive` bitmap, which FAISS applies as an
+IDSelector inside every search. Changes are appended to updates.jsonl and
+replayed when the directory is opened again (through the embedding cache,
+so nothing is re-encoded). compact() rebuilds a clean index from the live
+recipes in a background thread while searches keep using the current
+one, then swaps the new directory in.
+
+    live = LiveIndex("index", encode_fn)
+    live.upsert(new_recipes)
+    live.delete(["recnlg_12"])
+    D, I = live.search(q_emb, 5, spec)     # I holds labels, live[label] is the recipe
+    live.compact()
+"""
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+
+from ann_index import build_ann_index, set_search_params, with_ids
+from baseline import build_text
+from bm25 import BM25Index
+from dedup import VARIANTS_FILE
+from index_store import IndexStore, save_index
+from recipe_filters import AttributeIndex, FilterSpec, bitmap_selector, search_params
+
+# ======== Config ========
+UPDATES_FILE = "updates.jsonl"
+COMPACT_DEAD_RATIO = 0.2     # compact once this share of labels is tombstoned...
+COMPACT_DELTA_RATIO = 0.2    # ...or this share of live recipes was added since the last build
+
+
+class LiveIndex:
+    def __init__(self, index_dir, encode_fn):
+        """`encode_fn(list_of_texts) -> (n, dim) array` embeds upserted recipes."""
+        self.dir = index_dir
+        self.encode_fn = encode_fn
+        self._lock = threading.RLock()
+        self._compaction = None   # running compaction thread
+        self._pending = None      # ops logged while a compaction runs
+        self.generation = 0       # bumped on every change, see `version`
+        self._load()
+        self._replay()
+
+    def _load(self):
+        self.store = IndexStore(self.dir, mmap_index=False)  # the index must be writable
+        self.meta = self.store.meta
+        if "chunking" in self.meta:
+            raise ValueError(f"{self.dir} is a chunk-level index; live updates need a single-vector build.")
+        self.base = self.store.index
+        saved = self.meta.get("index_params", {})
+        set_search_params(self.base, nprobe=saved.get("nprobe"), ef_search=saved.get("ef_search"))
+        self.index = with_ids(self.base)
+        self.n_base = len(self.store)
+        if AttributeIndex.exists(self.dir):
+            self.filters = AttributeIndex.load(self.dir)
+        else:
+            self.filters = AttributeIndex.build(self.store)
+        self.alive = np.ones(self.n_base, dtype=bool)
+        self.label_of = {str(rid): row for row, rid in enumerate(self.store.ids)}
+        self.delta_recipes = []   # recipe of label n_base + i
+        self.delta_vecs = []      # normalized float32 blocks, in label order
+
+    # ---------- reading ----------
+    def __len__(self):
+        return len(self.alive)
+
+    def __getitem__(self, label):
+        label = int(label)
+        if label < self.n_base:
+            return self.store[label]
+        return self.delta_recipes[label - self.n_base]
+
+    @property
+    def ntotal(self):
+        return int(self.alive.sum())
+
+    @property
+    def version(self):
+        """Changes whenever search results may change; use as the result-cache index version."""
+        return f"{self.meta['built_at']}/{self.generation}"
+
+    def stats(self):
+        return {
+            "ntotal": self.ntotal,
+            "labels": len(self.alive),
+            "tombstones": int(len(self.alive) - self.alive.sum()),
+            "added_since_build": len(self.delta_recipes),
+            "compacting": self._compaction is not None and self._compaction.is_alive(),
+        }
+
+    def mask(self, spec=None):
+        """Boolean mask over labels: alive and, if given, matching `spec`."""
+        if not spec:
+            return self.alive
+        delta = np.fromiter((spec.matches(r) for r in self.delta_recipes), dtype=bool,
+                            count=len(self.delta_recipes))
+        return self.alive & np.concatenate([self.filters.mask(spec), delta])
+
+    def search(self, q_emb, top_k, spec=None):
+        """(scores, labels) of the top-k live recipes; labels are -1 when fewer match."""
+        with self._lock:
+            keep = self.mask(spec)
+            params = None if keep.all() else search_params(self.base, bitmap_selector(keep))
+            return self.index.search(np.ascontiguousarray(q_emb, dtype=np.float32), top_k, params=params)
+
+    # ---------- writing ----------
+    def _log(self, op):
+        with open(os.path.join(self.dir, UPDATES_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(op, ensure_ascii=False) + "\n")
+        if self._pending is not None:
+            self._pending.append(op)
+
+    def upsert(self, recipes, log=True):
+        """Add new recipes and replace existing ones with the same `id`."""
+        import faiss  # not at module level: server.py / update_index.py import this module
+
+        recipes = [r for r in recipes if r.get("id") is not None]
+        if not recipes:
+            return 0
+        vecs = np.ascontiguousarray(self.encode_fn([build_text(r) for r in recipes]), dtype=np.float32)
+        faiss.normalize_L2(vecs)
+        with self._lock:
+            first = len(self.alive)
+            labels = np.arange(first, first + len(recipes), dtype=np.int64)
+            self.alive = np.concatenate([self.alive, np.ones(len(recipes), dtype=bool)])
+            for r, label in zip(recipes, labels.tolist()):
+                old = self.label_of.get(str(r["id"]))
+                if old is not None:
+                    self.alive[old] = False
+                self.label_of[str(r["id"])] = label
+            self.index.add_with_ids(vecs, labels)
+            self.delta_recipes.extend(recipes)
+            self.delta_vecs.append(vecs)
+            self.generation += 1
+            if log:
+                for r in recipes:
+                    self._log({"op": "upsert", "recipe": r})
+        return len(recipes)
+
+    def delete(self, ids, log=True):
+        """Tombstone recipes by `id`; unknown ids are ignored. Returns how many were removed."""
+        removed = 0
+        with self._lock:
+            for rid in ids:
+                label = self.label_of.pop(str(rid), None)
+                if label is None:
+                    continue
+                self.alive[label] = False
+                removed += 1
+                if log:
+                    self._log({"op": "delete", "id": rid})
+            if removed:
+                self.generation += 1
+        return removed
+
+    def _apply(self, ops, log=True):
+        """Apply logged ops in order, encoding runs of consecutive upserts together."""
+        batch = []
+        for op in ops + [None]:
+            if op is not None and op["op"] == "upsert":
+                batch.append(op["recipe"])
+                continue
+            self.upsert(batch, log=log)
+            batch = []
+            if op is not None:
+                self.delete([op["id"]], log=log)
+
+    def _replay(self):
+        path = os.path.join(self.dir, UPDATES_FILE)
+        if not os.path.exists(path):
+            return
+        with open(path, "r", encoding="utf-8") as f:
+            ops = [json.loads(line) for line in f if line.strip()]
+        self._apply(ops, log=False)
+        print(f"Replayed {len(ops)} index updates ({self.ntotal} live recipes).")
+
+    def sync(self, recipes, delete_missing=False):
+        """
+        Make the index match `recipes` for the ids it contains: add new ids,
+        re-encode changed ones and, with `delete_missing`, drop indexed ids
+        of the same `source` that are no longer present.
+        Returns (added, updated, deleted).
+        """
+        new, changed, seen, sources = [], [], set(), set()
+        for r in recipes:
+            rid = str(r.get("id"))
+            seen.add(rid)
+            sources.add(str(r.get("source") or "").strip().lower())
+            label = self.label_of.get(rid)
+            if label is None:
+                new.append(r)
+            elif json.dumps(self[label], sort_keys=True) != json.dumps(r, sort_keys=True):
+                changed.append(r)
+        self.upsert(new + changed)
+
+        stale = []
+        if delete_missing:
+            stale = [rid for rid in self.ids_with_source(sources - {""}) if rid not in seen]
+            self.delete(stale)
+        return len(new), len(changed), len(stale)
+
+    def ids_with_source(self, sources):
+        """Ids of live recipes whose `source` is in `sources` (lower-cased)."""
+        base = np.zeros(self.n_base, dtype=bool)
+        for s in sources:
+            base |= self.filters.mask(FilterSpec(tags=[f"source:{s}"]))
+        ids = [str(self.store.ids[row]) for row in np.flatnonzero(base & self.alive[:self.n_base])]
+        for i, r in enumerate(self.delta_recipes):
+            if self.alive[self.n_base + i] and str(r.get("source") or "").strip().lower() in sources:
+                ids.append(str(r["id"]))
+        return ids
+
+    # ---------- compaction ----------
+    def needs_compaction(self):
+        live = max(self.ntotal, 1)
+        dead = len(self.alive) - self.ntotal
+        return dead / len(self.alive) > COMPACT_DEAD_RATIO or len(self.delta_recipes) / live > COMPACT_DELTA_RATIO
+
+    def compact(self, background=True):
+        """
+        Rebuild the index from live recipes only. Searches and updates keep
+        working on the current index until the rebuilt one is swapped in;
+        updates made meanwhile are re-applied to it.
+        """
+        with self._lock:
+            if self._compaction is not None and self._compaction.is_alive():
+                return self._compaction
+            labels = np.flatnonzero(self.alive)
+            delta_vecs = list(self.delta_vecs)
+            self._pending = []
+        self._compaction = threading.Thread(target=self._compact, args=(labels, delta_vecs),
+                                            name="index-compaction", daemon=True)
+        self._compaction.start()
+        if not background:
+            self._compaction.join()
+        return self._compaction
+
+    def _compact(self, labels, delta_vecs):
+        start = time.perf_counter()
+        try:
+            base_rows = labels[labels < self.n_base]
+            vecs = np.asarray(self.store.embeddings[base_rows], dtype=np.float32)
+            if delta_vecs:
+                delta = np.concatenate(delta_vecs)[labels[labels >= self.n_base] - self.n_base]
+                vecs = np.concatenate([vecs, delta])
+            recipes = [self[label] for label in labels]
+
+            # nlist is re-derived from the new corpus size
+            params = {**self.meta.get("index_params", {}), "nlist": None}
+            index, params = build_ann_index(vecs, self.meta.get("index_type", "flat"), **params)
+            tmp_dir = self.dir.rstrip("/\\") + ".compacting"
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            meta = {k: self.meta[k] for k in ("model", "index_type") if k in self.meta}
+            save_index(tmp_dir, index, vecs, recipes, meta={**meta, "index_params": params},
+                       embeddings_dtype=self.meta.get("embeddings_dtype", "float32"))
+            AttributeIndex.build(recipes).save(tmp_dir)
+            if BM25Index.exists(self.dir):
+                BM25Index.build(recipes).save(tmp_dir)
+            if os.path.exists(os.path.join(self.dir, VARIANTS_FILE)):
+                shutil.copy(os.path.join(self.dir, VARIANTS_FILE), tmp_dir)
+        except Exception:
+            with self._lock:
+                self._pending = None
+            raise
+
+        with self._lock:
+            old_dir = self.dir.rstrip("/\\") + ".old"
+            shutil.rmtree(old_dir, ignore_errors=True)
+            os.rename(self.dir, old_dir)
+            os.rename(tmp_dir, self.dir)
+            old_store, pending = self.store, self._pending
+            self._pending = None
+            self._load()
+            self._apply(pending)
+            self.generation += 1
+            old_store.close()
+            shutil.rmtree(old_dir, ignore_errors=True)
+        print(f"Compacted index to {self.ntotal} recipes in {time.perf_counter() - start:.1f}s "
+              f"({len(pending)} updates re-applied).")
@@ -0,0 +1,97 @@
+"""
+Sharded, multi-process corpus encoding.
+
+Texts that are not yet in the embedding cache are sorted by length and
+cut into shards, so every encoder batch holds texts of similar length and
+little compute is spent on padding. Shards are encoded by a pool of worker
+processes, each holding its own SentenceTransformer, and every finished
+shard is appended to the EmbeddingCache as its own segment. A crashed or
+interrupted run therefore resumes from the shards already on disk.
+
+    vecs = encode_sharded(texts, EMBED_MODEL, "embedding_cache", workers=4)
+"""
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import multiprocessing as mp
+
+import numpy as np
+
+from embedding_cache import MAX_SEGMENTS, EmbeddingCache
+
+# ======== Config ========
+ENCODE_WORKERS = os.cpu_count() or 1
+SHARD_SIZE = 4096        # texts per shard; one cache segment per shard
+ENCODE_BATCH_SIZE = 64
+
+_model = None  # per-worker encoder, set by _init_worker
+
+
+def _init_worker(model_name, threads):
+    global _model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    torch.set_num_threads(threads)
+    _model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_shard(shard_id, texts, batch_size):
+    vecs = _model.encode(texts, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+    return shard_id, np.asarray(vecs, dtype=np.float32)
+
+
+def length_sorted_shards(texts, shard_size=SHARD_SIZE):
+    """
+    Positions into `texts` grouped into shards of similar length, longest
+    shard first so the slowest work is not left for the end of the run.
+    """
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    order = np.argsort(-lengths, kind="stable")
+    return [order[i:i + shard_size] for i in range(0, len(order), shard_size)]
+
+
+def encode_sharded(texts, model_name, cache_dir, workers=ENCODE_WORKERS, shard_size=SHARD_SIZE,
+                   batch_size=ENCODE_BATCH_SIZE, dtype="float32"):
+    """
+    (len(texts), dim) float32 embeddings of `texts`, in input order.
+    Every completed shard is persisted to the EmbeddingCache under
+    `cache_dir` before the next result is awaited.
+    """
+    cache = EmbeddingCache(cache_dir, model_name, dtype=dtype)
+    keys, missing = cache.missing(texts)
+    print(f"Embedding cache: {len(missing)} unique texts of {len(texts)} need encoding.")
+
+    if missing:
+        todo_keys = np.array(list(missing.keys()), dtype=keys.dtype)
+        todo_texts = list(missing.values())
+        shards = length_sorted_shards(todo_texts, shard_size)
+        workers = max(1, min(workers, len(shards)))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        print(f"Encoding {len(todo_texts)} texts in {len(shards)} shards on {workers} processes "
+              f"({threads} threads each)...")
+
+        start, done, n_done = time.perf_counter(), 0, 0
+        # spawn: forking a parent that already initialized torch can deadlock its thread pools
+        with ProcessPoolExecutor(max_workers=workers, mp_context=mp.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(model_name, threads)) as pool:
+            pending, next_shard = set(), 0
+            while next_shard < len(shards) or pending:
+                while next_shard < len(shards) and len(pending) < 2 * workers:
+                    shard_texts = [todo_texts[i] for i in shards[next_shard]]
+                    pending.add(pool.submit(_encode_shard, next_shard, shard_texts, batch_size))
+                    next_shard += 1
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in finished:
+                    shard_id, vecs = fut.result()
+                    cache.add(todo_keys[shards[shard_id]], vecs)
+                    done += 1
+                    n_done += len(vecs)
+                    elapsed = time.perf_counter() - start
+                    print(f"  shard {done}/{len(shards)} written ({n_done / elapsed:.0f} texts/s)")
+        # a full rewrite; after a small incremental run the new segments are left as they are
+        cache.compact(MAX_SEGMENTS)
+
+    if len(texts) == 0:
+        return np.empty((0, cache.dim or 0), dtype=np.float32)
+    return cache.gather(keys)
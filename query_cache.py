@@ -0,0 +1,120 @@
+"""
+Bounded LRU + TTL caches for the serving path.
+
+QueryEmbeddingCache maps a normalized query string to its L2-normalized
+embedding, so repeated queries skip the transformer. ResultCache maps
+(normalized query, top_k, filters, index version) to the final top-k.
+Bumping the index version (or calling invalidate()) drops stale results.
+Both expose counters for hit rate, evictions and saved encoder time.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ======== Config ========
+EMBEDDING_CACHE_SIZE = 50_000
+EMBEDDING_CACHE_TTL = None   # seconds; embeddings only change with the model
+RESULT_CACHE_SIZE = 10_000
+RESULT_CACHE_TTL = 600
+
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_query(text):
+    """Case-, whitespace- and trailing-punctuation-insensitive cache key."""
+    return _SPACE_RE.sub(" ", text.strip().lower()).rstrip(" .!?")
+
+
+class LRUCache:
+    def __init__(self, max_size, ttl=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (value, inserted_at, cost_seconds)
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.expirations = 0
+        self.saved_seconds = 0.0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[1] > self.ttl:
+                del self._data[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[2]
+            return entry[0]
+
+    def put(self, key, value, cost=0.0):
+        """`cost` is the time it took to compute `value`, credited on every later hit."""
+        with self._lock:
+            self._data[key] = (value, time.monotonic(), cost)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "saved_seconds": round(self.saved_seconds, 4),
+        }
+
+
+class QueryEmbeddingCache(LRUCache):
+    def __init__(self, max_size=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL):
+        super().__init__(max_size, ttl)
+
+    def encode(self, encode_fn, texts):
+        """
+        Embeddings for `texts`, calling `encode_fn(list_of_texts)` only for
+        normalized queries not in the cache.
+        """
+        keys = [normalize_query(t) for t in texts]
+        found = [self.get(k) for k in keys]
+        missing = list(dict.fromkeys(k for k, v in zip(keys, found) if v is None))
+        if missing:
+            start = time.perf_counter()
+            fresh = encode_fn(missing)
+            per_query = (time.perf_counter() - start) / len(missing)
+            fresh_by_key = dict(zip(missing, fresh))
+            for k, vec in fresh_by_key.items():
+                self.put(k, vec, per_query)
+            found = [v if v is not None else fresh_by_key[k] for k, v in zip(keys, found)]
+        return np.stack(found) if found else np.empty((0, 0), dtype=np.float32)
+
+
+class ResultCache(LRUCache):
+    def __init__(self, max_size=RESULT_CACHE_SIZE, ttl=RESULT_CACHE_TTL, index_version=None):
+        super().__init__(max_size, ttl)
+        self.index_version = index_version
+
+    def key(self, query, top_k, filter_key=()):
+        return (normalize_query(query), top_k, filter_key, self.index_version)
+
+    def set_index_version(self, version):
+        """Call after the index is rebuilt or updated; old entries can no longer match."""
+        if version != self.index_version:
+            self.index_version = version
+            self.invalidate()
@@ -0,0 +1,117 @@
+import argparse
+import json
+import time
+
+from ann_index import set_search_params
+from baseline import INDEX_DIR, OUTPUT_PATH, QUERIES_PATH, TOP_K, retrieve, set_seed
+from bm25 import BM25Index
+from chunking import AGGREGATIONS, load_parents, open_search_index
+from dedup import attach_variants, load_variants
+from encoder import ENCODER_BACKENDS, load_encoder
+from index_store import IndexStore
+from recipe_filters import AttributeIndex, FilterSpec
+from rerank import RERANK_BUDGET_MS, RERANK_CANDIDATES, RERANK_MODEL, load_reranker
+from retrieval import FUSION_METHODS, QUERY_BATCH_SIZE, SEARCH_MODES
+from tracing import TRACER, Profiler, peak_rss_bytes
+
+TIMING_SUFFIX = ".timing.json"  # per-stage run timings, read by evaluator/eval_engine.py
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer queries from an index written by build_index.py.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--queries", default=QUERIES_PATH)
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    parser.add_argument("--batch-size", type=int, default=QUERY_BATCH_SIZE, help="queries per encode/search call")
+    parser.add_argument("--mode", default="dense", choices=SEARCH_MODES)
+    parser.add_argument("--backend", default="torch", choices=ENCODER_BACKENDS,
+                        help="query encoder runtime; onnx / onnx-int8 need sentence-transformers[onnx]")
+    parser.add_argument("--fusion", default="rrf", choices=FUSION_METHODS)
+    parser.add_argument("--include", nargs="*", default=[], help="ingredients every result must contain")
+    parser.add_argument("--exclude", nargs="*", default=[], help="ingredients no result may contain")
+    parser.add_argument("--tags", nargs="*", default=[], help="e.g. vegan lactose_free source:spoonacular")
+    parser.add_argument("--nprobe", type=int, help="override the IVF nprobe saved with the index")
+    parser.add_argument("--ef-search", type=int, help="override the HNSW efSearch saved with the index")
+    parser.add_argument("--chunk-aggregate", default="max", choices=AGGREGATIONS,
+                        help="how chunk scores combine into a recipe score (chunked indexes only)")
+    parser.add_argument("--mmr", type=float, metavar="LAMBDA",
+                        help="diversify results with MMR (1 = relevance only, lower = more diverse)")
+    parser.add_argument("--rerank", action="store_true", help="re-rank candidates with a cross-encoder")
+    parser.add_argument("--rerank-model", default=RERANK_MODEL)
+    parser.add_argument("--rerank-candidates", type=int, default=RERANK_CANDIDATES,
+                        help="first-stage candidates per query (upper bound)")
+    parser.add_argument("--rerank-budget-ms", type=float, default=RERANK_BUDGET_MS,
+                        help="cross-encoder time per batch; 0 disables the adaptive budget")
+    parser.add_argument("--trace", help="write stage timings / peak RSS / counters (.json, or .prom for Prometheus)")
+    parser.add_argument("--profile", help="write cProfile stats of the query phase to this .prof file")
+    args = parser.parse_args(argv)
+    if args.mmr is not None and not 0 <= args.mmr <= 1:
+        parser.error("--mmr must be between 0 and 1")
+
+    timing = {}
+    start = time.perf_counter()
+    store = IndexStore(args.index_dir)
+    # bm25 mode never reads the faiss index (nor imports faiss)
+    index = open_search_index(store, args.chunk_aggregate) if args.mode != "bm25" else None
+    timing["index_load_s"] = time.perf_counter() - start
+    vectors = f" ({store.index.ntotal} vectors)" if index is not None else ""
+    print(f"Loaded index with {len(store)} recipes{vectors} in {timing['index_load_s']:.2f}s")
+    if index is not None:
+        saved = store.meta.get("index_params", {})
+        set_search_params(
+            store.index,
+            nprobe=args.nprobe or saved.get("nprobe"),
+            ef_search=args.ef_search or saved.get("ef_search"),
+        )
+    if args.mmr is not None and load_parents(args.index_dir) is not None:
+        parser.error("--mmr needs one embedding per recipe; this index is chunked")
+
+    spec = FilterSpec(args.include, args.exclude, args.tags)
+    mask = AttributeIndex.load(args.index_dir).mask(spec) if spec else None
+    if mask is not None:
+        print(f"Filter matches {int(mask.sum())} of {len(mask)} recipes.")
+    bm25 = BM25Index.load(args.index_dir) if args.mode != "dense" else None
+    start = time.perf_counter()
+    # bm25 mode never loads the encoder (nor torch)
+    model = load_encoder(store.meta["model"], args.backend) if args.mode != "bm25" else None
+    if model is not None:
+        set_seed()
+    reranker = None
+    if args.rerank:
+        reranker = load_reranker(args.rerank_model, max_candidates=args.rerank_candidates,
+                                 budget_ms=args.rerank_budget_ms or None)
+    timing["model_load_s"] = time.perf_counter() - start
+    with open(args.queries, "r", encoding="utf-8") as f:
+        queries = json.load(f)
+
+    profiler = Profiler(args.profile)
+    start = time.perf_counter()
+    with profiler:
+        results = retrieve(
+            model, index, store, queries, args.top_k, args.batch_size,
+            mode=args.mode, bm25=bm25, fusion=args.fusion, mask=mask, reranker=reranker,
+            mmr_lambda=args.mmr, embeddings=store.embeddings if args.mmr is not None else None,
+        )
+    attach_variants(results, load_variants(args.index_dir))
+    timing["wall_time_s"] = time.perf_counter() - start
+    for name, stage in TRACER.to_dict()["stages"].items():
+        timing[f"{name}_s"] = stage["total_s"]
+    timing["peak_rss_mb"] = peak_rss_bytes() / 2**20
+    timing["throughput_qps"] = len(queries) / timing["wall_time_s"] if timing["wall_time_s"] else 0.0
+    print(f"Retrieved {len(queries)} queries in {timing['wall_time_s']:.2f}s "
+          f"({timing['throughput_qps']:.1f} queries/s)")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    with open(args.output + TIMING_SUFFIX, "w", encoding="utf-8") as f:
+        json.dump(timing, f, indent=2)
+    print(f"Retrieval results saved to {args.output}")
+    profiler.dump()
+    print(TRACER.report())
+    if args.trace:
+        TRACER.save(args.trace)
+
+
+if __name__ == "__main__":
+    main()
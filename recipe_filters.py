@@ -0,0 +1,254 @@
+"""
+Precomputed ingredient / dietary-attribute index for filtered search.
+
+For every recipe we record the normalized ingredient tokens (from `ner`
+and `ingredients`) as one column of a sparse posting matrix, and a
+bitset per derived tag (vegan, vegetarian, lactose_free, gluten_free,
+nut_free, source:<name>). A filter becomes a boolean row mask built
+from a few vectorized posting-list operations, which is handed to FAISS
+as an IDSelectorBitmap so the constraint is applied inside index.search.
+
+    spec = FilterSpec(include=["peanut", "chocolate"], tags=["vegan"])
+    selector = filters.selector(spec)        # faiss.IDSelectorBitmap or None
+"""
+import json
+import os
+
+import numpy as np
+import scipy.sparse as sp
+
+from bm25 import tokenize
+
+# ======== Config ========
+FILTERS_MATRIX_FILE = "filters.npz"
+FILTERS_META_FILE = "filters.json"
+FILTER_TAGS_FILE = "filter_tags.npy"
+
+MEAT = {
+    "meat", "beef", "chicken", "pork", "fish", "seafood", "shrimp", "prawn", "crab", "lobster",
+    "turkey", "ham", "hamburger", "sausage", "goose", "duck", "pig", "lamb", "veal", "bacon",
+    "salmon", "tuna", "anchovy", "clam", "mussel", "oyster", "scallop", "gelatin", "pepperoni",
+    "salami", "prosciutto", "chorizo", "steak", "venison", "cod", "tilapia", "halibut",
+}
+DAIRY = {
+    "milk", "butter", "cream", "cheese", "yogurt", "yoghurt", "ghee", "whey", "custard",
+    "ricotta", "mozzarella", "parmesan", "cheddar", "buttermilk", "mascarpone", "feta",
+    "brie", "gouda", "kefir", "casein", "lactose",
+}
+OTHER_ANIMAL = {"egg", "honey", "mayonnaise", "lard", "gelatin"}
+GLUTEN = {
+    "flour", "wheat", "bread", "pasta", "spaghetti", "noodle", "macaroni", "barley", "rye",
+    "couscous", "cracker", "breadcrumb", "crouton", "semolina", "bulgur", "farro", "tortilla",
+    "biscuit", "cake", "cookie", "pastry", "seitan",
+}
+NUTS = {
+    "peanut", "almond", "walnut", "pecan", "cashew", "pistachio", "hazelnut", "macadamia",
+    "nut", "praline", "nutella",
+}
+# qualifiers that make a dairy word plant-based within one ingredient line
+PLANT_QUALIFIERS = {"coconut", "almond", "soy", "oat", "rice", "cashew", "peanut", "apple", "vegan", "nondairy"}
+GLUTEN_FREE_QUALIFIERS = {"gluten", "rice", "almond", "coconut", "corn", "chickpea", "buckwheat"}
+
+
+def _line_tokens(r):
+    for field in ("ner", "ingredients"):
+        value = r.get(field) or []
+        for line in (value if isinstance(value, list) else [value]):
+            yield tokenize(str(line))
+
+
+def recipe_attributes(r):
+    """(set of ingredient tokens, set of tags) for one recipe."""
+    tokens, meat, dairy, animal, gluten, nuts = set(), False, False, False, False, False
+    for toks in _line_tokens(r):
+        line = set(toks)
+        tokens |= line
+        meat |= bool(line & MEAT)
+        plant = bool(line & PLANT_QUALIFIERS)
+        dairy |= bool(line & DAIRY) and not plant
+        animal |= bool(line & OTHER_ANIMAL)
+        gluten |= bool(line & GLUTEN) and not (line & GLUTEN_FREE_QUALIFIERS)
+        nuts |= bool(line & NUTS)
+
+    tags = set()
+    if not meat:
+        tags.add("vegetarian")
+        if not dairy and not animal:
+            tags.add("vegan")
+    if not dairy:
+        tags.add("lactose_free")
+    if not gluten:
+        tags.add("gluten_free")
+    if not nuts:
+        tags.add("nut_free")
+    source = str(r.get("source") or "").strip().lower()
+    if source:
+        tags.add(f"source:{source}")
+    return tokens, tags
+
+
+class FilterSpec:
+    """
+    include: every term must appear (multi-word terms require all their tokens)
+    exclude: no term may appear
+    tags:    every tag must hold, e.g. "vegan", "lactose_free", "source:spoonacular"
+    """
+
+    def __init__(self, include=(), exclude=(), tags=()):
+        self.include = list(include)
+        self.exclude = list(exclude)
+        self.tags = [t.strip().lower() for t in tags]
+
+    def __bool__(self):
+        return bool(self.include or self.exclude or self.tags)
+
+    def key(self):
+        return (tuple(sorted(self.include)), tuple(sorted(self.exclude)), tuple(sorted(self.tags)))
+
+    def matches(self, recipe):
+        """Same predicate as AttributeIndex.mask, evaluated on a single recipe."""
+        tokens, tags = recipe_attributes(recipe)
+        has = lambda term: all(t in tokens for t in tokenize(term))
+        return (all(has(t) for t in self.include)
+                and not any(has(t) for t in self.exclude)
+                and all(t in tags for t in self.tags))
+
+    @staticmethod
+    def _terms(d, key):
+        """A list of strings, or one comma-separated string as in the server's GET form."""
+        value = d.get(key, [])
+        if isinstance(value, str):
+            return [v for v in value.split(",") if v]
+        if not isinstance(value, (list, tuple)) or not all(isinstance(v, str) for v in value):
+            raise ValueError(f"'{key}' must be a list of strings or a comma-separated string")
+        return list(value)
+
+    @classmethod
+    def from_dict(cls, d):
+        d = d or {}
+        tags = cls._terms(d, "tags")
+        if d.get("source"):
+            tags.append(f"source:{d['source']}")
+        return cls(cls._terms(d, "include"), cls._terms(d, "exclude"), tags)
+
+
+class AttributeIndex:
+    def __init__(self, postings, vocab, tags, tag_bits):
+        self.postings = postings.tocsc()   # (n_docs, n_terms) bool; column j = posting list of term j
+        self.vocab = vocab                 # token -> column
+        self.tags = tags                   # tag -> column in tag_bits
+        self.tag_bits = tag_bits           # (n_tags, ceil(n_docs / 8)) uint8, little bit order
+
+    @property
+    def n_docs(self):
+        return self.postings.shape[0]
+
+    @classmethod
+    def build(cls, recipes):
+        vocab, tags = {}, {}
+        indptr, indices, tag_rows = [0], [], []
+        for r in recipes:
+            tokens, recipe_tags = recipe_attributes(r)
+            indices.extend(vocab.setdefault(t, len(vocab)) for t in tokens)
+            indptr.append(len(indices))
+            tag_rows.append([tags.setdefault(t, len(tags)) for t in recipe_tags])
+
+        n = len(indptr) - 1
+        postings = sp.csr_matrix(
+            (np.ones(len(indices), dtype=bool), np.asarray(indices, dtype=np.int32), np.asarray(indptr)),
+            shape=(n, len(vocab)),
+        )
+        dense_tags = np.zeros((len(tags), n), dtype=bool)
+        for row, cols in enumerate(tag_rows):
+            dense_tags[cols, row] = True
+        tag_bits = np.packbits(dense_tags, axis=1, bitorder="little")
+        print(f"Attribute index built over {n} recipes, {len(vocab)} ingredient terms, {len(tags)} tags.")
+        return cls(postings, vocab, tags, tag_bits)
+
+    # ---------- predicates ----------
+    def _term_mask(self, term):
+        """Rows containing every token of `term`; unknown tokens match nothing."""
+        mask = np.ones(self.n_docs, dtype=bool)
+        for tok in tokenize(term):
+            col = self.vocab.get(tok)
+            if col is None:
+                return np.zeros(self.n_docs, dtype=bool)
+            hit = np.zeros(self.n_docs, dtype=bool)
+            hit[self.postings.indices[self.postings.indptr[col]:self.postings.indptr[col + 1]]] = True
+            mask &= hit
+        return mask
+
+    def _tag_mask(self, tag):
+        col = self.tags.get(tag)
+        if col is None:
+            return np.zeros(self.n_docs, dtype=bool)
+        return np.unpackbits(self.tag_bits[col], count=self.n_docs, bitorder="little").astype(bool)
+
+    def mask(self, spec):
+        """Boolean (n_docs,) mask of recipes satisfying `spec`."""
+        mask = np.ones(self.n_docs, dtype=bool)
+        for term in spec.include:
+            mask &= self._term_mask(term)
+        for term in spec.exclude:
+            mask &= ~self._term_mask(term)
+        for tag in spec.tags:
+            mask &= self._tag_mask(tag)
+        return mask
+
+    def selector(self, spec):
+        """FAISS IDSelectorBitmap for `spec`, or None when the spec is empty."""
+        if not spec:
+            return None
+        return bitmap_selector(self.mask(spec))
+
+    # ---------- persistence ----------
+    def save(self, out_dir):
+        sp.save_npz(os.path.join(out_dir, FILTERS_MATRIX_FILE), self.postings.tocsc())
+        np.save(os.path.join(out_dir, FILTER_TAGS_FILE), self.tag_bits)
+        with open(os.path.join(out_dir, FILTERS_META_FILE), "w", encoding="utf-8") as f:
+            json.dump({"vocab": self.vocab, "tags": self.tags}, f)
+
+    @classmethod
+    def load(cls, index_dir):
+        postings = sp.load_npz(os.path.join(index_dir, FILTERS_MATRIX_FILE))
+        tag_bits = np.load(os.path.join(index_dir, FILTER_TAGS_FILE))
+        with open(os.path.join(index_dir, FILTERS_META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(postings, meta["vocab"], meta["tags"], tag_bits)
+
+    @staticmethod
+    def exists(index_dir):
+        return os.path.exists(os.path.join(index_dir, FILTERS_MATRIX_FILE))
+
+
+def bitmap_selector(mask):
+    """
+    Wrap a boolean row mask as a FAISS selector. The packed bitmap must
+    outlive the search, so it is attached to the selector object.
+    """
+    import faiss  # not at module level, so BM25-only filtering never loads it
+
+    bits = np.packbits(mask, bitorder="little")
+    sel = faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bits))
+    sel.bits_ref = bits
+    return sel
+
+
+def search_params(index, selector):
+    """SearchParameters carrying `selector` and the index's current nprobe / efSearch."""
+    import faiss
+
+    if selector is None:
+        return None
+    try:
+        ivf = faiss.extract_index_ivf(index)
+        return faiss.SearchParametersIVF(sel=selector, nprobe=ivf.nprobe)
+    except RuntimeError:
+        pass
+    base = faiss.downcast_index(index)
+    if isinstance(base, faiss.IndexPQ):
+        raise ValueError("This flat_pq index predates filter support (IndexPQ rejects search parameters); "
+                         "rebuild it with build_index.py --index-type flat_pq.")
+    if hasattr(base, "hnsw"):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
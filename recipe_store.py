@@ -0,0 +1,335 @@
+"""
+Columnar, memory-mapped recipe store.
+
+Every field is a column of four NumPy arrays in <store>/<field>.*.npy:
+  data          uint8   UTF-8 bytes of all items, concatenated
+  item_offsets  int64   (m + 1,) byte range of each item in `data`
+  row_offsets   int64   (n + 1,) item range of each row
+  kinds         uint8   (n,) how to rebuild the value (absent / null / str / list / int / json)
+A string is one item, a list of strings is one item per element, so
+ingredients/instructions/ner need no per-recipe Python objects until a
+row is read. An open-addressing hash table (id_table.npy) gives O(1)
+lookup by recipe `id`.
+
+    python recipe_store.py build RecipeNLG_dataset/recipes_nlg_clean.jsonl RecipeNLG_dataset/recipes_nlg.store
+    python recipe_store.py compare RecipeNLG_dataset/recipes_nlg_clean.jsonl RecipeNLG_dataset/recipes_nlg.store
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import time
+import tracemalloc
+from array import array
+from collections.abc import Sequence
+
+import numpy as np
+
+# ======== Config ========
+FIELDS = ("id", "title", "ingredients", "instructions", "directions", "ner", "source")
+EXTRA_FIELD = "_extra"  # any other keys, JSON-encoded per row
+META_FILE = "meta.json"
+ID_TABLE_FILE = "id_table.npy"
+
+KIND_ABSENT, KIND_NULL, KIND_STR, KIND_LIST, KIND_INT, KIND_JSON = range(6)
+
+
+# ======== Plain-file loading ========
+def load_json(path):
+    """Load a recipe list from .json (array), .jsonl or .parquet."""
+    try:
+        if path.endswith(".parquet"):
+            import pyarrow.parquet as pq
+            # plain lists and dicts; pandas would return list columns as numpy arrays
+            return pq.read_table(path).to_pylist()
+        with open(path, "r", encoding="utf-8") as f:
+            if path.endswith(".jsonl"):
+                return [json.loads(line) for line in f if line.strip()]
+            return json.load(f)
+    except FileNotFoundError:
+        print(f" Warning: {path} not found, skipping.")
+        return []
+
+
+def iter_json(path):
+    """Stream recipes from .jsonl without holding the file in memory; other formats are loaded whole."""
+    if path.endswith(".jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from load_json(path)
+
+
+def load_recipes(path):
+    """
+    Shared loader: a RecipeStore for a store directory, else a list from
+    the file. A missing .jsonl falls back to the .json array of the same
+    name, the format clean.py wrote before it switched to JSON lines.
+    """
+    if os.path.isdir(path):
+        return RecipeStore(path)
+    legacy = path[:-1]
+    if path.endswith(".jsonl") and not os.path.exists(path) and os.path.exists(legacy):
+        print(f" Note: {path} not found, loading the legacy {legacy} instead.")
+        return load_json(legacy)
+    return load_json(path)
+
+
+def concat_recipes(parts):
+    parts = [p for p in parts if len(p)]
+    if all(isinstance(p, list) for p in parts):
+        return [r for p in parts for r in p]
+    return ChainedRecipes(parts)
+
+
+# ======== Building ========
+def _id_hash(recipe_id):
+    return int.from_bytes(hashlib.blake2b(str(recipe_id).encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class _ColumnBuilder:
+    def __init__(self):
+        self.data = bytearray()
+        self.item_offsets = array("q", [0])
+        self.row_offsets = array("q", [0])
+        self.kinds = bytearray()
+
+    def append(self, value, present=True):
+        if not present:
+            kind, items = KIND_ABSENT, ()
+        elif value is None:
+            kind, items = KIND_NULL, ()
+        elif isinstance(value, str):
+            kind, items = KIND_STR, (value,)
+        elif isinstance(value, int) and not isinstance(value, bool):
+            kind, items = KIND_INT, (str(value),)
+        elif isinstance(value, list) and all(isinstance(x, str) for x in value):
+            kind, items = KIND_LIST, value
+        else:
+            kind, items = KIND_JSON, (json.dumps(value, ensure_ascii=False),)
+
+        for item in items:
+            self.data += item.encode("utf-8")
+            self.item_offsets.append(len(self.data))
+        self.row_offsets.append(len(self.item_offsets) - 1)
+        self.kinds.append(kind)
+
+    def save(self, out_dir, name):
+        arrays = {
+            "data": np.frombuffer(bytes(self.data), dtype=np.uint8),
+            "item_offsets": np.frombuffer(self.item_offsets, dtype=np.int64),
+            "row_offsets": np.frombuffer(self.row_offsets, dtype=np.int64),
+            "kinds": np.frombuffer(bytes(self.kinds), dtype=np.uint8),
+        }
+        for part, arr in arrays.items():
+            np.save(os.path.join(out_dir, f"{name}.{part}.npy"), arr)
+
+
+def build_id_table(ids):
+    """Linear-probing table of rows, sized to a power of two >= 2n; -1 marks empty slots."""
+    size = 1 << max(1, (2 * len(ids) - 1).bit_length())
+    mask = size - 1
+    table = [-1] * size
+    for row, recipe_id in enumerate(ids):
+        slot = _id_hash(recipe_id) & mask
+        while table[slot] != -1:
+            slot = (slot + 1) & mask
+        table[slot] = row
+    return np.array(table, dtype=np.int64)
+
+
+def build_store(recipes, out_dir):
+    """Write an iterable of recipe dicts to a store directory in one streaming pass."""
+    os.makedirs(out_dir, exist_ok=True)
+    builders = {name: _ColumnBuilder() for name in FIELDS + (EXTRA_FIELD,)}
+    ids, n = [], 0
+    for r in recipes:
+        for name in FIELDS:
+            builders[name].append(r.get(name), name in r)
+        extra = {k: v for k, v in r.items() if k not in FIELDS}
+        builders[EXTRA_FIELD].append(extra or None, bool(extra))
+        ids.append(r.get("id"))
+        n += 1
+
+    for name, builder in builders.items():
+        builder.save(out_dir, name)
+    np.save(os.path.join(out_dir, ID_TABLE_FILE), build_id_table(ids))
+    with open(os.path.join(out_dir, META_FILE), "w", encoding="utf-8") as f:
+        json.dump({"n": n, "fields": list(FIELDS), "extra_field": EXTRA_FIELD}, f, indent=2)
+    print(f"Built recipe store with {n} recipes at {out_dir}")
+    return n
+
+
+# ======== Reading ========
+class Column(Sequence):
+    """One memory-mapped field; `column[row]` decodes a single value."""
+
+    def __init__(self, store_dir, name):
+        def load(part):
+            return np.load(os.path.join(store_dir, f"{name}.{part}.npy"), mmap_mode="r")
+
+        self.name = name
+        self.data = load("data")
+        self.item_offsets = load("item_offsets")
+        self.row_offsets = load("row_offsets")
+        self.kinds = load("kinds")
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def items(self, row):
+        """Raw string items of a row: [] / [str] / list elements."""
+        first, last = int(self.row_offsets[row]), int(self.row_offsets[row + 1])
+        if first == last:
+            return []
+        offsets = self.item_offsets[first:last + 1]
+        raw = self.data[offsets[0]:offsets[-1]].tobytes()
+        base = int(offsets[0])
+        return [raw[int(a) - base:int(b) - base].decode("utf-8") for a, b in zip(offsets[:-1], offsets[1:])]
+
+    def present(self, row):
+        return self.kinds[row] != KIND_ABSENT
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        row = row % len(self)
+        kind = self.kinds[row]
+        if kind in (KIND_ABSENT, KIND_NULL):
+            return None
+        items = self.items(row)
+        if kind == KIND_STR:
+            return items[0]
+        if kind == KIND_INT:
+            return int(items[0])
+        if kind == KIND_JSON:
+            return json.loads(items[0])
+        return items
+
+
+class RecipeStore(Sequence):
+    """
+    Read-only recipe table. `store[row]` rebuilds one recipe dict; use
+    `store.column(name)` or `store.get(row, name)` to touch a single field
+    without decoding the rest. Columns are opened on first use.
+    """
+
+    def __init__(self, store_dir):
+        self.dir = store_dir
+        with open(os.path.join(store_dir, META_FILE), "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.fields = self.meta["fields"]
+        self._columns = {}
+        self._id_table = None
+
+    def __len__(self):
+        return self.meta["n"]
+
+    def column(self, name):
+        if name not in self._columns:
+            self._columns[name] = Column(self.dir, name)
+        return self._columns[name]
+
+    def get(self, row, name, default=None):
+        col = self.column(name)
+        return col[row] if col.present(row) else default
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        row = int(row) % len(self)
+        recipe = {}
+        for name in self.fields:
+            col = self.column(name)
+            if col.present(row):
+                recipe[name] = col[row]
+        extra = self.column(self.meta["extra_field"])
+        if extra.present(row):
+            recipe.update(extra[row])
+        return recipe
+
+    def row_of(self, recipe_id):
+        """Row of the recipe with this `id` (exact type match), or None."""
+        if self._id_table is None:
+            self._id_table = np.load(os.path.join(self.dir, ID_TABLE_FILE), mmap_mode="r")
+        table, ids = self._id_table, self.column("id")
+        mask = len(table) - 1
+        slot = _id_hash(recipe_id) & mask
+        while True:
+            row = int(table[slot])
+            if row == -1:
+                return None
+            if ids[row] == recipe_id:
+                return row
+            slot = (slot + 1) & mask
+
+    def by_id(self, recipe_id):
+        row = self.row_of(recipe_id)
+        return None if row is None else self[row]
+
+
+class ChainedRecipes(Sequence):
+    """Concatenation of recipe sequences (lists or stores) without copying."""
+
+    def __init__(self, parts):
+        self.parts = list(parts)
+        self.starts = [0]
+        for p in self.parts:
+            self.starts.append(self.starts[-1] + len(p))
+
+    def __len__(self):
+        return self.starts[-1]
+
+    def __getitem__(self, row):
+        if isinstance(row, slice):
+            return [self[i] for i in range(*row.indices(len(self)))]
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        row = int(row) % len(self)
+        part = bisect.bisect_right(self.starts, row) - 1
+        return self.parts[part][row - self.starts[part]]
+
+
+# ======== CLI ========
+def compare(json_path, store_dir):
+    """Load time and Python heap of the JSON file vs. opening the store and scanning one column."""
+    def scan_store():
+        store = RecipeStore(store_dir)
+        return sum(1 for _ in store.column("title"))
+
+    for label, fn in (("json", lambda: load_json(json_path)), ("store", scan_store)):
+        tracemalloc.start()
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print(f"{label:>5}: {elapsed:7.2f}s  peak heap {peak / 2**20:8.1f} MB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or inspect a columnar recipe store.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="convert .json/.jsonl/.parquet recipes to a store directory")
+    b.add_argument("input")
+    b.add_argument("out_dir")
+    c = sub.add_parser("compare", help="compare load time and memory of JSON vs. store")
+    c.add_argument("input")
+    c.add_argument("store_dir")
+    args = parser.parse_args()
+
+    if args.cmd == "build":
+        build_store(iter_json(args.input), args.out_dir)
+    else:
+        compare(args.input, args.store_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Second-stage cross-encoder re-ranking.
+
+The first stage (dense, BM25 or hybrid) returns up to `max_candidates`
+rows per query; a CPU cross-encoder scores every (query, recipe text) pair
+of a batch in one `predict` call and the top_k by cross-encoder score are
+returned. To stay within `budget_ms` per batch, the reranker keeps a
+running estimate of the cost of one scored pair and lowers N for large
+batches (never below `min_candidates`), so a loaded server trades depth
+for latency instead of queueing. Scores are cached per (normalized query,
+recipe text), so repeated queries only pay for candidates not seen before.
+
+    reranker = load_reranker()
+    stream = retrieve_batched(model, index, store, queries, top_k=5, reranker=reranker)
+"""
+import time
+
+import numpy as np
+
+from embedding_cache import text_key
+from query_cache import LRUCache, normalize_query
+from tracing import TRACER
+
+# ======== Config ========
+RERANK_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_CANDIDATES = 50       # first-stage rows re-scored per query (upper bound)
+MIN_CANDIDATES = 10          # lower bound when the budget forces N down
+RERANK_BUDGET_MS = 200       # cross-encoder time allowed per batch; None = always use RERANK_CANDIDATES
+RERANK_BATCH_SIZE = 64       # pairs per forward pass
+RERANK_TEXT_CHARS = 1000     # recipe text is cut here; the model truncates at 512 tokens anyway
+SCORE_CACHE_SIZE = 200_000
+COST_SMOOTHING = 0.2         # weight of the newest batch in the per-pair cost estimate
+
+
+def rerank_text(r, max_chars=RERANK_TEXT_CHARS):
+    """Title first, then ingredients (where most constraints live), then instructions."""
+    title = r.get("title", "")
+    ingredients = ", ".join(r.get("ingredients", []) or [])
+    instructions = r.get("instructions", "") or ""
+    return f"{title}. Ingredients: {ingredients}. {instructions}".strip()[:max_chars]
+
+
+class Reranker:
+    def __init__(self, model, model_name=RERANK_MODEL, max_candidates=RERANK_CANDIDATES,
+                 min_candidates=MIN_CANDIDATES, budget_ms=RERANK_BUDGET_MS,
+                 batch_size=RERANK_BATCH_SIZE, cache=None):
+        """`model.predict(list_of_pairs, batch_size=...)` returns one relevance score per pair."""
+        self.model = model
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self.min_candidates = min(min_candidates, max_candidates)
+        self.budget_ms = budget_ms
+        self.batch_size = batch_size
+        self.cache = cache
+        self.ms_per_pair = None
+        self.stats = {"batches": 0, "pairs_scored": 0, "pairs_cached": 0, "last_candidates": max_candidates}
+
+    def n_candidates(self, n_queries):
+        """Candidates per query that fit the latency budget for a batch of `n_queries`."""
+        if self.budget_ms is None or self.ms_per_pair is None:
+            return self.max_candidates
+        n = int(self.budget_ms / (self.ms_per_pair * max(n_queries, 1)))
+        return max(self.min_candidates, min(self.max_candidates, n))
+
+    def rerank(self, texts, rows, recipes, top_k):
+        """
+        Re-order first-stage candidates. `rows` is (n_queries, >= N), best
+        first, -1 for padding. Returns (scores, rows) shaped (n_queries, top_k).
+        """
+        # never fewer candidates than results asked for, whatever the budget allows
+        n = max(self.n_candidates(len(texts)), top_k)
+        rows = np.asarray(rows)[:, :n]
+        scores = np.full(rows.shape, -np.inf, dtype=np.float32)
+        pairs, slots = [], []
+        for qi, (text, cand) in enumerate(zip(texts, rows)):
+            qkey = normalize_query(text)
+            for ci, row in enumerate(cand):
+                if row < 0:
+                    continue
+                doc = rerank_text(recipes[int(row)])
+                key = (qkey, text_key(self.model_name, doc))
+                cached = self.cache.get(key) if self.cache is not None else None
+                if cached is not None:
+                    scores[qi, ci] = cached
+                else:
+                    pairs.append((text, doc))
+                    slots.append((qi, ci, key))
+
+        if pairs:
+            start = time.perf_counter()
+            with TRACER.stage("rerank"):
+                out = self.model.predict(pairs, batch_size=self.batch_size, show_progress_bar=False)
+            elapsed = time.perf_counter() - start
+            TRACER.count("rerank_pairs_scored", len(pairs))
+            per_pair = elapsed * 1000 / len(pairs)
+            self.ms_per_pair = per_pair if self.ms_per_pair is None else (
+                COST_SMOOTHING * per_pair + (1 - COST_SMOOTHING) * self.ms_per_pair)
+            for (qi, ci, key), s in zip(slots, np.asarray(out, dtype=np.float32).reshape(-1)):
+                scores[qi, ci] = s
+                if self.cache is not None:
+                    self.cache.put(key, float(s), elapsed / len(pairs))
+
+        self.stats["batches"] += 1
+        self.stats["pairs_scored"] += len(pairs)
+        self.stats["pairs_cached"] += int(np.isfinite(scores).sum()) - len(pairs)
+        self.stats["last_candidates"] = n
+
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        D = np.take_along_axis(scores, order, axis=1)
+        I = np.take_along_axis(rows, order, axis=1).astype(np.int64)
+        I[~np.isfinite(D)] = -1
+        D[~np.isfinite(D)] = 0.0
+        if D.shape[1] < top_k:
+            pad = top_k - D.shape[1]
+            D = np.pad(D, ((0, 0), (0, pad)))
+            I = np.pad(I, ((0, 0), (0, pad)), constant_values=-1)
+        return D, I
+
+    def rerank_stream(self, stream, recipes, top_k, batch_size):
+        """
+        Wrap a first-stage stream of (query, scores, rows) and re-rank it
+        `batch_size` queries at a time; yields the same triples.
+        """
+        batch = []
+        for item in stream:
+            batch.append(item)
+            if len(batch) == batch_size:
+                yield from self._rerank_items(batch, recipes, top_k)
+                batch = []
+        if batch:
+            yield from self._rerank_items(batch, recipes, top_k)
+
+    def _rerank_items(self, items, recipes, top_k):
+        width = max(len(rows) for _, _, rows in items)
+        rows = np.full((len(items), width), -1, dtype=np.int64)
+        for i, (_, _, r) in enumerate(items):
+            rows[i, :len(r)] = r
+        D, I = self.rerank([q["query"] for q, _, _ in items], rows, recipes, top_k)
+        for (q, _, _), scores, ranked in zip(items, D, I):
+            yield q, scores, ranked
+
+
+def load_reranker(model_name=RERANK_MODEL, cache=True, **kwargs):
+    """CPU cross-encoder wrapped in a Reranker; `kwargs` go to Reranker."""
+    from sentence_transformers import CrossEncoder
+
+    model = CrossEncoder(model_name, device="cpu")
+    score_cache = LRUCache(SCORE_CACHE_SIZE) if cache else None
+    return Reranker(model, model_name, cache=score_cache, **kwargs)
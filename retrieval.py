@@ -0,0 +1,213 @@
+import time
+
+import numpy as np
+
+from chunking import ChunkIndex
+from recipe_filters import bitmap_selector, search_params
+from tracing import TRACER
+
+# ======== Config ========
+QUERY_BATCH_SIZE = 256  # queries encoded and searched together
+SEARCH_MODES = ("dense", "bm25", "hybrid")
+FUSION_METHODS = ("rrf", "weighted")
+HYBRID_CANDIDATES = 100  # per-retriever candidates fed into fusion
+RRF_K = 60
+DENSE_WEIGHT = 0.5       # weight of the dense score in weighted fusion
+MMR_CANDIDATES = 50      # first-stage rows MMR picks the final top_k from
+
+
+def encode_queries(model, texts, batch_size=QUERY_BATCH_SIZE, cache=None):
+    """
+    Encode query strings into an L2-normalized float32 matrix. With a
+    query_cache.QueryEmbeddingCache only uncached queries reach the model.
+    """
+    import faiss  # not at module level, so BM25-only queries never load it
+
+    def encode(batch):
+        TRACER.count("queries_encoded", len(batch))
+        with TRACER.stage("encode_queries"):
+            q_emb = model.encode(list(batch), batch_size=batch_size, convert_to_numpy=True)
+            q_emb = np.ascontiguousarray(q_emb, dtype=np.float32)
+            faiss.normalize_L2(q_emb)
+        return q_emb
+
+    if cache is None:
+        return encode(texts)
+    return np.ascontiguousarray(cache.encode(encode, list(texts)), dtype=np.float32)
+
+
+def dense_search(index, q_emb, top_k, mask=None):
+    """index.search, restricted to rows where `mask` is True when a mask is given."""
+    TRACER.observe("search_batch_size", len(q_emb))
+    with TRACER.stage("dense_search"):
+        if isinstance(index, ChunkIndex):
+            return index.search(q_emb, top_k, mask)
+        if mask is None:
+            return index.search(q_emb, top_k)
+        return index.search(q_emb, top_k, params=search_params(index, bitmap_selector(mask)))
+
+
+def search_batched(model, index, queries, top_k, batch_size=QUERY_BATCH_SIZE, mask=None):
+    """
+    Encode and search `queries` (dicts with a "query" key) `batch_size` at a
+    time: one model.encode and one index.search call per batch.
+    Yields (query, scores, rows) per query as each batch completes.
+    """
+    queries = list(queries)
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        q_emb = encode_queries(model, [q["query"] for q in batch], batch_size)
+        D, I = dense_search(index, q_emb, top_k, mask)
+        for q, scores, rows in zip(batch, D, I):
+            yield q, scores, rows
+
+
+def search_bm25(bm25, queries, top_k, batch_size=QUERY_BATCH_SIZE, mask=None):
+    """Lexical-only counterpart of search_batched."""
+    queries = list(queries)
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        with TRACER.stage("bm25_search"):
+            D, I = bm25.search([q["query"] for q in batch], top_k, mask)
+        for q, scores, rows in zip(batch, D, I):
+            yield q, scores, rows
+
+
+def fuse_rrf(runs, top_k, rrf_k=RRF_K):
+    """Reciprocal-rank fusion of several (scores, rows) rankings for one query."""
+    rows = np.concatenate([r for _, r in runs])
+    ranks = np.concatenate([np.arange(len(r)) for _, r in runs])
+    keep = rows >= 0
+    rows, ranks = rows[keep], ranks[keep]
+    uniq, inv = np.unique(rows, return_inverse=True)
+    fused = np.bincount(inv, weights=1.0 / (rrf_k + ranks + 1), minlength=len(uniq))
+    order = np.argsort(-fused, kind="stable")[:top_k]
+    return fused[order].astype(np.float32), uniq[order]
+
+
+def fuse_weighted(runs, weights, top_k):
+    """Weighted sum of min-max normalized scores; a doc missing from a run scores 0 there."""
+    all_rows, all_scores = [], []
+    for (scores, rows), w in zip(runs, weights):
+        keep = rows >= 0
+        scores, rows = scores[keep].astype(np.float64), rows[keep]
+        if len(scores):
+            span = scores.max() - scores.min()
+            scores = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+        all_rows.append(rows)
+        all_scores.append(w * scores)
+    rows = np.concatenate(all_rows)
+    uniq, inv = np.unique(rows, return_inverse=True)
+    fused = np.bincount(inv, weights=np.concatenate(all_scores), minlength=len(uniq))
+    order = np.argsort(-fused, kind="stable")[:top_k]
+    return fused[order].astype(np.float32), uniq[order]
+
+
+def mmr(scores, rows, embeddings, top_k, lam):
+    """
+    Maximal marginal relevance over one query's candidates: repeatedly pick
+    the row maximizing lam * relevance - (1 - lam) * max cosine similarity
+    to the rows already picked. Relevance is the min-max normalized score,
+    so any first stage (dense, BM25, fused, re-ranked) can be diversified.
+    """
+    keep = rows >= 0
+    scores, rows = scores[keep].astype(np.float64), rows[keep]
+    if len(rows) <= 1:
+        return scores[:top_k].astype(np.float32), rows[:top_k]
+    span = scores.max() - scores.min()
+    rel = (scores - scores.min()) / span if span > 0 else np.ones_like(scores)
+    vecs = np.asarray(embeddings[rows], dtype=np.float32)
+    sim = vecs @ vecs.T
+    picked = []
+    redundancy = np.zeros(len(rows))
+    for _ in range(min(top_k, len(rows))):
+        gain = lam * rel - (1 - lam) * redundancy
+        gain[picked] = -np.inf
+        best = int(np.argmax(gain))
+        picked.append(best)
+        redundancy = np.maximum(redundancy, sim[best])
+    return scores[picked].astype(np.float32), rows[picked]
+
+
+def mmr_stream(stream, embeddings, top_k, lam):
+    """Diversify every (query, scores, rows) of a candidate stream with mmr()."""
+    for q, scores, rows in stream:
+        yield (q, *mmr(np.asarray(scores), np.asarray(rows), embeddings, top_k, lam))
+
+
+def search_hybrid(model, index, bm25, queries, top_k, batch_size=QUERY_BATCH_SIZE,
+                  fusion="rrf", candidates=HYBRID_CANDIDATES, dense_weight=DENSE_WEIGHT, mask=None):
+    """
+    Dense FAISS + BM25, each returning `candidates` rows per query, fused
+    with RRF or a weighted score sum. Same output as search_batched.
+    """
+    queries = list(queries)
+    n_cand = max(candidates, top_k)
+    for start in range(0, len(queries), batch_size):
+        batch = queries[start:start + batch_size]
+        texts = [q["query"] for q in batch]
+        Dd, Id = dense_search(index, encode_queries(model, texts, batch_size), n_cand, mask)
+        with TRACER.stage("bm25_search"):
+            Ds, Is = bm25.search(texts, n_cand, mask)
+        for i, q in enumerate(batch):
+            runs = [(Dd[i], Id[i]), (Ds[i], Is[i])]
+            if fusion == "rrf":
+                scores, rows = fuse_rrf(runs, top_k)
+            else:
+                scores, rows = fuse_weighted(runs, (dense_weight, 1 - dense_weight), top_k)
+            yield q, scores, rows
+
+
+def format_hits(recipes, scores, rows):
+    """Current result schema; FAISS pads short result lists with row -1."""
+    return [
+        {
+            "rank": rank + 1,
+            "score": float(score),
+            "recipe": recipes[int(row)]
+        }
+        for rank, (score, row) in enumerate(zip(scores, rows))
+        if row >= 0
+    ]
+
+
+def retrieve_batched(model, index, recipes, queries, top_k, batch_size=QUERY_BATCH_SIZE,
+                     mode="dense", bm25=None, fusion="rrf", mask=None, reranker=None,
+                     mmr_lambda=None, embeddings=None):
+    """
+    Stream one result block per query in the faiss_fusion_results.json format.
+    `mask` (boolean, one entry per index row) restricts every mode to matching recipes.
+    With a rerank.Reranker the first stage fetches its candidate pool and
+    the cross-encoder picks the final top_k. With `mmr_lambda` (and the
+    normalized corpus `embeddings`, row-aligned with `recipes`) the final
+    top_k is chosen by MMR from MMR_CANDIDATES rows to spread out near-duplicates.
+    Each block carries "latency_ms": the encode + search (+ rerank) time of its batch.
+    """
+    final_k = max(top_k, MMR_CANDIDATES) if mmr_lambda is not None else top_k
+    first_k = max(final_k, reranker.max_candidates) if reranker is not None else final_k
+    if mode == "dense":
+        stream = search_batched(model, index, queries, first_k, batch_size, mask)
+    elif mode == "bm25":
+        stream = search_bm25(bm25, queries, first_k, batch_size, mask)
+    elif mode == "hybrid":
+        stream = search_hybrid(model, index, bm25, queries, first_k, batch_size, fusion, mask=mask)
+    else:
+        raise ValueError(f"Unknown search mode {mode!r}; expected one of {SEARCH_MODES}.")
+    if reranker is not None:
+        stream = reranker.rerank_stream(stream, recipes, final_k, batch_size)
+    if mmr_lambda is not None:
+        stream = mmr_stream(stream, embeddings, top_k, mmr_lambda)
+    # the stream computes a whole batch on its first item, so time the gap
+    # before each batch's first item, excluding time spent by our consumer
+    t0 = time.perf_counter()
+    for n, (q, scores, rows) in enumerate(stream):
+        if n % batch_size == 0:
+            batch_ms = (time.perf_counter() - t0) * 1000
+        TRACER.count("queries_served")
+        yield {
+            "query_id": q["id"],
+            "query": q["query"],
+            "results": format_hits(recipes, scores, rows),
+            "latency_ms": round(batch_ms, 3)
+        }
+        t0 = time.perf_counter()
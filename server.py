@@ -0,0 +1,400 @@
+"""
+Resident retrieval server: loads the SentenceTransformer and the saved
+FAISS index once and answers HTTP/JSON queries.
+
+    python server.py --index-dir index --port 8000
+
+    POST /search  {"query": "vegan soup", "top_k": 5, "source": "RecipeNLG"}
+                  {"query": "dessert", "include": ["peanut"], "exclude": ["egg"], "tags": ["vegan"]}
+                  {"queries": [{"id": 1, "query": "..."}, ...], "top_k": 5}
+    GET  /search?q=vegan+soup&top_k=5&source=spoonacular&tags=vegan,gluten_free
+    GET  /health
+    GET  /metrics         stage timings, peak RSS and counters (Prometheus text; ?format=json)
+
+With --rerank each micro-batch is re-ranked by a cross-encoder whose
+candidate count shrinks as batches grow (see rerank.py).
+
+With --live the index also accepts incremental updates (see live_index.py):
+
+    POST /recipes         {"recipes": [{"id": ..., "title": ..., ...}, ...]}   add or replace by id
+    POST /recipes/delete  {"ids": ["recnlg_12", 645722]}
+    POST /compact
+
+Results use the faiss_fusion_results.json schema (`rank`, `score`, `recipe`).
+Concurrent requests are micro-batched so the encoder runs on full batches.
+"""
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from ann_index import set_search_params
+from baseline import INDEX_DIR, TOP_K, encode_corpus
+from chunking import AGGREGATIONS, open_search_index
+from encoder import ENCODER_BACKENDS, load_encoder
+from index_store import META_FILE, IndexStore
+from live_index import LiveIndex
+from query_cache import QueryEmbeddingCache, ResultCache
+from recipe_filters import AttributeIndex, FilterSpec
+from rerank import RERANK_BUDGET_MS, RERANK_CANDIDATES, load_reranker
+from retrieval import dense_search, encode_queries, format_hits
+from tracing import TRACER, Profiler
+
+# ======== Config ========
+HOST = "127.0.0.1"
+PORT = 8000
+MAX_BATCH = 64          # queries per encoder call
+MAX_WAIT_MS = 5         # how long the first request in a batch waits for company
+MAX_TOP_K = 100
+COMPACT_INTERVAL = 300  # seconds between compaction checks of a --live index
+
+
+class SearchRequest:
+    def __init__(self, query, top_k=TOP_K, spec=None):
+        self.query = query
+        self.top_k = top_k
+        self.spec = spec or FilterSpec()
+        self.future = Future()
+        self.cache_key = None
+
+
+class MicroBatcher:
+    """
+    Collects requests from many handler threads and serves them with one
+    encode per batch and one index.search per distinct filter in the batch.
+    A batch closes when it holds MAX_BATCH requests or MAX_WAIT_MS after its
+    first request arrived.
+    """
+
+    def __init__(self, model, index, recipes, filters, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS,
+                 embedding_cache=None, result_cache=None, live=None, reranker=None, profiler=None):
+        self.model = model
+        self.reranker = reranker
+        self.live = live  # LiveIndex; when set it replaces index / recipes / filters
+        self.index = index
+        self.recipes = recipes
+        self.filters = filters
+        self.embedding_cache = embedding_cache
+        self.result_cache = result_cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.profiler = profiler or Profiler()  # no-op unless given a path
+        self.requests = queue.Queue()
+        self.stats = {"requests": 0, "batches": 0, "max_batch_seen": 0}
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    @property
+    def ntotal(self):
+        return self.live.ntotal if self.live is not None else int(self.index.ntotal)
+
+    def submit(self, request):
+        if self.result_cache is not None:
+            if self.live is not None:
+                self.result_cache.set_index_version(self.live.version)
+            request.cache_key = self.result_cache.key(request.query, request.top_k, request.spec.key())
+            cached = self.result_cache.get(request.cache_key)
+            if cached is not None:
+                TRACER.count("result_cache_hits")
+                request.future.set_result(cached)
+                return request.future
+        self.requests.put(request)
+        return request.future
+
+    def cache_stats(self):
+        caches = [("embedding_cache", self.embedding_cache), ("result_cache", self.result_cache)]
+        if self.reranker is not None:
+            caches.append(("rerank_cache", self.reranker.cache))
+        return {name: cache.stats() for name, cache in caches if cache is not None}
+
+    def search(self, query, top_k=TOP_K, spec=None):
+        return self.submit(SearchRequest(query, top_k, spec)).result()
+
+    def close(self):
+        """Serve the requests already queued, then stop the worker thread."""
+        self.requests.put(None)
+        self._worker.join()
+
+    def _next_batch(self):
+        first = self.requests.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                req = self.requests.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if req is None:
+                self.requests.put(None)  # stop after this batch
+                break
+            batch.append(req)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                with self.profiler, TRACER.stage("serve_batch"):
+                    self._serve(batch)
+            except Exception as e:
+                for req in batch:
+                    if not req.future.done():
+                        req.future.set_exception(e)
+
+    def _serve(self, batch):
+        start = time.perf_counter()
+        q_emb = encode_queries(self.model, [req.query for req in batch], self.max_batch, self.embedding_cache)
+
+        self.stats["requests"] += len(batch)
+        self.stats["batches"] += 1
+        self.stats["max_batch_seen"] = max(self.stats["max_batch_seen"], len(batch))
+        TRACER.count("queries_served", len(batch))
+        TRACER.observe("micro_batch_size", len(batch))
+
+        groups = {}
+        for i, req in enumerate(batch):
+            groups.setdefault(req.spec.key(), []).append(i)
+        for members in groups.values():
+            spec = batch[members[0]].spec
+            top_k = max(batch[i].top_k for i in members)
+            first_k = max(top_k, self.reranker.max_candidates) if self.reranker is not None else top_k
+            if self.live is not None:
+                D, I = self.live.search(q_emb[members], first_k, spec)
+                recipes = self.live
+            else:
+                mask = self.filters.mask(spec) if spec else None
+                D, I = dense_search(self.index, q_emb[members], min(first_k, self.index.ntotal), mask)
+                recipes = self.recipes
+            if self.reranker is not None:
+                D, I = self.reranker.rerank([batch[i].query for i in members], I, recipes, top_k)
+            for i, scores, rows in zip(members, D, I):
+                req = batch[i]
+                hits = format_hits(recipes, scores[:req.top_k], rows[:req.top_k])
+                if req.cache_key is not None:
+                    self.result_cache.put(req.cache_key, hits, (time.perf_counter() - start) / len(batch))
+                req.future.set_result(hits)
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    batcher = None  # set by make_server
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @staticmethod
+    def _query_text(value):
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError("'query' must be a non-empty string")
+        return value
+
+    def _search(self, params):
+        top_k = int(params.get("top_k", TOP_K))
+        if not 1 <= top_k <= MAX_TOP_K:
+            raise ValueError(f"top_k must be between 1 and {MAX_TOP_K}")
+        spec = FilterSpec.from_dict(params)
+
+        if "queries" in params:
+            if not isinstance(params["queries"], list) or not all(isinstance(q, dict) for q in params["queries"]):
+                raise ValueError("'queries' must be a list of objects")
+            for q in params["queries"]:
+                self._query_text(q.get("query"))
+            futures = [
+                (q, self.batcher.submit(SearchRequest(q["query"], top_k, spec)))
+                for q in params["queries"]
+            ]
+            return [
+                {"query_id": q.get("id"), "query": q["query"], "results": f.result()}
+                for q, f in futures
+            ]
+        if "query" not in params:
+            raise ValueError("missing 'query'")
+        query = self._query_text(params["query"])
+        return {"query": query, "results": self.batcher.search(query, top_k, spec)}
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path == "/health":
+            self._send_json(200, {
+                "status": "ok",
+                "ntotal": self.batcher.ntotal,
+                **self.batcher.stats,
+                **self.batcher.cache_stats(),
+                **({"live_index": self.batcher.live.stats()} if self.batcher.live is not None else {}),
+                **({"rerank": self.batcher.reranker.stats} if self.batcher.reranker is not None else {}),
+            })
+        elif url.path == "/metrics":
+            self._send_metrics(parse_qs(url.query).get("format", ["prometheus"])[0])
+        elif url.path == "/search":
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if "q" in params:
+                params["query"] = params.pop("q")
+            for key in ("include", "exclude", "tags"):
+                if key in params:
+                    params[key] = [v for v in params[key].split(",") if v]
+            self._handle(self._search, params)
+        else:
+            self._send_json(404, {"error": f"unknown path {url.path}"})
+
+    def _send_metrics(self, fmt):
+        if fmt == "json":
+            self._send_json(200, TRACER.to_dict())
+            return
+        body = TRACER.to_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        path = urlparse(self.path).path
+        handlers = {"/search": self._search, "/recipes": self._upsert,
+                    "/recipes/delete": self._delete, "/compact": self._compact}
+        if path not in handlers:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        if path != "/search" and self.batcher.live is None:
+            self._send_json(409, {"error": "index updates need a server started with --live"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            params = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": "request body must be JSON"})
+            return
+        if not isinstance(params, dict):
+            self._send_json(400, {"error": "request body must be a JSON object"})
+            return
+        self._handle(handlers[path], params)
+
+    def _upsert(self, params):
+        recipes = params["recipes"]
+        if any(r.get("id") is None for r in recipes):
+            raise ValueError("every recipe needs an 'id'")
+        return {"upserted": self.batcher.live.upsert(recipes), "ntotal": self.batcher.ntotal}
+
+    def _delete(self, params):
+        return {"deleted": self.batcher.live.delete(params["ids"]), "ntotal": self.batcher.ntotal}
+
+    def _compact(self, params):
+        self.batcher.live.compact()
+        return {"compacting": True}
+
+    def _handle(self, handler, params):
+        try:
+            self._send_json(200, handler(params))
+        except (KeyError, ValueError, TypeError) as e:
+            self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            # anything else (e.g. a faiss RuntimeError from the batcher) still gets a response
+            traceback.print_exc()
+            self._send_json(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        pass  # keep stdout quiet under load
+
+
+def make_server(batcher, host=HOST, port=PORT):
+    handler = type("BoundSearchHandler", (SearchHandler,), {"batcher": batcher})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def compact_periodically(live, interval=COMPACT_INTERVAL):
+    """Background loop that starts a compaction whenever the live index has drifted enough."""
+    def loop():
+        while True:
+            time.sleep(interval)
+            if live.needs_compaction():
+                live.compact()
+
+    threading.Thread(target=loop, name="compaction-timer", daemon=True).start()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recipe retrieval over HTTP.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--backend", default="torch", choices=ENCODER_BACKENDS,
+                        help="query encoder runtime; onnx-int8 is the fastest on CPU")
+    parser.add_argument("--no-cache", action="store_true", help="disable query embedding / result caches")
+    parser.add_argument("--live", action="store_true", help="accept incremental recipe updates")
+    parser.add_argument("--compact-interval", type=float, default=COMPACT_INTERVAL,
+                        help="seconds between compaction checks with --live")
+    parser.add_argument("--chunk-aggregate", default="max", choices=AGGREGATIONS,
+                        help="how chunk scores combine into a recipe score (chunked indexes only)")
+    parser.add_argument("--rerank", action="store_true", help="re-rank results with a cross-encoder")
+    parser.add_argument("--rerank-candidates", type=int, default=RERANK_CANDIDATES)
+    parser.add_argument("--rerank-budget-ms", type=float, default=RERANK_BUDGET_MS,
+                        help="cross-encoder time per micro-batch; N shrinks to fit it")
+    parser.add_argument("--trace", help="on shutdown, write stage timings / counters (.json or .prom)")
+    parser.add_argument("--profile", help="cProfile every micro-batch; stats written here on shutdown")
+    args = parser.parse_args()
+    if args.live and args.backend != "torch":
+        parser.error("--live encodes new recipes into the index; use --backend torch")
+
+    with open(os.path.join(args.index_dir, META_FILE), "r", encoding="utf-8") as f:
+        model = load_encoder(json.load(f)["model"], args.backend)
+    model.encode(["warm up"], convert_to_numpy=True)
+
+    live = None
+    if args.live:
+        live = LiveIndex(args.index_dir, lambda texts: encode_corpus(model, texts))
+        store, index, filters = live.store, live.index, live.filters
+        compact_periodically(live, args.compact_interval)
+    else:
+        store = IndexStore(args.index_dir)
+        index = store.index
+        if AttributeIndex.exists(args.index_dir):
+            filters = AttributeIndex.load(args.index_dir)
+        else:
+            filters = AttributeIndex.build(store)
+        saved = store.meta.get("index_params", {})
+        set_search_params(index, nprobe=saved.get("nprobe"), ef_search=saved.get("ef_search"))
+        index = open_search_index(store, args.chunk_aggregate)
+
+    embedding_cache = QueryEmbeddingCache() if not args.no_cache else None
+    result_cache = ResultCache(index_version=f"{store.meta['built_at']}/{store.index.ntotal}") if not args.no_cache else None
+    batcher = MicroBatcher(
+        model, index, store, filters, args.max_batch, args.max_wait_ms,
+        embedding_cache=embedding_cache, result_cache=result_cache, live=live,
+        reranker=load_reranker(max_candidates=args.rerank_candidates, budget_ms=args.rerank_budget_ms,
+                               cache=not args.no_cache) if args.rerank else None,
+        profiler=Profiler(args.profile),
+    )
+    server = make_server(batcher, args.host, args.port)
+    print(f"Serving {batcher.ntotal} recipes on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        (live.store if live is not None else store).close()
+        batcher.profiler.dump()
+        if args.trace:
+            TRACER.save(args.trace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import faiss
+import numpy as np
+
+from chunking import ChunkIndex, chunk_corpus, chunk_recipe
+
+
+def test_list_instructions_match_joined_string():
+    steps = [f"step {i} " + "stir the pot " * 10 for i in range(12)]
+    listed = {"title": "Long Stew", "ingredients": ["1 onion", "2 carrots"], "instructions": steps}
+    joined = {**listed, "instructions": " ".join(steps)}
+    chunks = chunk_recipe(listed, max_words=50, overlap=10)
+    assert chunks == chunk_recipe(joined, max_words=50, overlap=10)
+    assert len(chunks) > 2
+    assert chunks[0] == "Long Stew 1 onion 2 carrots"
+    assert all(c.startswith("Long Stew ") for c in chunks[1:])
+
+
+def test_short_list_recipe_is_one_chunk():
+    r = {"title": "Toast", "ingredients": ["bread"], "instructions": ["Toast the bread.", "Serve."]}
+    texts, parents = chunk_corpus([r, {"title": "Tea"}])
+    assert texts == ["Toast bread Toast the bread. Serve.", "Tea"]
+    assert parents.tolist() == [0, 1]
+
+
+def test_chunk_search_bounds_rounds_and_re_searches_short_rows_only():
+    rng = np.random.default_rng(0)
+    # recipe 0 owns 190 near-identical chunks, so query 0 keeps hitting only recipe 0
+    base = rng.standard_normal(16).astype(np.float32)
+    vecs = np.vstack([base + 0.01 * rng.standard_normal((190, 16)), rng.standard_normal((10, 16))]).astype(np.float32)
+    parents = np.concatenate([np.zeros(190, dtype=np.int64), np.arange(1, 11)])
+    calls = []
+
+    class Spy(faiss.IndexFlatIP):
+        def search(self, x, k, params=None):
+            calls.append((len(x), k))
+            return super().search(x, k, params=params)
+
+    index = Spy(16)
+    index.add(vecs)
+    queries = np.vstack([base, vecs[195]]).astype(np.float32)
+    D, I = ChunkIndex(index, parents, oversample=4, max_rounds=3).search(queries, 5)
+    assert calls == [(2, 20), (1, 40), (1, 80), (1, 160)]
+    assert (I[1] >= 0).all()
+    assert 1 <= (I[0] >= 0).sum() < 5
@@ -0,0 +1,12 @@
+import json
+
+from evaluator.eval_engine import load_qrels
+
+
+def test_jsonl_qrels_match_json(tmp_path):
+    rows = [{"qid": 1, "doc": "a", "grade": 2}, {"qid": 1, "doc": "b"}, {"qid": "2", "doc": 7, "grade": 0}]
+    path = tmp_path / "qrels.jsonl"
+    path.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+    as_json = tmp_path / "qrels.json"
+    as_json.write_text(json.dumps({"1": {"a": 2, "b": 1}, "2": {"7": 0}}), encoding="utf-8")
+    assert load_qrels(str(path)) == load_qrels(str(as_json)) == {"1": {"a": 2.0, "b": 1.0}, "2": {}}
@@ -0,0 +1,14 @@
+import pytest
+
+from recipe_filters import FilterSpec
+
+
+def test_from_dict_accepts_comma_separated_strings():
+    spec = FilterSpec.from_dict({"tags": "vegan", "include": "peanut,chocolate", "exclude": ["milk"]})
+    assert (spec.tags, spec.include, spec.exclude) == (["vegan"], ["peanut", "chocolate"], ["milk"])
+
+
+@pytest.mark.parametrize("bad", [{"tags": 5}, {"include": {"peanut": 1}}, {"exclude": ["milk", 3]}])
+def test_from_dict_rejects_other_types(bad):
+    with pytest.raises(ValueError):
+        FilterSpec.from_dict(bad)
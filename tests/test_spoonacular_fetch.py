@@ -0,0 +1,32 @@
+import asyncio
+import json
+import threading
+
+from Spoonacular_API import stub_server
+from Spoonacular_API.spoonacular_fetch import JsonlAppender, SpoonacularClient, TokenBucket, fetch_random
+
+
+def test_repeated_ids_in_one_batch_are_written_once(tmp_path):
+    out = JsonlAppender(str(tmp_path / "recipes.jsonl"))
+    assert out.write([{"id": 1}, {"id": 2}, {"id": 1}]) == 2
+    assert out.write([{"id": 2}, {"id": 3}]) == 1
+    out.close()
+    assert [json.loads(line)["id"] for line in open(out.path, encoding="utf-8")] == [1, 2, 3]
+
+
+def test_fetch_random_against_stub_hits_target_exactly(tmp_path, monkeypatch):
+    # a small id space makes random batches repeat ids, within and across requests
+    monkeypatch.setattr(stub_server, "ID_SPACE", 400)
+    state = stub_server.StubState(rps=1000, daily_quota=1e6, latency_ms=5)
+    server = stub_server.make_server(state, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        client = SpoonacularClient("test", f"http://127.0.0.1:{server.server_port}", TokenBucket(1000, 10))
+        out = JsonlAppender(str(tmp_path / "recipes.jsonl"))
+        asyncio.run(fetch_random(client, out, 300, concurrency=4, batch_size=100))
+        out.close()
+    finally:
+        server.shutdown()
+        server.server_close()
+    ids = [json.loads(line)["id"] for line in open(out.path, encoding="utf-8")]
+    assert len(ids) == len(set(ids)) == 300
@@ -0,0 +1,196 @@
+"""
+Lightweight tracing for the retrieval pipeline: per-stage wall time, peak
+RSS, counters and value summaries, exported as JSON or Prometheus text.
+
+Library code records into the process-wide TRACER, so the batch scripts
+and server.py share one view:
+
+    with TRACER.stage("encode"):
+        vecs = model.encode(texts)
+    TRACER.count("vectors_indexed", len(vecs))
+    TRACER.observe("search_batch_size", len(batch))
+    TRACER.save("trace.json")             # or "trace.prom"; server.py serves GET /metrics
+
+Peak RSS is the process high-water mark (getrusage); a stage is charged
+with how much it raised that mark, which points at the stage responsible
+for the peak. Profiler wraps cProfile for deeper dives; the .prof output
+opens in snakeviz or `python -m pstats`. py-spy needs no hook and can
+attach to any of these processes (`py-spy record --pid <pid>`).
+"""
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ======== Config ========
+METRIC_PREFIX = "recipe_retrieval"
+
+
+def peak_rss_bytes():
+    """High-water mark of this process's resident set size (0 if unknown)."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024   # Linux reports KiB
+
+
+def current_rss_bytes():
+    """Current resident set size from /proc (Linux), else the peak."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return peak_rss_bytes()
+
+
+class Tracer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = {}     # name -> {"calls", "total_s", "max_s", "peak_rss_growth"}
+            self.counters = {}   # name -> int
+            self.values = {}     # name -> {"count", "sum", "max"}
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block as one call of stage `name`."""
+        peak = peak_rss_bytes()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            growth = peak_rss_bytes() - peak
+            with self._lock:
+                s = self.stages.setdefault(name, {"calls": 0, "total_s": 0.0, "max_s": 0.0, "peak_rss_growth": 0})
+                s["calls"] += 1
+                s["total_s"] += elapsed
+                s["max_s"] = max(s["max_s"], elapsed)
+                s["peak_rss_growth"] += growth
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def observe(self, name, value):
+        """Add one sample (e.g. a batch size) to the running count / sum / max of `name`."""
+        with self._lock:
+            v = self.values.setdefault(name, {"count": 0, "sum": 0.0, "max": value})
+            v["count"] += 1
+            v["sum"] += value
+            v["max"] = max(v["max"], value)
+
+    # ---------- export ----------
+    def to_dict(self):
+        with self._lock:
+            return {
+                "uptime_s": time.time() - self.started,
+                "peak_rss_bytes": peak_rss_bytes(),
+                "rss_bytes": current_rss_bytes(),
+                "stages": {k: dict(v) for k, v in self.stages.items()},
+                "counters": dict(self.counters),
+                "values": {k: dict(v) for k, v in self.values.items()},
+            }
+
+    def to_prometheus(self, prefix=METRIC_PREFIX):
+        """Prometheus text exposition format (version 0.0.4)."""
+        d = self.to_dict()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for labels, value in samples:
+                lines.append(f"{prefix}_{name}{labels} {value}")
+
+        metric("uptime_seconds", "gauge", "Seconds since the tracer started.", [("", d["uptime_s"])])
+        metric("peak_rss_bytes", "gauge", "Peak resident set size.", [("", d["peak_rss_bytes"])])
+        metric("rss_bytes", "gauge", "Current resident set size.", [("", d["rss_bytes"])])
+        stages = sorted(d["stages"].items())
+        for field, name, kind, help_text in (
+                ("total_s", "stage_seconds_total", "counter", "Wall time spent in each stage."),
+                ("calls", "stage_calls_total", "counter", "Times each stage ran."),
+                ("max_s", "stage_max_seconds", "gauge", "Longest single run of each stage."),
+                ("peak_rss_growth", "stage_peak_rss_growth_bytes", "counter", "Peak RSS increase during each stage.")):
+            if stages:
+                metric(name, kind, help_text, [(f'{{stage="{s}"}}', v[field]) for s, v in stages])
+        for name, value in sorted(d["counters"].items()):
+            metric(f"{name}_total", "counter", f"Count of {name.replace('_', ' ')}.", [("", value)])
+        for name, v in sorted(d["values"].items()):
+            metric(name, "summary", f"Observed {name.replace('_', ' ')}.",
+                   [("_count", v["count"]), ("_sum", v["sum"])])
+            metric(f"{name}_max", "gauge", f"Largest observed {name.replace('_', ' ')}.", [("", v["max"])])
+        return "\n".join(lines) + "\n"
+
+    def save(self, path):
+        """Write JSON, or Prometheus text when `path` ends in .prom / .txt."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else json.dumps(self.to_dict(), indent=2)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Trace saved to {path}")
+
+    def report(self):
+        """
+        Human-readable stage table, slowest first. `share` is each stage's
+        time over the tracer's wall time: nested stages are already inside
+        their parent, so the column is not meant to add up to 100%.
+        """
+        d = self.to_dict()
+        total = d["uptime_s"] or 1.0
+        lines = [f"{'stage':<22}{'calls':>7}{'total_s':>10}{'share':>8}{'max_s':>9}{'+peak_MB':>10}"]
+        for name, s in sorted(d["stages"].items(), key=lambda kv: -kv[1]["total_s"]):
+            lines.append(f"{name:<22}{s['calls']:>7}{s['total_s']:>10.3f}{s['total_s'] / total:>8.1%}"
+                         f"{s['max_s']:>9.3f}{s['peak_rss_growth'] / 2**20:>10.1f}")
+        lines.append(f"peak RSS {d['peak_rss_bytes'] / 2**20:.1f} MB, current {d['rss_bytes'] / 2**20:.1f} MB")
+        for name, value in sorted(d["counters"].items()):
+            lines.append(f"{name}: {value}")
+        for name, v in sorted(d["values"].items()):
+            lines.append(f"{name}: mean {v['sum'] / max(v['count'], 1):.1f}, max {v['max']} ({v['count']} samples)")
+        return "\n".join(lines)
+
+
+class Profiler:
+    """
+    Opt-in cProfile hook. `with profiler:` profiles the enclosed block on
+    the current thread; blocks on several threads (e.g. every server
+    micro-batch) accumulate into one profile, written by dump().
+    A Profiler built with path=None does nothing.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._profile = cProfile.Profile() if path else None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        if self._profile is not None:
+            self._lock.acquire()   # cProfile cannot run on two threads at once
+            self._profile.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self._profile is not None:
+            self._profile.disable()
+            self._lock.release()
+        return False
+
+    def dump(self):
+        if self._profile is not None:
+            with self._lock:
+                self._profile.dump_stats(self.path)
+            print(f"cProfile stats saved to {self.path} (view with `python -m pstats {self.path}` or snakeviz)")
+
+
+TRACER = Tracer()
@@ -0,0 +1,42 @@
+import argparse
+import json
+import os
+import time
+
+from baseline import DATA_2_PATH, INDEX_DIR, encode_corpus
+from encoder import load_encoder
+from index_store import META_FILE
+from live_index import LiveIndex
+from recipe_store import load_recipes
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Apply added / edited / removed recipes to an index written by build_index.py.")
+    parser.add_argument("--index-dir", default=INDEX_DIR)
+    parser.add_argument("--recipes", nargs="*", default=[DATA_2_PATH],
+                        help="recipe files (.json/.jsonl/.parquet or recipe_store dirs) to sync into the index")
+    parser.add_argument("--delete-missing", action="store_true",
+                        help="remove indexed recipes of the same source that are no longer in --recipes")
+    parser.add_argument("--delete", nargs="*", default=[], help="recipe ids to remove")
+    parser.add_argument("--compact", action="store_true", help="rebuild the index without tombstones afterwards")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with open(os.path.join(args.index_dir, META_FILE), "r", encoding="utf-8") as f:
+        model = load_encoder(json.load(f)["model"])
+    live = LiveIndex(args.index_dir, lambda texts: encode_corpus(model, texts))
+
+    for path in args.recipes:
+        added, updated, deleted = live.sync(load_recipes(path), delete_missing=args.delete_missing)
+        print(f"{path}: {added} added, {updated} updated, {deleted} deleted")
+    if args.delete:
+        print(f"Deleted {live.delete(args.delete)} of {len(args.delete)} ids")
+
+    if args.compact or live.needs_compaction():
+        live.compact(background=False)
+    print(f"Index now holds {live.ntotal} recipes ({time.perf_counter() - start:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()